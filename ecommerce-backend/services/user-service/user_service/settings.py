@@ -12,10 +12,17 @@ from pathlib import Path
 from decouple import config
 from datetime import timedelta
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Shared libraries (ecommerce-backend/shared). Docker images copy the shared
+# folder into the service root instead, where it is importable as-is.
+SHARED_LIBS_DIR = BASE_DIR.parent.parent
+if (SHARED_LIBS_DIR / 'shared').is_dir() and str(SHARED_LIBS_DIR) not in sys.path:
+    sys.path.append(str(SHARED_LIBS_DIR))
+
 
 # ==============================================================================
 # HELPER FUNCTIONS FOR DOCKER SECRETS
@@ -219,20 +226,36 @@ AUTH_USER_MODEL = 'users.User'
 
 # Password Hashing
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'users.hashers.PooledArgon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
 ]
 
+# Argon2 runs on a bounded thread pool (see users/hashers.py).
+# 0 disables the pool and hashes inline in the request worker.
+PASSWORD_HASH_POOL_SIZE = config('PASSWORD_HASH_POOL_SIZE', default=2, cast=int)
+
+# Max hashing calls waiting for a pool thread before new ones get a 503
+PASSWORD_HASH_QUEUE_LIMIT = config('PASSWORD_HASH_QUEUE_LIMIT', default=16, cast=int)
+
+# Max seconds a call may wait for a pool thread before it gets a 503
+PASSWORD_HASH_QUEUE_TIMEOUT = config('PASSWORD_HASH_QUEUE_TIMEOUT', default=2.0, cast=float)
+
+# Argon2 costs tuned for this host by `manage.py calibrate_argon2`.
+# Django's defaults are used until the file exists.
+PASSWORD_HASHER_PARAMS_FILE = config('PASSWORD_HASHER_PARAMS_FILE', default=str(BASE_DIR / 'argon2_params.json'))
+
 
 # ==============================================================================
 # DJANGO REST FRAMEWORK CONFIGURATION
 # ==============================================================================
 
 REST_FRAMEWORK = {
+    # Authorizes from the token's claims; the User row is loaded lazily
+    # (see users/authentication.py)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -258,11 +281,54 @@ REST_FRAMEWORK = {
     'DATE_FORMAT': '%Y-%m-%d',
 }
 
+# Unfiltered listings of tables with at least this many rows (by PostgreSQL's
+# statistics) report an estimated total instead of running COUNT(*).
+# 0 always counts exactly.
+PAGINATION_APPROXIMATE_COUNT_THRESHOLD = config('PAGINATION_APPROXIMATE_COUNT_THRESHOLD', default=0, cast=int)
+
+# Bulk user export (GET /api/admin/users/export/) and import
+# (python manage.py import_users): rows per database round trip, and
+# threads hashing imported plain-text passwords
+USER_EXPORT_CHUNK_SIZE = config('USER_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+USER_IMPORT_CHUNK_SIZE = config('USER_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+USER_IMPORT_HASH_WORKERS = config('USER_IMPORT_HASH_WORKERS', default=4, cast=int)
+
 
 # ==============================================================================
 # JWT CONFIGURATION
 # ==============================================================================
 
+# Signing algorithm. HS256 signs with the shared SECRET_KEY; an asymmetric
+# algorithm (e.g. RS256) signs with JWT_PRIVATE_KEY and publishes the public
+# keys at /api/auth/jwks/ so other services can verify tokens offline.
+JWT_ALGORITHM = config('JWT_ALGORITHM', default='HS256')
+
+if JWT_ALGORITHM.startswith('HS'):
+    JWT_SIGNING_KEY = SECRET_KEY
+    JWT_VERIFYING_KEY = None
+else:
+    JWT_SIGNING_KEY = read_secret('JWT_PRIVATE_KEY')
+    JWT_VERIFYING_KEY = read_secret('JWT_PUBLIC_KEY')
+
+# Optional fixed key id for the current key (defaults to the RFC 7638 thumbprint)
+JWT_KEY_ID = config('JWT_KEY_ID', default='')
+
+# Previous public keys (concatenated PEM) that stay published after a rotation
+# until every token they signed has expired
+JWT_RETIRED_PUBLIC_KEYS = read_secret('JWT_RETIRED_PUBLIC_KEYS', default='')
+
+# Shared secret other services send in the X-Revocation-Token header to read
+# /api/auth/revocations/ (MICROSERVICE_AUTH['REVOCATION_TOKEN']). Without
+# it, only admins can read the feed.
+REVOCATION_FEED_TOKEN = read_secret('REVOCATION_FEED_TOKEN', default='')
+
+# Claim profile for issued tokens: 'full' (email, is_active, roles list) or
+# 'compact' (roles bitmask, short claim names, see shared/auth/claims.py)
+JWT_CLAIM_PROFILE = config('JWT_CLAIM_PROFILE', default='full')
+
+# Whether compact tokens still carry the user's email
+JWT_COMPACT_INCLUDE_EMAIL = config('JWT_COMPACT_INCLUDE_EMAIL', default=False, cast=bool)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=config('JWT_REFRESH_TOKEN_LIFETIME', default=1440, cast=int)),
@@ -270,9 +336,9 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
     
-    'ALGORITHM': 'HS256',
-    'SIGNING_KEY': SECRET_KEY,
-    'VERIFYING_KEY': None,
+    'ALGORITHM': JWT_ALGORITHM,
+    'SIGNING_KEY': JWT_SIGNING_KEY,
+    'VERIFYING_KEY': JWT_VERIFYING_KEY,
     'AUDIENCE': None,
     'ISSUER': None,
     
@@ -281,7 +347,7 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('users.tokens.CustomAccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     
     'JTI_CLAIM': 'jti',
@@ -420,6 +486,29 @@ LOGGING = {
 #     }
 # }
 
+# Refresh token blacklist store (see users/blacklist.py):
+# - users.blacklist.DatabaseBlacklistBackend: SimpleJWT tables (default)
+# - users.blacklist.CacheBlacklistBackend: TTL entries in the cache named by
+#   REFRESH_BLACKLIST_CACHE, which must be shared by all workers (e.g. Redis)
+# - users.blacklist.InMemoryBlacklistBackend: per-process TTL dict, for tests
+#   and single-process development only
+REFRESH_BLACKLIST_BACKEND = config('REFRESH_BLACKLIST_BACKEND', default='users.blacklist.DatabaseBlacklistBackend')
+REFRESH_BLACKLIST_CACHE = config('REFRESH_BLACKLIST_CACHE', default='default')
+
+# Seconds a user's role names stay cached (see users/cache.py). Role
+# changes invalidate the cache; the timeout bounds staleness when workers
+# don't share a cache backend (the default local-memory cache).
+ROLE_CACHE_TIMEOUT = config('ROLE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a user's serialized profile (GET /api/users/me/) stays cached.
+# Profile saves and role changes invalidate it, like the role cache.
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds before a worker reloads its in-memory role name -> id registry
+# (see users/roles.py). Role changes reset it in the worker that made them;
+# this bounds how long other workers see renamed or deleted roles.
+ROLE_REGISTRY_TIMEOUT = config('ROLE_REGISTRY_TIMEOUT', default=300, cast=int)
+
 
 # ==============================================================================
 # APPLICATION SPECIFIC SETTINGS
@@ -439,7 +528,25 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@ecommerce.com
 # EMAIL_USE_TLS = True
 # EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 # EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+# EMAIL_TIMEOUT = 10  # seconds, so a stalled server cannot hang the outbox worker
+
+# Email Outbox (python manage.py send_outbox_emails)
+# Requests queue emails in the email_outbox table; the worker sends them in
+# batches over one connection and retries failures with exponential backoff
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+# Delay before the first retry in seconds, doubled on each further attempt
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)
+# Seconds a claimed batch is hidden from other workers while it is sent
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
 
 # Password Reset Token Settings
 PASSWORD_RESET_TOKEN_EXPIRY_HOURS = 24  # Token valid for 24 hours
 
+# Token table maintenance (python manage.py maintain_token_tables)
+# On PostgreSQL the token tables are partitioned by day of expiry; this many
+# days of partitions are created ahead of time
+TOKEN_PARTITION_DAYS_AHEAD = config('TOKEN_PARTITION_DAYS_AHEAD', default=7, cast=int)
+# Rows per DELETE when expired tokens are deleted rather than dropped
+TOKEN_CLEANUP_BATCH_SIZE = config('TOKEN_CLEANUP_BATCH_SIZE', default=5000, cast=int)
+
@@ -0,0 +1,135 @@
+"""
+Set-based writes to a user's address book.
+
+The unique constraint `user_addresses_one_default_uniq` allows one default
+address per type and user. Every write here keeps to it with a fixed
+number of statements, however many addresses are involved:
+
+- `promote_default()` makes the newest address of a type the default
+  after its default was deleted, with one UPDATE.
+- `sync_address_book()` upserts a whole address book, e.g. offline edits
+  from the mobile app, with one INSERT ... ON CONFLICT.
+"""
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, Subquery
+from django.utils import timezone
+
+from .models import User, UserAddress
+
+
+# Fields the client sends for each address; everything a sync may change
+SYNC_FIELDS = [
+    'address_type', 'full_name', 'phone_number', 'address_line1',
+    'address_line2', 'city', 'state', 'postal_code', 'country', 'is_default',
+]
+
+
+def promote_default(user_id, address_type):
+    """
+    Make the user's newest address of `address_type` the default, unless
+    there already is one.
+    """
+    addresses = UserAddress.objects.filter(user_id=user_id, address_type=address_type)
+    newest = addresses.order_by('-created_at').values('pk')[:1]
+    try:
+        # Savepoint: a default set concurrently makes this UPDATE violate
+        # the constraint, which leaves the address book as wanted
+        with transaction.atomic():
+            UserAddress.objects.filter(pk=Subquery(newest)).exclude(
+                Exists(addresses.filter(is_default=True))
+            ).update(is_default=True, updated_at=timezone.now())
+    except IntegrityError:
+        pass
+
+
+def sync_address_book(user_id, addresses, replace=False):
+    """
+    Create or update `addresses` in the user's address book.
+
+    Args:
+        user_id: Owner of the address book
+        addresses: Validated address dicts with SYNC_FIELDS and optionally
+            `id`; an unknown id creates the address under that id, so
+            clients can assign ids offline. At most one default per type.
+            A stored default sent without `is_default` stays the default.
+        replace: Also delete the user's addresses missing from `addresses`
+
+    Returns:
+        Dict with the numbers of addresses created, updated and deleted
+
+    Raises:
+        PermissionDenied: If an id belongs to another user's address
+    """
+    ids = [data['id'] for data in addresses if data.get('id')]
+    new_defaults = {data['address_type'] for data in addresses if data.get('is_default')}
+
+    with transaction.atomic():
+        # Syncs of the same address book run one at a time, so they cannot
+        # both set a default and collide on the constraint
+        list(User.objects.select_for_update().filter(pk=user_id).values_list('pk'))
+
+        # Locked, so the addresses counted as updated stay as they are
+        # until the upsert
+        stored_rows = list(UserAddress.objects.select_for_update().filter(pk__in=ids).values_list(
+            'pk', 'user_id', 'address_type', 'is_default'
+        )) if ids else []
+        stored = {pk: owner for pk, owner, _, _ in stored_rows}
+        stored_defaults = {pk: address_type for pk, _, address_type, is_default in stored_rows if is_default}
+        if any(owner != user_id for owner in stored.values()):
+            raise PermissionDenied('You do not have permission to modify this address.')
+
+        # Clear the defaults being replaced first: the constraint is checked
+        # row by row, so the upsert alone could collide with them
+        if new_defaults:
+            UserAddress.objects.filter(
+                user_id=user_id, address_type__in=new_defaults, is_default=True
+            ).update(is_default=False, updated_at=timezone.now())
+
+        # Types whose default is deleted or moved to another type, and need
+        # a new one
+        orphaned_types = set()
+        deleted = 0
+        if replace:
+            missing = UserAddress.objects.filter(user_id=user_id).exclude(pk__in=ids)
+            orphaned_types = set(
+                missing.filter(is_default=True).exclude(address_type__in=new_defaults)
+                .values_list('address_type', flat=True)
+            )
+            deleted, _ = missing.delete()
+
+        # Each address is sent whole: fields left out get their defaults,
+        # on updates too, except that a default stays one
+        rows = []
+        for data in addresses:
+            fields = {name: data[name] for name in SYNC_FIELDS if name in data}
+            if data.get('id'):
+                fields['id'] = data['id']
+            if 'is_default' not in data and data.get('id') in stored_defaults:
+                address_type = stored_defaults[data['id']]
+                if address_type == data['address_type'] and address_type not in new_defaults:
+                    fields['is_default'] = True
+                else:
+                    orphaned_types.add(address_type)
+            rows.append(UserAddress(user_id=user_id, **fields))
+        UserAddress.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=[*SYNC_FIELDS, 'updated_at'],
+        )
+
+        # An id that was free above may have been inserted by another user
+        # since, in which case the upsert updated their address: undo it
+        new_ids = [pk for pk in ids if pk not in stored]
+        if new_ids and UserAddress.objects.filter(pk__in=new_ids).exclude(user_id=user_id).exists():
+            raise PermissionDenied('You do not have permission to modify this address.')
+
+        for address_type in orphaned_types:
+            promote_default(user_id, address_type)
+
+    return {
+        'created': len(addresses) - len(stored),
+        'updated': len(stored),
+        'deleted': deleted,
+    }
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
-from .models import User, UserRole, UserRoleMapping, UserAddress, PasswordResetToken, EmailVerificationToken
+from .models import (
+    User, UserRole, UserRoleMapping, UserAddress, PasswordResetToken,
+    EmailVerificationToken, RevokedAccessToken, EmailOutbox,
+)
 
 
 # ==============================================================================
@@ -273,3 +276,64 @@ class EmailVerificationTokenAdmin(admin.ModelAdmin):
             f"Successfully deleted {count} expired verification token(s)."
         )
     cleanup_expired_tokens.short_description = "Delete expired verification tokens"
+
+
+
+# ==============================================================================
+# REVOKED ACCESS TOKEN ADMIN
+# ==============================================================================
+
+@admin.register(RevokedAccessToken)
+class RevokedAccessTokenAdmin(admin.ModelAdmin):
+    """Admin for Revoked Access Token model."""
+    
+    list_display = ['jti', 'revoked_at', 'expires_at']
+    list_filter = ['revoked_at']
+    search_fields = ['jti']
+    readonly_fields = ['jti', 'revoked_at', 'expires_at']
+    ordering = ['-revoked_at']
+    
+    actions = ['cleanup_expired_revocations']
+    
+    def cleanup_expired_revocations(self, request, queryset):
+        """Admin action to cleanup revocations of expired tokens."""
+        count = RevokedAccessToken.cleanup_expired()
+        self.message_user(
+            request,
+            f"Successfully deleted {count} expired revocation(s)."
+        )
+    cleanup_expired_revocations.short_description = "Delete revocations of expired tokens"
+
+
+# ==============================================================================
+# EMAIL OUTBOX ADMIN
+# ==============================================================================
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Admin for Email Outbox model."""
+    
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = [
+        'id', 'to_email', 'subject', 'body', 'html_body', 'attempts',
+        'last_error', 'created_at', 'sent_at'
+    ]
+    ordering = ['-created_at']
+    
+    actions = ['retry_emails']
+    
+    def retry_emails(self, request, queryset):
+        """Admin action to queue dead emails for delivery again."""
+        from django.utils import timezone
+        count = queryset.filter(status=EmailOutbox.Status.DEAD).update(
+            status=EmailOutbox.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now()
+        )
+        self.message_user(
+            request,
+            f"Queued {count} dead email(s) for another delivery attempt."
+        )
+    retry_emails.short_description = "Retry selected dead emails"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+    
+    def ready(self):
+        # Register signal handlers (role cache invalidation) and system checks
+        from . import checks, signals  # noqa: F401
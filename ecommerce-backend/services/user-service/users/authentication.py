@@ -0,0 +1,111 @@
+"""
+Claims-first authentication for the user-service's own endpoints.
+
+SimpleJWT's JWTAuthentication loads the User row on every request. Here
+the access token is validated as before, but the request's user is a
+`ClaimsUser`: its id and roles come from the token (read through
+shared/auth like every other service), and the User row is only loaded
+when a view touches another attribute, e.g. to serialize the profile.
+
+Roles and active status in the token are those at issue time, so a role
+change or deactivation reaches claims-only endpoints on the next token
+refresh, within JWT_ACCESS_TOKEN_LIFETIME. Refresh reloads the user and
+refuses deactivated or deleted users (see CustomTokenRefreshSerializer).
+
+Access tokens revoked on logout are rejected: every request checks the
+token's `jti` against RevokedAccessToken, an indexed lookup in a table
+holding only unexpired revocations.
+"""
+import uuid
+
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from shared.auth import MicroserviceUser
+
+from .models import RevokedAccessToken, User
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    The authenticated user, answered from the token where possible.
+
+    `id`, `pk` and `claims` (a shared MicroserviceUser with the token's
+    roles) never query the database. Any other attribute loads the User row
+    once and proxies to it; the row is checked to exist and be active, like
+    JWTAuthentication does up front.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, claims):
+        user_id = uuid.UUID(str(claims.id))
+
+        def load_user():
+            try:
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            if not user.is_active:
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+            return user
+
+        super().__init__(load_user)
+        # Set through __dict__: LazyObject forwards attribute writes to the user
+        self.__dict__['claims'] = claims
+        self.__dict__['id'] = self.__dict__['pk'] = user_id
+
+    def __bool__(self):
+        # `if not request.user` would otherwise load the row
+        return True
+
+    def __repr__(self):
+        return f'<ClaimsUser {self.id}>'
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that returns a ClaimsUser instead of loading the User.
+    """
+
+    def get_validated_token(self, raw_token):
+        """
+        Validate the token and check that it was not revoked.
+
+        Raises:
+            InvalidToken: If the token is invalid or expired
+            AuthenticationFailed: If the token was revoked
+        """
+        validated_token = super().get_validated_token(raw_token)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti and RevokedAccessToken.objects.filter(jti=jti).exists():
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return validated_token
+
+    def get_user(self, validated_token):
+        """
+        Build the request's user from the validated token's claims.
+
+        Raises:
+            AuthenticationFailed: If the token has no user id or marks the
+                user inactive
+        """
+        claims = MicroserviceUser.from_payload(validated_token.payload)
+        if not claims.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        try:
+            return ClaimsUser(claims)
+        except ValueError:
+            raise AuthenticationFailed(_('Token contained no recognizable user identification'))
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """OpenAPI bearer scheme for ClaimsJWTAuthentication."""
+
+    target_class = 'users.authentication.ClaimsJWTAuthentication'
+
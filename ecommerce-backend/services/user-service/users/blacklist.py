@@ -0,0 +1,160 @@
+"""
+Refresh token blacklist backends.
+
+With token rotation, every refresh blacklists the old refresh token. The
+database backend keeps SimpleJWT's OutstandingToken/BlacklistedToken
+tables, which grow with every refresh until `flushexpiredtokens` runs. The
+cache backend stores only the blacklisted `jti`s in a TTL cache, each
+expiring together with its token, so lookups and inserts stay constant
+time whatever the refresh history. The in-memory backend does the same in
+a per-process dict, as a local fake for tests and development.
+
+Select a backend with REFRESH_BLACKLIST_BACKEND.
+"""
+import abc
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BaseBlacklistBackend(abc.ABC):
+    """
+    Interface for refresh token blacklist stores.
+    """
+
+    def record_outstanding(self, token, user):
+        """Called when a refresh token is issued to a user."""
+
+    @abc.abstractmethod
+    def add(self, token):
+        """Blacklist a refresh token until it expires."""
+
+    @abc.abstractmethod
+    def contains(self, jti):
+        """Check if a token ID is blacklisted."""
+
+    def contains_many(self, jtis):
+        """Return the subset of token IDs that are blacklisted."""
+        return {jti for jti in jtis if self.contains(jti)}
+
+
+class DatabaseBlacklistBackend(BaseBlacklistBackend):
+    """
+    SimpleJWT's blacklist tables.
+
+    Issued tokens are listed in the Django admin. Run
+    `python manage.py flushexpiredtokens` regularly to keep the tables small.
+    """
+
+    def record_outstanding(self, token, user):
+        OutstandingToken.objects.create(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+
+    def add(self, token):
+        outstanding, _ = OutstandingToken.objects.get_or_create(
+            jti=token[api_settings.JTI_CLAIM],
+            defaults={
+                'token': str(token),
+                'expires_at': datetime_from_epoch(token['exp']),
+            },
+        )
+        BlacklistedToken.objects.get_or_create(token=outstanding)
+
+    def contains(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def contains_many(self, jtis):
+        return set(
+            BlacklistedToken.objects.filter(
+                token__jti__in=jtis
+            ).values_list('token__jti', flat=True)
+        )
+
+
+class CacheBlacklistBackend(BaseBlacklistBackend):
+    """
+    Blacklisted token IDs in a Django cache, expiring with their tokens.
+
+    Use a cache shared by all workers (e.g. Redis, set by
+    REFRESH_BLACKLIST_CACHE). The local-memory cache is per process and is
+    only suitable for tests and single-process development.
+    """
+
+    KEY = 'users:refresh-blacklist:{jti}'
+
+    def __init__(self):
+        self.cache = caches[settings.REFRESH_BLACKLIST_CACHE]
+
+    def _key(self, jti):
+        return self.KEY.format(jti=jti)
+
+    def add(self, token):
+        timeout = max(int(token['exp'] - time.time()), 1)
+        self.cache.set(self._key(token[api_settings.JTI_CLAIM]), 1, timeout)
+
+    def contains(self, jti):
+        return self.cache.get(self._key(jti)) is not None
+
+    def contains_many(self, jtis):
+        keys = {self._key(jti): jti for jti in jtis}
+        return {keys[key] for key in self.cache.get_many(list(keys))}
+
+
+class InMemoryBlacklistBackend(BaseBlacklistBackend):
+    """
+    Blacklisted token IDs in a per-process dict, expiring with their tokens.
+
+    A local fake of CacheBlacklistBackend for tests and single-process
+    development: nothing is shared between workers or kept across restarts.
+    Expired entries are dropped on insert once per PURGE_INTERVAL seconds.
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        self._expires_at = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + self.PURGE_INTERVAL
+
+    def add(self, token):
+        now = time.monotonic()
+        with self._lock:
+            self._expires_at[token[api_settings.JTI_CLAIM]] = now + max(token['exp'] - time.time(), 1)
+            if now >= self._next_purge:
+                self._expires_at = {
+                    jti: expires_at for jti, expires_at in self._expires_at.items() if expires_at > now
+                }
+                self._next_purge = now + self.PURGE_INTERVAL
+
+    def contains(self, jti):
+        expires_at = self._expires_at.get(jti)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def __len__(self):
+        return len(self._expires_at)
+
+
+@lru_cache(maxsize=1)
+def get_blacklist_backend():
+    """Return the configured refresh token blacklist backend."""
+    return import_string(settings.REFRESH_BLACKLIST_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_blacklist_backend(setting, **kwargs):
+    if setting in ('REFRESH_BLACKLIST_BACKEND', 'REFRESH_BLACKLIST_CACHE'):
+        get_blacklist_backend.cache_clear()
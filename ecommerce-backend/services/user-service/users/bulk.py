@@ -0,0 +1,164 @@
+"""
+Bulk admin actions on many users at once.
+
+Each action reads the state of all target users with one query, then
+applies the change with one set-based statement: a `bulk_create` with
+ignore_conflicts for role assignments, a DELETE by primary key for role
+removals and a single UPDATE for activation. The query count does not grow
+with the number of users.
+
+The same rules as the single-user endpoints apply: a user keeps at least
+one role, and admins cannot deactivate themselves. Users a rule protects
+are skipped and reported, the others are still changed.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_user_profiles_on_commit, invalidate_user_roles_on_commit
+from .models import User, UserRoleMapping
+from .roles import get_role_id
+
+
+ACTIONS = ['add_role', 'remove_role', 'activate', 'deactivate']
+
+# Result statuses
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+SKIPPED = 'skipped'
+NOT_FOUND = 'not_found'
+
+_INSERT_BATCH_SIZE = 1000
+
+
+def _has_role(role_id):
+    return Exists(UserRoleMapping.objects.filter(user=OuterRef('pk'), role_id=role_id))
+
+
+def add_role(users, role_name):
+    """
+    Give the role named `role_name` to every user of `users` that does not
+    have it.
+
+    Returns:
+        Dict of user id -> (status, detail)
+    """
+    role_id = get_role_id(role_name)
+    rows = list(users.order_by().annotate(has_role=_has_role(role_id)).values_list('pk', 'has_role'))
+    missing = [pk for pk, has_role in rows if not has_role]
+
+    # ignore_conflicts: a concurrent assignment of the same role is not an error
+    UserRoleMapping.objects.bulk_create(
+        [UserRoleMapping(user_id=pk, role_id=role_id) for pk in missing],
+        batch_size=_INSERT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    invalidate_user_roles_on_commit(missing)
+
+    return {
+        pk: (UNCHANGED, f'User already has {role_name} role.') if has_role
+        else (UPDATED, f'{role_name} role assigned.')
+        for pk, has_role in rows
+    }
+
+
+def remove_role(users, role_name):
+    """
+    Take the role named `role_name` from every user of `users` that has it
+    and another role.
+
+    Returns:
+        Dict of user id -> (status, detail)
+    """
+    role_id = get_role_id(role_name)
+    targets = users.order_by().values('pk')
+    # Lock the target users, in a fixed order, before counting their roles:
+    # a concurrent removal of another role from one of them (here or in
+    # RemoveRoleView, which takes the same lock) then waits, and the count
+    # below, read by a later statement, includes its result
+    list(User.objects.select_for_update().filter(pk__in=targets).order_by('pk').values_list('pk'))
+    role_count = (
+        UserRoleMapping.objects.filter(user=OuterRef('pk'))
+        .order_by()
+        .values('user')
+        .annotate(count=Count('*'))
+        .values('count')
+    )
+    rows = list(
+        User.objects.filter(pk__in=targets)
+        .annotate(
+            has_role=_has_role(role_id),
+            role_count=Coalesce(Subquery(role_count), 0, output_field=IntegerField()),
+        )
+        .values_list('pk', 'has_role', 'role_count')
+    )
+    removable = [pk for pk, has_role, count in rows if has_role and count > 1]
+
+    if removable:
+        # delete() sends post_delete for each mapping, whose receiver drops
+        # the user's cached roles (users/signals.py)
+        UserRoleMapping.objects.filter(role_id=role_id, user_id__in=removable).delete()
+
+    results = {}
+    for pk, has_role, count in rows:
+        if not has_role:
+            results[pk] = (UNCHANGED, f'User does not have {role_name} role.')
+        elif count <= 1:
+            results[pk] = (SKIPPED, 'Cannot remove the last role from user. User must have at least one role.')
+        else:
+            results[pk] = (UPDATED, f'{role_name} role removed.')
+    return results
+
+
+def set_active(users, is_active, acting_user):
+    """
+    Activate or deactivate every user of `users`. When deactivating,
+    `acting_user` is skipped.
+
+    Returns:
+        Dict of user id -> (status, detail)
+    """
+    rows = list(users.order_by().values_list('pk', 'is_active'))
+    protected = acting_user.pk if not is_active else None
+    changed = [pk for pk, active in rows if active != is_active and pk != protected]
+
+    if changed:
+        # update() skips auto_now and post_save, so updated_at is set and
+        # the cached profiles are dropped explicitly
+        User.objects.filter(pk__in=changed).update(is_active=is_active, updated_at=timezone.now())
+        invalidate_user_profiles_on_commit(changed)
+
+    state = 'active' if is_active else 'inactive'
+    results = {}
+    for pk, active in rows:
+        if pk == protected:
+            results[pk] = (SKIPPED, 'You cannot deactivate your own account.')
+        elif active == is_active:
+            results[pk] = (UNCHANGED, f'User is already {state}.')
+        else:
+            results[pk] = (UPDATED, 'User activated.' if is_active else 'User deactivated.')
+    return results
+
+
+def apply_bulk_action(action, users, acting_user, role_name=None):
+    """
+    Apply a bulk action in one transaction.
+
+    Args:
+        action: One of ACTIONS
+        users: Queryset of the target users
+        acting_user: Admin performing the action
+        role_name: Name of an existing role, for add_role and remove_role
+
+    Returns:
+        Dict of user id -> (status, detail) for every target user
+    """
+    with transaction.atomic():
+        if action == 'add_role':
+            return add_role(users, role_name)
+        if action == 'remove_role':
+            return remove_role(users, role_name)
+        if action in ('activate', 'deactivate'):
+            return set_active(users, action == 'activate', acting_user)
+    raise ValueError(f'Unknown bulk action: {action}')
@@ -0,0 +1,122 @@
+"""
+Cached lookups for the users app.
+
+Role names are read on every login, token refresh and profile response.
+They are cached per user in Django's cache and invalidated by the signals
+in users/signals.py whenever a user's role mappings change. Use a shared
+cache backend (e.g. Redis) when running several workers, so invalidations
+reach all of them; ROLE_CACHE_TIMEOUT bounds staleness otherwise.
+
+The serialized profile returned by GET /api/users/me/ is cached per user
+as well. It is dropped when the user is saved or their roles change, and
+only served to tokens whose roles match the cached ones, so a token issued
+before a role change reads the profile from the database again. It is keyed
+by user id alone, not by `updated_at`: reading `updated_at` would need the
+users row the cache exists to avoid.
+
+Invalidation relies on model signals, which QuerySet.update(), bulk_create()
+and raw SQL do not send. Code changing profile fields or role mappings that
+way must call invalidate_user_profiles_on_commit() or
+invalidate_user_roles_on_commit() itself (as users/bulk.py does); otherwise
+the old data is served until PROFILE_CACHE_TIMEOUT or ROLE_CACHE_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import UserRoleMapping
+
+
+ROLE_CACHE_KEY = 'users:roles:{user_id}'
+PROFILE_CACHE_KEY = 'users:profile:{user_id}'
+
+
+def _role_cache_key(user_id):
+    return ROLE_CACHE_KEY.format(user_id=user_id)
+
+
+def _profile_cache_key(user_id):
+    return PROFILE_CACHE_KEY.format(user_id=user_id)
+
+
+def get_user_roles(user_id):
+    """
+    Return the names of a user's roles, sorted by name.
+
+    Args:
+        user_id: User's UUID
+
+    Returns:
+        List of role names (e.g., ['ADMIN', 'CUSTOMER'])
+    """
+    key = _role_cache_key(user_id)
+    roles = cache.get(key)
+    if roles is None:
+        roles = sorted(
+            UserRoleMapping.objects.filter(user_id=user_id).values_list('role__name', flat=True)
+        )
+        cache.set(key, roles, settings.ROLE_CACHE_TIMEOUT)
+    return roles
+
+
+def invalidate_user_roles(*user_ids):
+    """Drop the cached roles, and the profiles showing them, of the given users."""
+    cache.delete_many(
+        [_role_cache_key(user_id) for user_id in user_ids]
+        + [_profile_cache_key(user_id) for user_id in user_ids]
+    )
+
+
+def invalidate_user_roles_on_commit(user_ids):
+    """
+    Drop the cached roles of the given users now and again once the current
+    transaction commits, so a request that read the old roles
+    mid-transaction cannot leave them cached.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    invalidate_user_roles(*user_ids)
+    transaction.on_commit(lambda: invalidate_user_roles(*user_ids))
+
+
+def get_cached_profile(user_id, roles):
+    """
+    Return a user's cached profile payload if it shows `roles`.
+
+    Args:
+        user_id: User's UUID
+        roles: Role names the caller's token carries
+
+    Returns:
+        The serialized profile, or None if it is not cached or was built
+        for other roles
+    """
+    entry = cache.get(_profile_cache_key(user_id))
+    if entry is None or entry['roles'] != sorted(roles):
+        return None
+    return entry['data']
+
+
+def cache_profile(user_id, data):
+    """Cache a user's serialized profile (UserSerializer data)."""
+    cache.set(
+        _profile_cache_key(user_id),
+        {'roles': sorted(data['roles']), 'data': dict(data)},
+        settings.PROFILE_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_user_profiles(*user_ids):
+    """Drop the cached profiles of the given users."""
+    cache.delete_many([_profile_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_user_profiles_on_commit(user_ids):
+    """Like invalidate_user_roles_on_commit, for cached profiles only."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    invalidate_user_profiles(*user_ids)
+    transaction.on_commit(lambda: invalidate_user_profiles(*user_ids))
+
@@ -0,0 +1,25 @@
+"""
+System checks for the users app.
+"""
+from django.core.checks import Error, register
+
+from shared.auth.claims import ROLE_BITS
+
+
+@register()
+def check_role_bits(app_configs, **kwargs):
+    """
+    Every role must have a bit in shared ROLE_BITS, or compact tokens
+    would leave it out (see shared/auth/claims.py).
+    """
+    from .models import UserRole
+
+    return [
+        Error(
+            f"Role '{role}' has no bit assigned in shared.auth.claims.ROLE_BITS.",
+            hint='Add it with the next free bit; never reuse or renumber existing bits.',
+            id='users.E001',
+        )
+        for role in UserRole.RoleChoices.values
+        if role not in ROLE_BITS
+    ]
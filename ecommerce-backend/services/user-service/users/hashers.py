@@ -0,0 +1,260 @@
+"""
+Password hashers for the users app.
+
+Argon2 is deliberately slow: each hash or verification takes tens of
+milliseconds of CPU. Running it inline lets a login storm occupy every
+request worker. The pooled hasher runs Argon2 on a small, bounded thread
+pool instead, so at most PASSWORD_HASH_POOL_SIZE hashes run at once, and
+requests beyond the queue limit fail fast with 503 instead of piling up.
+
+Argon2 costs come from the file written by `manage.py calibrate_argon2`
+when it exists, so they match the host's hardware. Hashes made with other
+costs are upgraded transparently on the user's next login.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, get_hasher
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashingUnavailable(APIException):
+    """Raised when the password hashing pool is saturated."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service is busy, please try again shortly.'
+    default_code = 'password_hashing_unavailable'
+
+    # Sent as the Retry-After header by DRF's exception handler
+    wait = 1
+
+
+class HashingPool:
+    """
+    Bounded thread pool for password hashing, with queue limit and metrics.
+
+    argon2-cffi releases the GIL while hashing, so a thread pool gives real
+    parallelism without the pickling and fork concerns of a process pool.
+    Callers still wait for their own hash; what the pool bounds is how many
+    hashes compete for CPU with the rest of the service at once.
+
+    Args:
+        size: Number of hashing threads
+        queue_limit: Max calls waiting for a thread; more are rejected
+        queue_timeout: Max seconds a call may wait for a thread before it
+            is rejected
+    """
+
+    def __init__(self, size, queue_limit, queue_timeout):
+        self.size = size
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(size + queue_limit)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def _record(self, queue_wait, hash_time):
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.hash_time_total += hash_time
+            self.hash_time_max = max(self.hash_time_max, hash_time)
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected += 1
+        logger.warning("Password hashing rejected: %s", reason)
+        raise PasswordHashingUnavailable()
+
+    def run(self, func, *args):
+        """
+        Run a hashing function on the pool and return its result.
+
+        Raises:
+            PasswordHashingUnavailable: If the queue is full, or the call
+                waited longer than queue_timeout for a thread
+        """
+        if not self._slots.acquire(blocking=False):
+            self._reject('queue full')
+
+        submitted_at = time.perf_counter()
+        started = threading.Event()
+
+        def task():
+            started.set()
+            started_at = time.perf_counter()
+            result = func(*args)
+            self._record(started_at - submitted_at, time.perf_counter() - started_at)
+            return result
+
+        try:
+            future = self._executor.submit(task)
+            # The caller waits at most queue_timeout for a thread to pick the
+            # call up; cancel() only succeeds if none has, so a call that
+            # started just in time still runs to completion
+            if not started.wait(self.queue_timeout) and future.cancel():
+                self._reject(f'waited {self.queue_timeout:.2f}s for a hashing thread')
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Return queue wait and hash time metrics, in milliseconds."""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'pool_size': self.size,
+                'queue_limit': self.queue_limit,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'queue_wait_avg_ms': round(self.queue_wait_total / completed * 1000, 2),
+                'queue_wait_max_ms': round(self.queue_wait_max * 1000, 2),
+                'hash_time_avg_ms': round(self.hash_time_total / completed * 1000, 2),
+                'hash_time_max_ms': round(self.hash_time_max * 1000, 2),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """
+    Return the process-wide hashing pool, created on first use.
+
+    Returns:
+        HashingPool instance, or None if PASSWORD_HASH_POOL_SIZE is 0
+        (hashing runs inline)
+    """
+    global _pool
+
+    if _pool is None:
+        size = settings.PASSWORD_HASH_POOL_SIZE
+        if not size:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    size,
+                    settings.PASSWORD_HASH_QUEUE_LIMIT,
+                    settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+                )
+
+    return _pool
+
+
+@receiver(setting_changed)
+def _reset_hashing_pool(setting, **kwargs):
+    """Rebuild the pool when its settings change (e.g., override_settings in tests)."""
+    global _pool
+    if setting.startswith('PASSWORD_HASH_') and _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+ARGON2_PARAMS = ('time_cost', 'memory_cost', 'parallelism')
+
+
+@lru_cache(maxsize=1)
+def get_argon2_params():
+    """
+    Return the calibrated Argon2 costs from PASSWORD_HASHER_PARAMS_FILE.
+
+    The file is read once per process; restart workers after recalibrating.
+
+    Returns:
+        dict with any of time_cost, memory_cost (KiB) and parallelism;
+        empty if the file is not configured, missing or invalid
+    """
+    path = settings.PASSWORD_HASHER_PARAMS_FILE
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return {name: int(data[name]) for name in ARGON2_PARAMS if name in data}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning("Ignoring Argon2 parameters in %s: %s", path, e)
+        return {}
+
+
+@receiver(setting_changed)
+def _reset_argon2_params(setting, **kwargs):
+    if setting == 'PASSWORD_HASHER_PARAMS_FILE':
+        get_argon2_params.cache_clear()
+
+
+class PooledArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 hasher that runs hashing and verification on the hashing pool.
+
+    Uses the same algorithm name and format as Django's Argon2PasswordHasher,
+    so existing password hashes keep working. Costs default to Django's and
+    are overridden by the calibrated parameters; Django's must_update then
+    rehashes passwords made with other costs when users log in.
+    """
+
+    @property
+    def time_cost(self):
+        return get_argon2_params().get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return get_argon2_params().get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return get_argon2_params().get('parallelism', Argon2PasswordHasher.parallelism)
+
+    def encode(self, password, salt):
+        pool = get_hashing_pool()
+        if pool is None:
+            return super().encode(password, salt)
+        return pool.run(super().encode, password, salt)
+
+    def verify(self, password, encoded):
+        pool = get_hashing_pool()
+        if pool is None:
+            return super().verify(password, encoded)
+        return pool.run(super().verify, password, encoded)
+
+
+def make_password_unpooled(password):
+    """
+    Hash a password with the default hasher, bypassing the hashing pool.
+
+    For batch jobs that run their own hashing threads (e.g. `import_users`),
+    which would otherwise be rejected by the pool's queue limit.
+    """
+    hasher = get_hasher('default')
+    salt = hasher.salt()
+    if isinstance(hasher, PooledArgon2PasswordHasher):
+        return Argon2PasswordHasher.encode(hasher, password, salt)
+    return hasher.encode(password, salt)
+
@@ -0,0 +1,197 @@
+"""
+JWT signing keys and the published key set (JWKS).
+
+With an asymmetric algorithm (e.g. RS256) the User Service signs tokens with
+its private key and publishes the public keys, each with a `kid`, so other
+services can verify tokens offline. Retired public keys stay in the key set
+until every token signed with them has expired, which makes key rotation a
+User Service-only deploy.
+"""
+import base64
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt import settings as jwt_settings
+
+
+def is_asymmetric(algorithm):
+    """Check if the algorithm signs with a private/public key pair."""
+    return not algorithm.startswith('HS')
+
+
+_PEM_BLOCK = re.compile(r'-----BEGIN ([A-Z0-9 ]+)-----.*?-----END \1-----', re.DOTALL)
+
+
+def _split_pem_bundle(bundle):
+    """
+    Split a string of concatenated PEM public keys into individual keys.
+
+    Raises:
+        ImproperlyConfigured: If the bundle holds anything other than
+            `PUBLIC KEY` blocks (e.g. an `RSA PUBLIC KEY` or a certificate),
+            which would otherwise drop that key from the key set
+    """
+    pems = []
+    for match in _PEM_BLOCK.finditer(bundle):
+        if match.group(1) != 'PUBLIC KEY':
+            raise ImproperlyConfigured(
+                f"JWT_RETIRED_PUBLIC_KEYS holds a '{match.group(1)}' block; "
+                "convert it to a SubjectPublicKeyInfo 'PUBLIC KEY'."
+            )
+        pems.append(match.group(0))
+    if _PEM_BLOCK.sub('', bundle).strip():
+        raise ImproperlyConfigured('JWT_RETIRED_PUBLIC_KEYS holds text that is not a PEM block.')
+    return pems
+
+
+def _thumbprint(jwk):
+    """
+    Compute the RFC 7638 thumbprint of a public JWK, used as its default `kid`.
+    """
+    required = {
+        'RSA': ('e', 'kty', 'n'),
+        'EC': ('crv', 'kty', 'x', 'y'),
+        'OKP': ('crv', 'kty', 'x'),
+    }[jwk['kty']]
+    canonical = json.dumps(
+        {name: jwk[name] for name in required},
+        separators=(',', ':'),
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def _public_jwk(pem, algorithm):
+    """Convert a PEM public key into a JWK dict with `kid`, `alg` and `use`."""
+    algorithm_obj = get_default_algorithms()[algorithm]
+    jwk = algorithm_obj.to_jwk(algorithm_obj.prepare_key(pem), as_dict=True)
+    jwk['kid'] = _thumbprint(jwk)
+    jwk['alg'] = algorithm
+    jwk['use'] = 'sig'
+    return jwk
+
+
+@lru_cache(maxsize=1)
+def get_public_jwks():
+    """
+    Return the public key set published to other services.
+
+    Contains the current verifying key followed by any retired keys listed
+    in JWT_RETIRED_PUBLIC_KEYS. Empty for HMAC algorithms, whose key is a
+    shared secret.
+
+    Returns:
+        dict in JWKS format: {'keys': [...]}
+    """
+    # Read through the module: SimpleJWT replaces api_settings when
+    # SIMPLE_JWT changes
+    api_settings = jwt_settings.api_settings
+    algorithm = api_settings.ALGORITHM
+    if not is_asymmetric(algorithm):
+        return {'keys': []}
+
+    keys = [_public_jwk(api_settings.VERIFYING_KEY, algorithm)]
+    if settings.JWT_KEY_ID:
+        keys[0]['kid'] = settings.JWT_KEY_ID
+
+    for pem in _split_pem_bundle(settings.JWT_RETIRED_PUBLIC_KEYS or ''):
+        keys.append(_public_jwk(pem, algorithm))
+
+    return {'keys': keys}
+
+
+@lru_cache(maxsize=1)
+def _verifying_keys_by_kid():
+    """Map each published `kid` to its parsed public key object."""
+    return {
+        jwk['kid']: jwt.PyJWK.from_dict(jwk).key
+        for jwk in get_public_jwks()['keys']
+    }
+
+
+def get_signing_kid():
+    """Return the `kid` of the current signing key, or None for HMAC algorithms."""
+    keys = get_public_jwks()['keys']
+    return keys[0]['kid'] if keys else None
+
+
+class KeyIdTokenBackend(TokenBackend):
+    """
+    Token backend that stamps a `kid` header on issued tokens and picks the
+    verifying key by `kid`, so tokens signed with a retired key stay valid
+    until they expire.
+    """
+
+    def encode(self, payload):
+        """Encode the payload, adding the signing key's `kid` to the header."""
+        kid = get_signing_kid()
+        if kid is None:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            self.signing_key,
+            algorithm=self.algorithm,
+            headers={'kid': kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        """Return the public key matching the token's `kid` header."""
+        if not is_asymmetric(self.algorithm):
+            return super().get_verifying_key(token)
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError('Token is invalid or expired') from ex
+
+        keys = _verifying_keys_by_kid()
+        if kid is None:
+            # Tokens issued before kids were introduced
+            return self.verifying_key
+        if kid not in keys:
+            raise TokenBackendError('Token is invalid or expired')
+        return keys[kid]
+
+
+@lru_cache(maxsize=1)
+def get_token_backend():
+    """Return the process-wide KeyIdTokenBackend built from SIMPLE_JWT."""
+    api_settings = jwt_settings.api_settings
+    return KeyIdTokenBackend(
+        api_settings.ALGORITHM,
+        api_settings.SIGNING_KEY,
+        api_settings.VERIFYING_KEY,
+        api_settings.AUDIENCE,
+        api_settings.ISSUER,
+        api_settings.JWK_URL,
+        api_settings.LEEWAY,
+        api_settings.JSON_ENCODER,
+    )
+
+
+@receiver(setting_changed)
+def _reset_keys(setting, **kwargs):
+    """Drop cached keys when JWT settings change (e.g., override_settings in tests)."""
+    if setting in ('SIMPLE_JWT', 'JWT_KEY_ID', 'JWT_RETIRED_PUBLIC_KEYS'):
+        get_public_jwks.cache_clear()
+        _verifying_keys_by_kid.cache_clear()
+        get_token_backend.cache_clear()
@@ -0,0 +1,166 @@
+"""
+Benchmark the admin user search on a synthetic users table.
+
+Fills a temporary table named `users` with generated users. For this
+connection it shadows the real table, so the ORM search query from
+users/search.py runs against it unchanged. Each term is timed as the admin
+list runs it (count plus first page): first with a sequential scan, then,
+on PostgreSQL, with the trigram indexes. The temporary table is dropped at
+the end; real users are never read or written.
+
+Usage:
+    python manage.py benchmark_user_search --rows 2000000
+    python manage.py benchmark_user_search --rows 5000000 --term smith --term 98765
+"""
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from users.models import User
+from users.search import search_index_statements, search_users
+
+
+DOMAINS = ['example.com', 'mail.test', 'shop.test', 'corp.test', 'inbox.test']
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael',
+    'Linda', 'David', 'Elizabeth', 'Priya', 'Rahul', 'Ananya', 'Arjun', 'Wei',
+    'Mei', 'Carlos', 'Sofia', 'Ahmed', 'Fatima',
+]
+# Last names are three syllables, giving 8000 distinct names
+SYLLABLES = [
+    'ka', 'vo', 'ri', 'sen', 'mal', 'do', 'tar', 'li', 'ber', 'gan',
+    'shi', 'ro', 'nel', 'pa', 'dev', 'mu', 'son', 'te', 'har', 'zi',
+]
+
+COLUMNS = (
+    'id, password, is_superuser, email, first_name, last_name, phone_number, '
+    'is_active, is_verified, is_staff, created_at, updated_at'
+)
+
+POSTGRESQL_FILL = f"""
+INSERT INTO users ({COLUMNS})
+SELECT md5(i::text)::uuid, '', false,
+       'user' || i || '@' || (%s::text[])[1 + i %% 5],
+       (%s::text[])[1 + i %% 20],
+       initcap((%s::text[])[1 + (i / 7) %% 20])
+           || (%s::text[])[1 + (i / 140) %% 20]
+           || (%s::text[])[1 + (i / 2800) %% 20],
+       '+91' || lpad(((i::bigint * 7919) %% 10000000000)::text, 10, '0'),
+       true, i %% 3 = 0, false, now() - i * interval '1 second', now()
+FROM generate_series(1, %s) AS i
+"""
+
+SQLITE_FILL = f"""
+WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < %s)
+INSERT INTO users ({COLUMNS})
+SELECT printf('%%032x', i), '', 0,
+       'user' || i || '@' || json_extract(%s, '$[' || (i %% 5) || ']'),
+       json_extract(%s, '$[' || (i %% 20) || ']'),
+       upper(substr(json_extract(%s, '$[' || ((i / 7) %% 20) || ']'), 1, 1))
+           || substr(json_extract(%s, '$[' || ((i / 7) %% 20) || ']'), 2)
+           || json_extract(%s, '$[' || ((i / 140) %% 20) || ']')
+           || json_extract(%s, '$[' || ((i / 2800) %% 20) || ']'),
+       printf('+91%%010d', (i * 7919) %% 10000000000),
+       1, i %% 3 = 0, 0,
+       strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now', '-' || i || ' seconds'),
+       strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+FROM seq
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the admin user search on a synthetic users table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=2_000_000,
+            help='Synthetic users to generate',
+        )
+        parser.add_argument(
+            '--term',
+            action='append',
+            dest='terms',
+            help='Search term to time (repeatable; default: a mix of selective and broad terms)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per term; the median is reported',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be positive.')
+
+        terms = options['terms'] or [
+            f'user{rows // 2}@',                                 # one email
+            f'{(rows // 3) * 7919 % 10_000_000_000:010d}'[2:9],  # one phone number
+            SYLLABLES[3].capitalize() + SYLLABLES[5],            # a common last name
+            'xqzv',                                              # no match
+        ]
+        postgresql = connection.vendor == 'postgresql'
+
+        try:
+            self.stdout.write(f'Generating {rows} users...')
+            started = time.perf_counter()
+            self._fill(rows, postgresql)
+            self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s')
+
+            scan = {term: self._time_search(term, options['repeat']) for term in terms}
+
+            indexed = {}
+            if postgresql:
+                self.stdout.write('Building trigram indexes...')
+                started = time.perf_counter()
+                with connection.cursor() as cursor:
+                    for statement in search_index_statements(connection):
+                        cursor.execute(statement)
+                    cursor.execute('ANALYZE users')
+                self.stdout.write(f'Built in {time.perf_counter() - started:.1f}s')
+                indexed = {term: self._time_search(term, options['repeat']) for term in terms}
+            else:
+                self.stdout.write('Trigram indexes need PostgreSQL; timing the fallback only.')
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {"pg_temp" if postgresql else "temp"}.users')
+
+        self.stdout.write(f'\n{"term":<20} {"matches":>9} {"scan ms":>10} {"indexed ms":>11}')
+        for term in terms:
+            matches, scan_ms = scan[term]
+            indexed_ms = f'{indexed[term][1]:.1f}' if term in indexed else '-'
+            self.stdout.write(f'{term:<20} {matches:>9} {scan_ms:>10.1f} {indexed_ms:>11}')
+
+    def _fill(self, rows, postgresql):
+        """Create and fill the temporary users table."""
+        with connection.cursor() as cursor:
+            if postgresql:
+                cursor.execute('CREATE TEMP TABLE users AS SELECT * FROM users WITH NO DATA')
+                cursor.execute(
+                    POSTGRESQL_FILL,
+                    [DOMAINS, FIRST_NAMES, SYLLABLES, SYLLABLES, SYLLABLES, rows],
+                )
+                cursor.execute('ANALYZE users')
+            else:
+                cursor.execute('CREATE TEMP TABLE users AS SELECT * FROM main.users WHERE 0')
+                cursor.execute(
+                    SQLITE_FILL,
+                    [rows, json.dumps(DOMAINS), json.dumps(FIRST_NAMES)] + [json.dumps(SYLLABLES)] * 4,
+                )
+
+    def _time_search(self, term, repeat):
+        """Return (matches, median ms) for a search like the admin list runs it."""
+        queryset = search_users(User.objects.order_by('-created_at'), term)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matches = queryset.count()
+            list(queryset[:20])
+            samples.append((time.perf_counter() - started) * 1000)
+        return matches, statistics.median(samples)
@@ -0,0 +1,177 @@
+"""
+Benchmark Argon2 on this host and write tuned costs for the password hasher.
+
+Memory cost starts at --max-memory and is halved until the cheapest costs
+OWASP allows at that memory fit the latency budget; time cost is then raised
+as far as the budget allows. Costs never go below OWASP's minimum for
+Argon2id, even when that exceeds the budget. Run it on the hardware that
+serves logins, then restart the workers. Users are rehashed to the new
+costs when they next log in.
+
+Usage:
+    python manage.py calibrate_argon2 --target-ms 250
+    python manage.py calibrate_argon2 --target-ms 150 --max-memory 65536 --dry-run
+"""
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import argon2
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+# OWASP's minimum Argon2id costs, as equally strong (memory_cost in KiB,
+# time_cost) pairs, highest memory first. See the OWASP Password Storage
+# Cheat Sheet; the command never chooses costs below these.
+OWASP_MIN_COSTS = [
+    (46 * 1024, 1),
+    (19 * 1024, 2),
+]
+
+# Lowest memory cost (KiB) the command will choose
+MIN_MEMORY_COST = OWASP_MIN_COSTS[-1][0]
+
+MAX_TIME_COST = 20
+
+
+def min_time_cost(memory_cost):
+    """Return the lowest time cost OWASP allows with `memory_cost` KiB."""
+    for memory, time_cost in OWASP_MIN_COSTS:
+        if memory_cost >= memory:
+            return time_cost
+    raise ValueError(f'memory_cost must be at least {MIN_MEMORY_COST} KiB')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Argon2 on this host and write hasher costs for a latency budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target-ms',
+            type=int,
+            default=250,
+            help='Latency budget for one hash, in milliseconds (default: 250)',
+        )
+        parser.add_argument(
+            '--max-memory',
+            type=int,
+            default=Argon2PasswordHasher.memory_cost,
+            help=f'Highest memory cost to try, in KiB (default: {Argon2PasswordHasher.memory_cost})',
+        )
+        parser.add_argument(
+            '--parallelism',
+            type=int,
+            default=Argon2PasswordHasher.parallelism,
+            help=f'Argon2 lanes per hash (default: {Argon2PasswordHasher.parallelism})',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=5,
+            help='Hashes timed per candidate; the median is used (default: 5)',
+        )
+        parser.add_argument(
+            '--output',
+            default=settings.PASSWORD_HASHER_PARAMS_FILE,
+            help='File to write the parameters to (default: PASSWORD_HASHER_PARAMS_FILE)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the chosen parameters without writing them',
+        )
+
+    def measure(self, time_cost, memory_cost, parallelism, samples):
+        """Return the median time of one Argon2id hash, in milliseconds."""
+        timings = []
+        for _ in range(samples):
+            started_at = time.perf_counter()
+            argon2.low_level.hash_secret_raw(
+                b'calibration-password',
+                os.urandom(16),
+                time_cost=time_cost,
+                memory_cost=memory_cost,
+                parallelism=parallelism,
+                hash_len=32,
+                type=argon2.low_level.Type.ID,
+            )
+            timings.append((time.perf_counter() - started_at) * 1000)
+        return statistics.median(timings)
+
+    def calibrate(self, target_ms, max_memory, parallelism, samples):
+        """Return (time_cost, memory_cost, measured_ms) for the budget."""
+        memory_cost = max_memory
+        while True:
+            time_cost = min_time_cost(memory_cost)
+            elapsed = self.measure(time_cost, memory_cost, parallelism, samples)
+            self.stdout.write(f'  t={time_cost} m={memory_cost} KiB: {elapsed:.1f} ms')
+            if elapsed <= target_ms or memory_cost // 2 < MIN_MEMORY_COST:
+                break
+            memory_cost //= 2
+
+        if elapsed > target_ms:
+            # Clamp to the floor rather than go below OWASP's minimum
+            self.stderr.write(self.style.WARNING(
+                f"OWASP's minimum costs (t={time_cost}, m={memory_cost} KiB) take "
+                f'{elapsed:.1f} ms, over the {target_ms} ms budget; using them anyway. '
+                f'Consider a larger budget.'
+            ))
+            return time_cost, memory_cost, elapsed
+
+        while time_cost < MAX_TIME_COST:
+            candidate = self.measure(time_cost + 1, memory_cost, parallelism, samples)
+            self.stdout.write(f'  t={time_cost + 1} m={memory_cost} KiB: {candidate:.1f} ms')
+            if candidate > target_ms:
+                break
+            time_cost += 1
+            elapsed = candidate
+
+        return time_cost, memory_cost, elapsed
+
+    def handle(self, *args, **options):
+        target_ms = options['target_ms']
+        parallelism = options['parallelism']
+        if target_ms <= 0 or parallelism <= 0 or options['samples'] <= 0:
+            raise CommandError('--target-ms, --parallelism and --samples must be positive.')
+        if options['max_memory'] < MIN_MEMORY_COST:
+            raise CommandError(f'--max-memory must be at least {MIN_MEMORY_COST} KiB.')
+
+        self.stdout.write(f'Calibrating Argon2id for {target_ms} ms per hash...')
+        time_cost, memory_cost, measured_ms = self.calibrate(
+            target_ms, options['max_memory'], parallelism, options['samples'],
+        )
+
+        params = {
+            'time_cost': time_cost,
+            'memory_cost': memory_cost,
+            'parallelism': parallelism,
+            'measured_ms': round(measured_ms, 1),
+            'target_ms': target_ms,
+            'host': platform.node(),
+            'calibrated_at': timezone.now().isoformat(),
+        }
+        document = json.dumps(params, indent=2)
+
+        if options['dry_run'] or not options['output']:
+            self.stdout.write(document)
+            return
+
+        # Write to a temp file and rename so workers never read a partial file
+        output = options['output']
+        directory = os.path.dirname(os.path.abspath(output))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(document)
+        os.replace(tmp_path, output)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote time_cost={time_cost}, memory_cost={memory_cost} KiB, '
+            f'parallelism={parallelism} ({measured_ms:.1f} ms) to {output}. '
+            f'Restart the workers to apply.'
+        ))
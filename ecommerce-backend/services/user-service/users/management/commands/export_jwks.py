@@ -0,0 +1,44 @@
+"""
+Export the public JWT key set (JWKS) to a file.
+
+Services that load their key set from a local file (MICROSERVICE_AUTH
+'JWKS_FILE') pick up the new file without a restart.
+
+Usage:
+    python manage.py export_jwks --output /shared/keys/jwks.json
+"""
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from users.keys import get_public_jwks
+
+
+class Command(BaseCommand):
+    help = 'Export the public JWT verification keys as a JWKS document.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='File to write the key set to (defaults to stdout)',
+        )
+
+    def handle(self, *args, **options):
+        document = json.dumps(get_public_jwks(), indent=2)
+        output = options['output']
+
+        if not output:
+            self.stdout.write(document)
+            return
+
+        # Write to a temp file and rename so readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(output))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(document)
+        os.replace(tmp_path, output)
+
+        key_count = len(get_public_jwks()['keys'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {key_count} key(s) to {output}'))
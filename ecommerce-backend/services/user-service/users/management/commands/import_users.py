@@ -0,0 +1,85 @@
+"""
+Bulk import users from a CSV or NDJSON file (see users/transfer.py).
+
+Records use the export format: email, first_name, last_name and optionally
+phone_number, is_active, is_verified, roles (';'-separated in CSV, a list
+in NDJSON; default CUSTOMER) and either password (plain text, hashed on
+import) or password_hash (an existing hash in Django's format, imported as
+is). Without either, the user gets an unusable password and must reset it.
+
+Each chunk is committed on its own, so an interrupted import can be re-run:
+users already imported are reported as duplicates and skipped.
+
+Usage:
+    python manage.py import_users users.csv
+    python manage.py import_users legacy.ndjson --workers 8 --errors-file errors.ndjson
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.transfer import UserImporter, read_csv, read_ndjson
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--input-format',
+            choices=sorted(READERS),
+            help='File format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Records validated and written per transaction (default USER_IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Password hashing threads (default USER_IMPORT_HASH_WORKERS)',
+        )
+        parser.add_argument(
+            '--errors-file',
+            help='Write rejected records as NDJSON to this file',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input_format'] or path.rsplit('.', 1)[-1].lower()
+        if input_format not in READERS:
+            raise CommandError('Cannot tell the file format; pass --input-format.')
+        for name in ('chunk_size', 'workers'):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive.')
+
+        importer = UserImporter(options['chunk_size'], options['workers'])
+        errors_file = open(options['errors_file'], 'w') if options['errors_file'] else None
+
+        created = failed = 0
+        started = time.perf_counter()
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                for result in importer.run(READERS[input_format](file)):
+                    created += result.created
+                    failed += len(result.errors)
+                    for number, email, errors in result.errors:
+                        if errors_file:
+                            errors_file.write(json.dumps({'record': number, 'email': email, 'errors': errors}) + '\n')
+                        else:
+                            self.stderr.write(f'Record {number} ({email}): {json.dumps(errors)}')
+                    rate = created / max(time.perf_counter() - started, 1e-9)
+                    self.stdout.write(f'{created} imported, {failed} rejected ({rate:.0f} users/s)')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {created} imported, {failed} rejected.'))
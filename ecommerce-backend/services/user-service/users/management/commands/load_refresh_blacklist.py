@@ -0,0 +1,38 @@
+"""
+Copy unexpired blacklisted refresh tokens from SimpleJWT's tables into the
+configured blacklist backend.
+
+Run it when switching REFRESH_BLACKLIST_BACKEND away from the database, so
+refresh tokens rotated or logged out before the switch stay unusable until
+they expire.
+
+Usage:
+    REFRESH_BLACKLIST_BACKEND=users.blacklist.CacheBlacklistBackend \
+        python manage.py load_refresh_blacklist
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from users.blacklist import DatabaseBlacklistBackend, get_blacklist_backend
+
+
+class Command(BaseCommand):
+    help = 'Copy unexpired blacklisted refresh tokens into the configured blacklist backend.'
+
+    def handle(self, *args, **options):
+        backend = get_blacklist_backend()
+        if isinstance(backend, DatabaseBlacklistBackend):
+            raise CommandError('REFRESH_BLACKLIST_BACKEND is the database backend; nothing to copy.')
+
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list('token__jti', 'token__expires_at')
+
+        count = 0
+        for jti, expires_at in rows.iterator(chunk_size=2000):
+            backend.add({api_settings.JTI_CLAIM: jti, 'exp': expires_at.timestamp()})
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Copied {count} blacklisted refresh token(s).'))
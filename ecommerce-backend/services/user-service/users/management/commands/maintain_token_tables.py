@@ -0,0 +1,56 @@
+"""
+Maintain the password reset and email verification token tables.
+
+On PostgreSQL, creates the daily partitions for the coming days and drops
+partitions whose tokens have all expired. On other databases, deletes
+expired tokens in batches. Run it at least daily (e.g. from cron).
+
+Usage:
+    python manage.py maintain_token_tables
+    python manage.py maintain_token_tables --days-ahead 14 --batch-size 10000
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from users.models import EmailVerificationToken, PasswordResetToken
+from users.partitions import cleanup_expired_tokens, create_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming token table partitions and remove expired tokens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days-ahead',
+            type=int,
+            default=settings.TOKEN_PARTITION_DAYS_AHEAD,
+            help='Days of partitions to create ahead of today (PostgreSQL only)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TOKEN_CLEANUP_BATCH_SIZE,
+            help='Rows per DELETE when expired tokens are deleted row by row',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to maintain (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        if options['days_ahead'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days-ahead and --batch-size must be positive.')
+
+        using = options['database']
+        for model in (PasswordResetToken, EmailVerificationToken):
+            table = model._meta.db_table
+
+            if is_partitioned(table, using):
+                created = create_partitions(table, options['days_ahead'], using=using)
+                if created:
+                    self.stdout.write(f'{table}: created {len(created)} partition(s)')
+
+            removed = cleanup_expired_tokens(model, options['batch_size'], using)
+            self.stdout.write(self.style.SUCCESS(f'{table}: removed {removed} expired token(s)'))
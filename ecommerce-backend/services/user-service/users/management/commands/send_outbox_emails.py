@@ -0,0 +1,62 @@
+"""
+Send the emails queued in the outbox (see users/outbox.py).
+
+By default, sends every email that is due and exits, which suits cron.
+With --loop, keeps polling for new emails, which suits a worker container.
+
+Usage:
+    python manage.py send_outbox_emails
+    python manage.py send_outbox_emails --loop --interval 5
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Send the emails queued in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Emails sent per connection',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new emails instead of exiting when none are due',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when no emails are due (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = deliver_batch(batch_size)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+
+                if sent + failed < batch_size:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total_sent} sent, {total_failed} failed.'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_emailverificationtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedAccessToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(help_text='JWT ID of the revoked access token', max_length=255, unique=True)),
+                ('expires_at', models.DateTimeField(help_text='When the revoked token would have expired')),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, help_text='Revocation timestamp')),
+            ],
+            options={
+                'verbose_name': 'Revoked Access Token',
+                'verbose_name_plural': 'Revoked Access Tokens',
+                'db_table': 'revoked_access_tokens',
+                'ordering': ['-revoked_at'],
+                'indexes': [models.Index(fields=['revoked_at'], name='revoked_acc_revoked_6617c3_idx'), models.Index(fields=['expires_at'], name='revoked_acc_expires_8d66f6_idx')],
+            },
+        ),
+    ]
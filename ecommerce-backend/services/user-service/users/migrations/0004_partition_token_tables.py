@@ -0,0 +1,111 @@
+"""
+Partition the password reset and email verification token tables by
+expires_at on PostgreSQL (see users/partitions.py).
+
+Unique constraints on a partitioned table must include the partition key,
+so `token` first becomes unique per (token, expires_at), on every database.
+
+Each table is then rebuilt as a partitioned table with a default partition
+and daily partitions for the next TOKEN_PARTITION_DAYS_AHEAD days, and
+primary key (id, expires_at). Existing rows are copied over; rows outside
+the daily partitions land in the default partition and are removed by the
+next cleanup. Secondary indexes and unique and foreign key constraints are
+recreated under their original names. Other databases keep plain tables.
+"""
+from django.conf import settings
+from django.db import migrations, models
+
+from users.partitions import create_partitions, default_partition_name
+
+
+# Token fields without unique=True, and the constraints replacing it
+TOKEN_FIELDS = {
+    'passwordresettoken': models.CharField(max_length=255, help_text='Reset token'),
+    'emailverificationtoken': models.CharField(max_length=64, help_text='Unique verification token'),
+}
+
+CONSTRAINTS = {
+    'passwordresettoken': models.UniqueConstraint(
+        fields=['token', 'expires_at'], name='password_reset_tokens_token_expires_uniq',
+    ),
+    'emailverificationtoken': models.UniqueConstraint(
+        fields=['token', 'expires_at'], name='email_verification_tokens_token_expires_uniq',
+    ),
+}
+
+
+def _partition_table(schema_editor, table, days_ahead):
+    quote = schema_editor.quote_name
+    old_table = f'{table}_unpartitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        # Capture non-unique indexes, and unique and foreign key constraints,
+        # before the rename, so their definitions still name the original table
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisunique",
+            [table],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('u', 'f')",
+            [table],
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old_table)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(old_table)} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (expires_at)'
+        )
+        cursor.execute(
+            f'CREATE TABLE {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT'
+        )
+
+    create_partitions(table, days_ahead, using=schema_editor.connection.alias)
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old_table)}')
+        cursor.execute(f'DROP TABLE {quote(old_table)}')
+
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, expires_at)')
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+
+def partition_token_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in TOKEN_FIELDS:
+        table = apps.get_model('users', model_name)._meta.db_table
+        _partition_table(schema_editor, table, settings.TOKEN_PARTITION_DAYS_AHEAD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_revokedaccesstoken'),
+    ]
+
+    operations = [
+        *(
+            migrations.AlterField(model_name=model_name, name='token', field=field)
+            for model_name, field in TOKEN_FIELDS.items()
+        ),
+        *(
+            migrations.AddConstraint(model_name=model_name, constraint=constraint)
+            for model_name, constraint in CONSTRAINTS.items()
+        ),
+        migrations.SeparateDatabaseAndState(
+            # PostgreSQL only. The models keep `id` as their primary key,
+            # since Django cannot express composite keys, so the state is
+            # unchanged. Partitioned tables serve the same models, so
+            # reversing leaves them in place.
+            database_operations=[
+                migrations.RunPython(partition_token_tables, migrations.RunPython.noop),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+"""
+Trigram indexes for the admin user search on PostgreSQL (see
+users/search.py). Other databases have no equivalent and skip this
+migration.
+
+The indexes are built CONCURRENTLY so a large users table stays writable,
+which requires running outside a transaction.
+"""
+from django.db import migrations
+
+from users.search import SEARCH_FIELDS, search_index_statements
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for statement in search_index_statements(schema_editor.connection, concurrently=True):
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(f"users_{field}_trgm")}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0005_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,67 @@
+"""
+Case-insensitive unique index on users.email.
+
+Existing emails that differ only in case must be merged or renamed first;
+the migration stops and lists them otherwise. On PostgreSQL the index is
+built CONCURRENTLY so a large users table stays writable, which requires
+running outside a transaction.
+"""
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+CONSTRAINT = models.UniqueConstraint(
+    Lower('email'),
+    name='users_email_lower_uniq',
+)
+
+
+def create_email_lower_index(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .values(email_lower=Lower('email'))
+        .annotate(count=Count('*'))
+        .filter(count__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Emails that differ only in case must be resolved before this migration: '
+            + ', '.join(duplicates)
+        )
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_email_lower_uniq ON users (LOWER(email))'
+        )
+    else:
+        schema_editor.add_constraint(User, CONSTRAINT)
+
+
+def drop_email_lower_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS users_email_lower_uniq')
+    else:
+        schema_editor.remove_constraint(apps.get_model('users', 'User'), CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0006_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_email_lower_index, drop_email_lower_index),
+            ],
+            state_operations=[
+                migrations.AddConstraint(model_name='user', constraint=CONSTRAINT),
+            ],
+        ),
+    ]
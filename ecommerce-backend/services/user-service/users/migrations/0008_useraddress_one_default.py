@@ -0,0 +1,72 @@
+"""
+At most one default address per type and user, as a partial unique index.
+
+Addresses saved concurrently could leave several defaults. Of those, the
+most recently updated one stays the default and the others are cleared
+before the index is built. On PostgreSQL the index is built CONCURRENTLY so
+the addresses table stays writable, which requires running outside a
+transaction; if a concurrent write breaks the build, drop the invalid index
+and run the migration again.
+"""
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+
+CONSTRAINT = models.UniqueConstraint(
+    fields=['user', 'address_type'],
+    condition=Q(is_default=True),
+    name='user_addresses_one_default_uniq',
+)
+
+
+def create_one_default_index(apps, schema_editor):
+    UserAddress = apps.get_model('users', 'UserAddress')
+    addresses = UserAddress.objects.using(schema_editor.connection.alias)
+
+    newer_default = addresses.filter(
+        user_id=OuterRef('user_id'),
+        address_type=OuterRef('address_type'),
+        is_default=True,
+    ).filter(
+        Q(updated_at__gt=OuterRef('updated_at'))
+        | Q(updated_at=OuterRef('updated_at'), id__gt=OuterRef('id'))
+    )
+    addresses.filter(is_default=True).filter(Exists(newer_default)).update(
+        is_default=False, updated_at=timezone.now()
+    )
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS user_addresses_one_default_uniq '
+            'ON user_addresses (user_id, address_type) WHERE is_default'
+        )
+    else:
+        schema_editor.add_constraint(UserAddress, CONSTRAINT)
+
+
+def drop_one_default_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS user_addresses_one_default_uniq')
+    else:
+        schema_editor.remove_constraint(apps.get_model('users', 'UserAddress'), CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0007_user_email_lower_unique'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_one_default_index, drop_one_default_index),
+            ],
+            state_operations=[
+                migrations.AddConstraint(model_name='useraddress', constraint=CONSTRAINT),
+            ],
+        ),
+    ]
@@ -1,11 +1,14 @@
 import uuid
 import secrets
-from datetime import timedelta
-from django.db import models
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 from django.core.validators import EmailValidator, RegexValidator
 
+from .partitions import cleanup_expired_tokens
+
 
 # ==============================================================================
 # USER MANAGER
@@ -138,6 +141,11 @@ class User(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['phone_number']),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            # Emails are unique regardless of case; registration relies on
+            # this index instead of checking first (see RegisterSerializer)
+            models.UniqueConstraint(Lower('email'), name='users_email_lower_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.email} - {self.get_full_name()}"
@@ -355,6 +363,23 @@ class UserAddress(models.Model):
             models.Index(fields=['address_type']),
             models.Index(fields=['is_default']),
         ]
+        constraints = [
+            # At most one default address per type and user, even under
+            # concurrent writes (see save())
+            models.UniqueConstraint(
+                fields=['user', 'address_type'],
+                condition=models.Q(is_default=True),
+                name='user_addresses_one_default_uniq',
+            ),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Whether the stored row is the default, so that re-saving a default
+        # address doesn't clear the others again
+        instance._stored_default = instance.__dict__.get('is_default', False)
+        return instance
     
     def __str__(self):
         return f"{self.full_name} - {self.get_address_type_display()} ({self.city})"
@@ -369,16 +394,39 @@ class UserAddress(models.Model):
         ]
         return ", ".join(filter(None, address_parts))
     
+    def clear_other_defaults(self):
+        """Unset the user's other default address of this type."""
+        # update() skips auto_now; updated_at is bumped so conditional
+        # GETs see the change
+        UserAddress.objects.filter(
+            user_id=self.user_id,
+            address_type=self.address_type,
+            is_default=True
+        ).exclude(id=self.id).update(is_default=False, updated_at=timezone.now())
+    
     def save(self, *args, **kwargs):
-        """Override save to ensure only one default address per type per user."""
-        if self.is_default:
-            # Set all other addresses of same type for this user to non-default
-            UserAddress.objects.filter(
-                user=self.user,
-                address_type=self.address_type,
-                is_default=True
-            ).exclude(id=self.id).update(is_default=False)
-        super().save(*args, **kwargs)
+        """
+        Override save to ensure only one default address per type per user.
+        
+        An address becoming the default clears the previous default first,
+        in the same transaction; an address that already was the default is
+        saved as is. If a concurrent request made another address the
+        default meanwhile, the unique constraint rejects the save, which is
+        retried once after clearing that default.
+        """
+        if not self.is_default:
+            super().save(*args, **kwargs)
+        else:
+            try:
+                with transaction.atomic():
+                    if not getattr(self, '_stored_default', False):
+                        self.clear_other_defaults()
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                with transaction.atomic():
+                    self.clear_other_defaults()
+                    super().save(*args, **kwargs)
+        self._stored_default = self.is_default
 
 
 # ==============================================================================
@@ -407,7 +455,6 @@ class PasswordResetToken(models.Model):
     
     token = models.CharField(
         max_length=255,
-        unique=True,
         help_text="Reset token"
     )
     
@@ -435,6 +482,11 @@ class PasswordResetToken(models.Model):
             models.Index(fields=['token']),
             models.Index(fields=['expires_at']),
         ]
+        constraints = [
+            # Unique per expiry: unique constraints on the partitioned table
+            # must include its partition key (see users/partitions.py)
+            models.UniqueConstraint(fields=['token', 'expires_at'], name='password_reset_tokens_token_expires_uniq'),
+        ]
     
     def __str__(self):
         return f"Reset token for {self.user.email} - {'Used' if self.is_used else 'Active'}"
@@ -457,12 +509,14 @@ class PasswordResetToken(models.Model):
         self.save(update_fields=['is_used'])
     
     @classmethod
-    def cleanup_expired(cls):
-        """Delete expired tokens (call this periodically)."""
-        expired_tokens = cls.objects.filter(expires_at__lt=timezone.now())
-        count = expired_tokens.count()
-        expired_tokens.delete()
-        return count
+    def cleanup_expired(cls, batch_size=None):
+        """
+        Remove expired tokens (call this periodically).
+        
+        Drops expired partitions on PostgreSQL, otherwise deletes in batches
+        (see users/partitions.py).
+        """
+        return cleanup_expired_tokens(cls, batch_size)
 
 
 # ==============================================================================
@@ -490,7 +544,6 @@ class EmailVerificationToken(models.Model):
     
     token = models.CharField(
         max_length=64,
-        unique=True,
         help_text="Unique verification token"
     )
     
@@ -524,6 +577,11 @@ class EmailVerificationToken(models.Model):
             models.Index(fields=['token']),
             models.Index(fields=['expires_at']),
         ]
+        constraints = [
+            # Unique per expiry: unique constraints on the partitioned table
+            # must include its partition key (see users/partitions.py)
+            models.UniqueConstraint(fields=['token', 'expires_at'], name='email_verification_tokens_token_expires_uniq'),
+        ]
     
     def __str__(self):
         return f"Verification token for {self.user.email} - {'Used' if self.is_used else 'Active'}"
@@ -547,10 +605,144 @@ class EmailVerificationToken(models.Model):
         self.used_at = timezone.now()
         self.save(update_fields=['is_used', 'used_at'])
     
+    @classmethod
+    def cleanup_expired(cls, batch_size=None):
+        """
+        Remove expired tokens (call this periodically).
+        
+        Drops expired partitions on PostgreSQL, otherwise deletes in batches
+        (see users/partitions.py).
+        """
+        return cleanup_expired_tokens(cls, batch_size)
+
+
+# ==============================================================================
+# REVOKED ACCESS TOKEN MODEL
+# ==============================================================================
+
+class RevokedAccessToken(models.Model):
+    """
+    Access tokens revoked before their expiry (e.g. on logout).
+    Other services sync this list so they can reject revoked tokens
+    without calling the User Service per request.
+    """
+    
+    jti = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="JWT ID of the revoked access token"
+    )
+    
+    expires_at = models.DateTimeField(
+        help_text="When the revoked token would have expired"
+    )
+    
+    revoked_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Revocation timestamp"
+    )
+    
+    class Meta:
+        db_table = 'revoked_access_tokens'
+        verbose_name = 'Revoked Access Token'
+        verbose_name_plural = 'Revoked Access Tokens'
+        ordering = ['-revoked_at']
+        indexes = [
+            models.Index(fields=['revoked_at']),
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"Revoked token {self.jti}"
+    
+    @classmethod
+    def revoke(cls, token):
+        """
+        Revoke a validated access token.
+        
+        Args:
+            token: Access token instance (e.g. request.auth)
+        """
+        expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        cls.objects.get_or_create(
+            jti=token['jti'],
+            defaults={'expires_at': expires_at}
+        )
+    
     @classmethod
     def cleanup_expired(cls):
-        """Delete expired tokens (call this periodically)."""
-        expired_tokens = cls.objects.filter(expires_at__lt=timezone.now())
-        count = expired_tokens.count()
-        expired_tokens.delete()
-        return count
+        """Delete revocations of tokens that have expired anyway (call this periodically)."""
+        deleted, _ = cls.objects.filter(expires_at__lt=timezone.now()).delete()
+        return deleted
+
+
+# ==============================================================================
+# EMAIL OUTBOX MODEL
+# ==============================================================================
+
+class EmailOutbox(models.Model):
+    """
+    Emails queued by request handlers, in the request's transaction.
+    Delivered by `python manage.py send_outbox_emails` (see users/outbox.py),
+    so requests never wait on the mail server.
+    """
+    
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        DEAD = 'DEAD', 'Dead (gave up)'
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    
+    to_email = models.EmailField(
+        max_length=255,
+        help_text="Recipient email address"
+    )
+    
+    subject = models.CharField(max_length=255)
+    
+    body = models.TextField(help_text="Plain text body")
+    
+    html_body = models.TextField(
+        blank=True,
+        default='',
+        help_text="HTML alternative body"
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Failed delivery attempts so far"
+    )
+    
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time of the next delivery attempt"
+    )
+    
+    last_error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Email Outbox'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
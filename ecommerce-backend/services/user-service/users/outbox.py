@@ -0,0 +1,142 @@
+"""
+Transactional email outbox.
+
+Request handlers queue emails with `enqueue_email()`, which writes an
+EmailOutbox row in the request's transaction: a rolled-back request sends
+nothing, and a committed one never waits on the mail server.
+
+`python manage.py send_outbox_emails` delivers them with `deliver_batch()`,
+one connection per batch. Failed emails are retried with exponential
+backoff and, after EMAIL_OUTBOX_MAX_ATTEMPTS, marked DEAD for inspection in
+the Django admin. Delivery is at least once: an email sent by a worker that
+dies before recording it is sent again once its lease expires.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(to_email, subject, body, html_body=''):
+    """
+    Queue an email for delivery by the outbox worker.
+
+    Args:
+        to_email (str): Recipient email address
+        subject (str): Subject line
+        body (str): Plain text body
+        html_body (str): HTML alternative body
+
+    Returns:
+        The EmailOutbox row
+    """
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+    )
+
+
+def _claim_batch(batch_size):
+    """
+    Lock up to `batch_size` due emails and push their next attempt past the
+    lease, so concurrent workers skip them while they are being sent.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+            )
+    return batch
+
+
+def _record_failure(email, error):
+    """Schedule a retry of a failed email, or mark it dead after the last attempt."""
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailOutbox.Status.DEAD
+        logger.error("Giving up on email %s to %s: %s", email.pk, email.to_email, email.last_error)
+    else:
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning("Email %s to %s failed, retrying in %ds: %s", email.pk, email.to_email, delay, email.last_error)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to_email],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def deliver_batch(batch_size=None):
+    """
+    Send one batch of due emails over a single connection.
+
+    Args:
+        batch_size (int): Emails per batch (default EMAIL_OUTBOX_BATCH_SIZE)
+
+    Returns:
+        (number sent, number failed)
+    """
+    batch = _claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        for email in batch:
+            _record_failure(email, exc)
+        return 0, len(batch)
+
+    sent_ids = []
+    try:
+        for email in batch:
+            try:
+                _build_message(email, connection).send()
+            except Exception as exc:
+                _record_failure(email, exc)
+                # The connection may be broken; reconnect for the rest of the
+                # batch. If that fails too, each send opens its own.
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    if sent_ids:
+        EmailOutbox.objects.filter(pk__in=sent_ids).update(
+            status=EmailOutbox.Status.SENT,
+            sent_at=timezone.now(),
+            last_error='',
+        )
+    return len(sent_ids), len(batch) - len(sent_ids)
@@ -0,0 +1,216 @@
+"""
+Pagination for large listings.
+
+`KeysetPagination` pages by the values of the last row seen instead of an
+OFFSET. A page is one indexed range scan, `WHERE (created_at, id) < (...)`
+in the default case, however deep it is. No total count is computed.
+
+`ApproximateCountPaginator` replaces the COUNT(*) of page number pagination
+with PostgreSQL's table statistics for unfiltered listings of large tables
+(see PAGINATION_APPROXIMATE_COUNT_THRESHOLD).
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# ==============================================================================
+# APPROXIMATE COUNTS
+# ==============================================================================
+
+def approximate_count(queryset):
+    """
+    Estimate the number of rows of an unfiltered queryset from the table
+    statistics kept by PostgreSQL's ANALYZE.
+
+    Returns:
+        The estimate, or None if the queryset is filtered, the database is
+        not PostgreSQL, or the table is smaller than
+        PAGINATION_APPROXIMATE_COUNT_THRESHOLD (0 disables estimates)
+    """
+    threshold = settings.PAGINATION_APPROXIMATE_COUNT_THRESHOLD
+    connection = connections[queryset.db]
+    if not threshold or queryset.query.where or connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+
+    # reltuples is -1 for tables never analyzed
+    if row is None or row[0] < threshold:
+        return None
+    return int(row[0])
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator that uses `approximate_count()` when it applies."""
+
+    @cached_property
+    def count(self):
+        estimate = approximate_count(self.object_list)
+        return estimate if estimate is not None else super().count
+
+
+# ==============================================================================
+# KEYSET PAGINATION
+# ==============================================================================
+
+def _encode_value(value):
+    # Full precision: a cursor rounded to milliseconds would skip or repeat rows
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the queryset's ordering plus the primary key.
+
+    The ordering fields must be non-null columns or annotations (e.g.
+    `-created_at`); the primary key is appended to break ties. Responses
+    carry `next` and `previous` links and an approximate `count` when one
+    is available, otherwise null.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Return [(field, descending), ...] ending with the primary key."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            raise ImproperlyConfigured('KeysetPagination needs a queryset ordered by field names.')
+
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        pk_name = queryset.model._meta.pk.name
+        if fields[-1][0] not in ('pk', pk_name):
+            fields.append((pk_name, fields[-1][1]))
+        return fields
+
+    def get_output_field(self, queryset, name):
+        """Return the model field or annotation output field ordered by."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        try:
+            return queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f'KeysetPagination cannot order by {name!r}.')
+
+    def encode_cursor(self, row, reverse):
+        values = [getattr(row, field) for field, _ in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, default=_encode_value)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return (values, reverse), or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Parsed here, so a forged value of the wrong type is a bad cursor
+        # rather than an error in the query
+        try:
+            values = [field.to_python(value) for field, value in zip(self.output_fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _after(self, values, reverse):
+        """Filter for rows after `values` in the (possibly reversed) ordering."""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        self.output_fields = [self.get_output_field(queryset, field) for field, _ in self.ordering]
+        self.base_url = request.build_absolute_uri()
+        self.count = approximate_count(queryset)
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[1]
+        if cursor is not None:
+            queryset = queryset.filter(self._after(*cursor))
+
+        order_by = [
+            f'{"-" if descending != reverse else ""}{field}'
+            for field, descending in self.ordering
+        ]
+        rows = list(queryset.order_by(*order_by)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Reading backwards, the page we came from is next; reading forwards,
+        # the page we came from (if any) is previous
+        self.next_link = self.previous_link = None
+        if rows and (reverse or has_more):
+            self.next_link = self.encode_cursor(rows[-1], reverse=False)
+        if rows and (has_more if reverse else cursor is not None):
+            self.previous_link = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
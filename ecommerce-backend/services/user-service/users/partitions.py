@@ -0,0 +1,214 @@
+"""
+Expiry maintenance for the password reset and email verification token tables.
+
+On PostgreSQL these tables are range-partitioned by `expires_at`, one
+partition per day (see migration 0004). Expired tokens are removed by
+dropping whole partitions, which takes the same time however many rows
+they hold and leaves no dead rows behind. Partitions are detached with a
+plain DETACH, since PostgreSQL refuses DETACH CONCURRENTLY on a table with a
+default partition; it locks the parent table only for as long as the
+catalog update takes. Partitions are created ahead of time by
+`manage.py maintain_token_tables`; a default partition catches any row
+outside them.
+
+Other databases keep plain tables, and expired rows are deleted in
+batches of TOKEN_CLEANUP_BATCH_SIZE so no single statement locks or
+rewrites a large part of the table.
+
+PostgreSQL requires unique constraints on a partitioned table to include
+the partition key, so `token` is unique per (token, expires_at) on every
+database (see the models' constraints). Tokens are 32 random bytes, so this
+does not weaken them in practice. On PostgreSQL the primary key is also
+(id, expires_at); the models keep `id` as their primary key, since Django
+cannot express composite keys, and ids are random UUIDs.
+"""
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Tables partitioned by expires_at
+PARTITIONED_TABLES = ('password_reset_tokens', 'email_verification_tokens')
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def _today():
+    return timezone.now().astimezone(dt_timezone.utc).date()
+
+
+def partition_name(table, day):
+    """Return the name of a table's partition for a day (e.g. tokens_p20240131)."""
+    return f'{table}_p{day:%Y%m%d}'
+
+
+def default_partition_name(table):
+    """Return the name of a table's default partition."""
+    return f'{table}_default'
+
+
+def is_partitioned(table, using=DEFAULT_DB_ALIAS):
+    """Check if a table is a PostgreSQL partitioned table."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _partitions(table, using):
+    """Return (name, upper bound) for each daily partition of a table."""
+    prefix = f'{table}_p'
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [table],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for (name,) in rows:
+        if not name.startswith(prefix):
+            continue
+        day = datetime.strptime(name[len(prefix):], '%Y%m%d').date()
+        partitions.append((name, _day_start(day + timedelta(days=1))))
+    return partitions
+
+
+def create_partitions(table, days_ahead, start=None, using=DEFAULT_DB_ALIAS):
+    """
+    Create the daily partitions from `start` (default: today, UTC) through
+    `days_ahead` days later. Existing partitions are left alone.
+
+    PostgreSQL refuses a new partition while the default partition holds
+    rows in its range, e.g. when maintenance was skipped for a few days. So
+    each partition is created as a plain table, those rows are moved into
+    it, and it is then attached, all in one transaction.
+
+    Returns:
+        Names of the partitions created
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    start = start or _today()
+    existing = {name for name, _ in _partitions(table, using)}
+    created = []
+
+    for offset in range(days_ahead + 1):
+        day = start + timedelta(days=offset)
+        name = partition_name(table, day)
+        if name in existing:
+            continue
+        # DDL takes no bind parameters; the bounds are generated dates
+        lower = f"'{day.isoformat()} 00:00:00+00'"
+        upper = f"'{(day + timedelta(days=1)).isoformat()} 00:00:00+00'"
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {quote(default_partition_name(table))} '
+                f'WHERE expires_at >= {lower} AND expires_at < {upper} RETURNING *) '
+                f'INSERT INTO {quote(name)} SELECT * FROM moved'
+            )
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+                f'FOR VALUES FROM ({lower}) TO ({upper})'
+            )
+        created.append(name)
+    return created
+
+
+def drop_expired_partitions(table, now=None, using=DEFAULT_DB_ALIAS):
+    """
+    Detach and drop the partitions whose whole range has expired.
+
+    Returns:
+        (names of partitions dropped, estimated number of rows dropped)
+    """
+    connection = connections[using]
+    now = now or timezone.now()
+    names = [name for name, upper in _partitions(table, using) if upper <= now]
+    if not names:
+        return [], 0
+
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0) FROM pg_class WHERE relname = ANY(%s)",
+            [names],
+        )
+        estimated_rows = int(cursor.fetchone()[0])
+        for name in names:
+            cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+            cursor.execute(f'DROP TABLE {quote(name)}')
+    return names, estimated_rows
+
+
+def delete_expired_in_batches(queryset, batch_size=None):
+    """
+    Delete the rows of `queryset` in primary key batches.
+
+    Each batch is a single DELETE by primary key, so locks are short and
+    held on at most `batch_size` rows at a time.
+
+    Returns:
+        Number of rows deleted
+    """
+    batch_size = batch_size or settings.TOKEN_CLEANUP_BATCH_SIZE
+    rows = queryset.model._base_manager.using(queryset.db)
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _ = rows.filter(pk__in=pks).delete()
+        deleted += count
+        if len(pks) < batch_size:
+            return deleted
+
+
+def cleanup_expired_tokens(model, batch_size=None, using=DEFAULT_DB_ALIAS):
+    """
+    Remove a token model's expired rows.
+
+    Partitioned tables drop their expired partitions, then delete expired
+    rows left in the default partition in batches. Other tables delete
+    expired rows in batches.
+
+    Returns:
+        Number of rows removed (estimated for dropped partitions)
+    """
+    now = timezone.now()
+    table = model._meta.db_table
+    expired = model._base_manager.using(using).filter(expires_at__lt=now)
+
+    if not is_partitioned(table, using):
+        return delete_expired_in_batches(expired, batch_size)
+
+    dropped, estimated_rows = drop_expired_partitions(table, now, using)
+    if dropped:
+        logger.info("Dropped %d expired partition(s) of %s", len(dropped), table)
+
+    # Rows expired before today can now only be in the default partition,
+    # which partition pruning limits this query to. Today's expired rows
+    # are dropped with today's partition tomorrow.
+    estimated_rows += delete_expired_in_batches(
+        expired.filter(expires_at__lt=_day_start(_today())),
+        batch_size,
+    )
+    return estimated_rows
@@ -0,0 +1,103 @@
+"""
+Process-wide registry of role ids by name.
+
+Roles are a handful of rows that almost never change, yet registration and
+every admin role call used to look them up by name. The registry loads all
+of them with one query and keeps the name -> id map in memory.
+
+The signals in users/signals.py reset it when a role is saved or deleted in
+this process. Other processes pick up changes after ROLE_REGISTRY_TIMEOUT
+seconds, and reload early when asked for a name they do not know, so a role
+created elsewhere is usable right away. Reloads hold a lock, so threads
+that find the registry stale at once query for it only once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import UserRole
+
+
+# Minimum seconds between reloads triggered by unknown names, so lookups
+# of a role that really does not exist don't query on every call
+_MISS_RELOAD_INTERVAL = 1.0
+
+_role_ids = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _load():
+    """Reload the registry. Callers hold _lock."""
+    global _role_ids, _loaded_at
+    _role_ids = dict(UserRole.objects.values_list('name', 'id'))
+    _loaded_at = time.monotonic()
+    return _role_ids
+
+
+def _is_stale(role_ids):
+    return role_ids is None or time.monotonic() - _loaded_at > settings.ROLE_REGISTRY_TIMEOUT
+
+
+def _registry():
+    role_ids = _role_ids
+    if _is_stale(role_ids):
+        with _lock:
+            # Another thread may have reloaded while this one waited
+            role_ids = _role_ids
+            if _is_stale(role_ids):
+                role_ids = _load()
+    return role_ids
+
+
+def get_role_id(name):
+    """
+    Return the id of the role with the given name.
+
+    Args:
+        name: Role name (e.g., 'CUSTOMER')
+
+    Returns:
+        The role's id, or None if there is no such role
+    """
+    role_ids = _registry()
+    if name not in role_ids and time.monotonic() - _loaded_at > _MISS_RELOAD_INTERVAL:
+        with _lock:
+            role_ids = _role_ids
+            if role_ids is None or (
+                name not in role_ids and time.monotonic() - _loaded_at > _MISS_RELOAD_INTERVAL
+            ):
+                role_ids = _load()
+    return role_ids.get(name)
+
+
+def get_role_ids():
+    """Return a copy of the name -> id map of all roles."""
+    return dict(_registry())
+
+
+def ensure_role(name, description=''):
+    """
+    Return the id of the role with the given name, creating it if needed.
+
+    Replaces `UserRole.objects.get_or_create()` for callers that only need
+    the id: no query once the role is known.
+    """
+    role_id = get_role_id(name)
+    if role_id is None:
+        role, _ = UserRole.objects.get_or_create(name=name, defaults={'description': description})
+        role_id = role.id
+    return role_id
+
+
+def _reset():
+    global _role_ids
+    _role_ids = None
+
+
+def reset_role_registry():
+    """Drop the registry now and again once the current transaction commits."""
+    _reset()
+    transaction.on_commit(_reset)
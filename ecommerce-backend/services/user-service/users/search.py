@@ -0,0 +1,72 @@
+"""
+Admin user search.
+
+`search_users()` matches a term against email, first name, last name and
+phone number (case-insensitive substring, as before) and ranks the results:
+exact email match first, then email prefix, then name or phone prefix, then
+any other match.
+
+On PostgreSQL, Django compiles `icontains` to `UPPER(column::text) LIKE
+UPPER(%s)`. Migration 0006 adds a pg_trgm GIN index on UPPER(column) for
+each searched column, so these `LIKE '%term%'` filters use bitmap index
+scans instead of a sequential scan over `users`. Terms shorter than three
+characters have no trigrams and still scan. Other databases run the same
+query without the indexes.
+
+Benchmark with `python manage.py benchmark_user_search`.
+"""
+from django.db.models import Case, IntegerField, Q, Value, When
+
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name', 'phone_number')
+
+
+def search_index_statements(connection, table='users', concurrently=False):
+    """
+    Return the SQL creating the trigram search indexes on `table`.
+
+    Args:
+        connection: PostgreSQL database connection
+        table (str): Table to index
+        concurrently (bool): Build without blocking writes (not allowed
+            inside a transaction)
+    """
+    quote = connection.ops.quote_name
+    mode = ' CONCURRENTLY' if concurrently else ''
+    return [
+        f'CREATE INDEX{mode} IF NOT EXISTS {quote(f"{table}_{field}_trgm")} '
+        f'ON {quote(table)} USING gin (UPPER({quote(field)}) gin_trgm_ops)'
+        for field in SEARCH_FIELDS
+    ]
+
+
+def search_users(queryset, term):
+    """
+    Filter users matching a search term, best matches first.
+
+    Args:
+        queryset: User queryset; its ordering breaks ties within a rank
+        term (str): Search term
+
+    Returns:
+        Queryset annotated with `search_rank` (0 is best)
+    """
+    term = term.strip()
+    matches = Q()
+    for field in SEARCH_FIELDS:
+        matches |= Q(**{f'{field}__icontains': term})
+
+    return queryset.filter(matches).annotate(
+        search_rank=Case(
+            When(email__iexact=term, then=Value(0)),
+            When(email__istartswith=term, then=Value(1)),
+            When(
+                Q(first_name__istartswith=term)
+                | Q(last_name__istartswith=term)
+                | Q(phone_number__startswith=term),
+                then=Value(2),
+            ),
+            default=Value(3),
+            output_field=IntegerField(),
+        )
+    ).order_by('search_rank', *queryset.query.order_by)
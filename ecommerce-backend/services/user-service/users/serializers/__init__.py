@@ -6,6 +6,7 @@ from .auth import (
     RegisterSerializer,
     LoginSerializer,
     TokenResponseSerializer,
+    CustomTokenRefreshSerializer,
     generate_tokens_for_user,
 )
 from .profile import (
@@ -15,6 +16,7 @@ from .profile import (
 from .address import (
     UserAddressSerializer,
     UserAddressCreateSerializer,
+    UserAddressSyncSerializer,
 )
 from .password import (
     PasswordResetRequestSerializer,
@@ -30,7 +32,12 @@ from .admin import (
     AdminUserDetailSerializer,
     RoleAssignmentSerializer,
     UserStatusSerializer,
+    BulkUserActionSerializer,
     AdminCreateUserSerializer,
+    UserImportSerializer,
+)
+from .introspection import (
+    BatchIntrospectionSerializer,
 )
 
 __all__ = [
@@ -38,6 +45,7 @@ __all__ = [
     'RegisterSerializer',
     'LoginSerializer',
     'TokenResponseSerializer',
+    'CustomTokenRefreshSerializer',
     'generate_tokens_for_user',
     
     # Profile
@@ -47,6 +55,7 @@ __all__ = [
     # Address
     'UserAddressSerializer',
     'UserAddressCreateSerializer',
+    'UserAddressSyncSerializer',
     
     # Password Management
     'PasswordResetRequestSerializer',
@@ -62,5 +71,10 @@ __all__ = [
     'AdminUserDetailSerializer',
     'RoleAssignmentSerializer',
     'UserStatusSerializer',
+    'BulkUserActionSerializer',
     'AdminCreateUserSerializer',
+    'UserImportSerializer',
+    
+    # Token Introspection
+    'BatchIntrospectionSerializer',
 ]
@@ -45,8 +45,8 @@ class UserAddressCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """Create address for the authenticated user."""
-        user = self.context['request'].user
-        return UserAddress.objects.create(user=user, **validated_data)
+        user_id = self.context['request'].user.id
+        return UserAddress.objects.create(user_id=user_id, **validated_data)
     
     def validate(self, attrs):
         """Validate address data."""
@@ -56,3 +56,34 @@ class UserAddressCreateSerializer(serializers.ModelSerializer):
                 "At least one field must be provided for update."
             )
         return attrs
+
+
+class UserAddressSyncItemSerializer(UserAddressCreateSerializer):
+    """
+    One address of an address book sync. With an id, the address is
+    updated, or created under that id if the server doesn't have it yet.
+    """
+    id = serializers.UUIDField(required=False)
+    
+    class Meta(UserAddressCreateSerializer.Meta):
+        fields = ['id', *UserAddressCreateSerializer.Meta.fields]
+
+
+class UserAddressSyncSerializer(serializers.Serializer):
+    """Serializer for syncing a whole address book (see users/address_book.py)."""
+    addresses = UserAddressSyncItemSerializer(many=True, max_length=100)
+    replace = serializers.BooleanField(
+        default=False,
+        help_text="Delete the addresses missing from the list"
+    )
+    
+    def validate_addresses(self, value):
+        """Validate that ids are unique and each type has one default at most."""
+        ids = [data['id'] for data in value if data.get('id')]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each address id may appear only once.")
+        
+        default_types = [data['address_type'] for data in value if data.get('is_default')]
+        if len(default_types) != len(set(default_types)):
+            raise serializers.ValidationError("Only one address per type can be the default.")
+        return value
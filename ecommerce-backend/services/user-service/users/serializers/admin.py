@@ -2,16 +2,26 @@
 Admin-related serializers for user management.
 """
 from rest_framework import serializers
+from django.contrib.auth.hashers import identify_hasher
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
 
+from ..bulk import ACTIONS
 from ..models import User, UserRole, UserRoleMapping
+from ..roles import ensure_role, get_role_id
+from .auth import unique_violation_errors
 
 
 class AdminUserListSerializer(serializers.ModelSerializer):
-    """Serializer for listing users (admin view)."""
+    """
+    Serializer for listing users (admin view).
+    Expects users from `admin_user_queryset()`, so a page takes a fixed
+    number of queries.
+    """
     full_name = serializers.CharField(source='get_full_name', read_only=True)
     roles = serializers.SerializerMethodField()
-    address_count = serializers.SerializerMethodField()
+    # Annotated by the admin views' queryset (see views/admin.py)
+    address_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = User
@@ -23,19 +33,19 @@ class AdminUserListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'last_login']
     
     def get_roles(self, obj):
-        """Get list of role names for the user."""
+        """Get list of role names for the user (from the prefetched roles)."""
         return [role.name for role in obj.roles.all()]
-    
-    def get_address_count(self, obj):
-        """Get count of user addresses."""
-        return obj.addresses.count()
 
 
 class AdminUserDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for single user (admin view)."""
+    """
+    Detailed serializer for single user (admin view).
+    Expects a user from `admin_user_queryset()`.
+    """
     full_name = serializers.CharField(source='get_full_name', read_only=True)
     roles = serializers.SerializerMethodField()
-    address_count = serializers.SerializerMethodField()
+    # Annotated by the admin views' queryset (see views/admin.py)
+    address_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = User
@@ -56,10 +66,6 @@ class AdminUserDetailSerializer(serializers.ModelSerializer):
             }
             for role in obj.roles.all()
         ]
-    
-    def get_address_count(self, obj):
-        """Get count of user addresses."""
-        return obj.addresses.count()
 
 
 class RoleAssignmentSerializer(serializers.Serializer):
@@ -71,13 +77,57 @@ class RoleAssignmentSerializer(serializers.Serializer):
     
     def validate_role_name(self, value):
         """Validate that role exists."""
-        try:
-            UserRole.objects.get(name=value)
-        except UserRole.DoesNotExist:
+        if get_role_id(value) is None:
             raise serializers.ValidationError(f"Role '{value}' does not exist.")
         return value
 
 
+class BulkUserFilterSerializer(serializers.Serializer):
+    """Admin user list filters selecting the targets of a bulk action."""
+    is_active = serializers.BooleanField(required=False)
+    is_verified = serializers.BooleanField(required=False)
+    role = serializers.ChoiceField(
+        choices=[choice[0] for choice in UserRole.RoleChoices.choices],
+        required=False
+    )
+    search = serializers.CharField(required=False)
+
+
+class BulkUserActionSerializer(serializers.Serializer):
+    """
+    Serializer for bulk admin actions (see users/bulk.py).
+    Targets are given either as user ids or as list filters.
+    """
+    action = serializers.ChoiceField(choices=ACTIONS)
+    role_name = serializers.ChoiceField(
+        choices=[choice[0] for choice in UserRole.RoleChoices.choices],
+        required=False
+    )
+    user_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+        max_length=10000
+    )
+    filter = BulkUserFilterSerializer(required=False)
+    
+    def validate(self, attrs):
+        """Validate the targets and that role actions name an existing role."""
+        if ('user_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either user_ids or filter, not both.")
+        if 'filter' in attrs and not attrs['filter']:
+            # An empty filter would select every user
+            raise serializers.ValidationError({'filter': ["Provide at least one filter."]})
+        
+        if attrs['action'] in ('add_role', 'remove_role'):
+            role_name = attrs.get('role_name')
+            if not role_name:
+                raise serializers.ValidationError({'role_name': ["This field is required for role actions."]})
+            if get_role_id(role_name) is None:
+                raise serializers.ValidationError({'role_name': [f"Role '{role_name}' does not exist."]})
+        return attrs
+
+
 class UserStatusSerializer(serializers.Serializer):
     """Serializer for activating/deactivating users."""
     is_active = serializers.BooleanField(required=True)
@@ -111,23 +161,83 @@ class AdminCreateUserSerializer(serializers.ModelSerializer):
         """Create user with specified roles."""
         roles_data = validated_data.pop('roles', ['CUSTOMER'])
         
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            phone_number=validated_data.get('phone_number'),
-            is_active=validated_data.get('is_active', True),
-            is_verified=validated_data.get('is_verified', False),
-            is_staff=validated_data.get('is_staff', False),
-        )
+        try:
+            # Savepoint: the unique validators miss emails differing in case
+            # and concurrent inserts, which the database rejects
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=validated_data['email'],
+                    password=validated_data['password'],
+                    first_name=validated_data['first_name'],
+                    last_name=validated_data['last_name'],
+                    phone_number=validated_data.get('phone_number'),
+                    is_active=validated_data.get('is_active', True),
+                    is_verified=validated_data.get('is_verified', False),
+                    is_staff=validated_data.get('is_staff', False),
+                )
+        except IntegrityError as exc:
+            errors = unique_violation_errors(exc)
+            if errors is None:
+                raise
+            raise serializers.ValidationError(errors)
         
         # Assign roles
-        for role_name in roles_data:
-            role, _ = UserRole.objects.get_or_create(
-                name=role_name,
-                defaults={'description': f'{role_name} role'}
-            )
-            user.roles.add(role)
+        user.roles.add(*[
+            ensure_role(role_name, f'{role_name} role')
+            for role_name in roles_data
+        ])
         
         return user
+
+
+class UserImportSerializer(serializers.Serializer):
+    """
+    One user record of a bulk import (see users/transfer.py).
+    Uniqueness of email and phone number is checked per chunk by the
+    importer, not per record.
+    """
+    email = serializers.EmailField(max_length=255)
+    first_name = serializers.CharField(max_length=100)
+    last_name = serializers.CharField(max_length=100)
+    phone_number = serializers.CharField(
+        max_length=20,
+        required=False,
+        allow_null=True,
+        validators=User._meta.get_field('phone_number').validators
+    )
+    is_active = serializers.BooleanField(required=False, default=True)
+    is_verified = serializers.BooleanField(required=False, default=False)
+    password = serializers.CharField(
+        required=False,
+        allow_null=True,
+        trim_whitespace=False,
+        write_only=True
+    )
+    password_hash = serializers.CharField(
+        required=False,
+        allow_null=True,
+        help_text="Existing hash in Django's format (e.g. argon2$...), imported as is"
+    )
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(
+            choices=[choice[0] for choice in UserRole.RoleChoices.choices]
+        ),
+        required=False,
+        default=['CUSTOMER']
+    )
+    
+    def validate_password_hash(self, value):
+        """Validate that the hash is in a format Django can verify."""
+        if value:
+            try:
+                identify_hasher(value)
+            except ValueError:
+                raise serializers.ValidationError("Unrecognized password hash format.")
+        return value
+    
+    def validate(self, attrs):
+        """Validate that at most one of password and password_hash is given."""
+        if attrs.get('password') and attrs.get('password_hash'):
+            raise serializers.ValidationError("Provide either password or password_hash, not both.")
+        return attrs
+
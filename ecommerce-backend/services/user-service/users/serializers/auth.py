@@ -4,16 +4,47 @@ Handles user registration, login, and token generation.
 """
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
 from django.contrib.auth.password_validation import validate_password
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
-from ..models import User, UserRole
-from ..tokens import generate_tokens_with_roles
+from ..models import User, UserRole, UserRoleMapping
+from ..roles import ensure_role
+from ..tokens import CustomRefreshToken, generate_tokens_with_roles
+
+
+def unique_violation_errors(exc):
+    """
+    Map an IntegrityError from inserting a user to validation errors.
+    
+    Args:
+        exc: IntegrityError raised by the users table's unique indexes
+        
+    Returns:
+        Dict of field errors, or None if the error is not a known unique violation
+    """
+    # PostgreSQL reports the index name (the message also holds the values);
+    # SQLite names the column or the index in the message
+    diag = getattr(exc.__cause__, 'diag', None)
+    message = getattr(diag, 'constraint_name', None) or str(exc)
+    if 'phone_number' in message:
+        return {'phone_number': ["A user with this phone number already exists."]}
+    if 'email' in message:
+        return {'email': ["A user with this email already exists."]}
+    return None
 
 
 class RegisterSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration.
     Validates input and creates new user with CUSTOMER role.
+    
+    Email and phone number uniqueness is not checked up front: the user is
+    inserted and a unique index violation is reported with the same
+    messages, which is also safe against concurrent sign-ups.
     """
     password = serializers.CharField(
         write_only=True,
@@ -36,6 +67,9 @@ class RegisterSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'first_name': {'required': True},
             'last_name': {'required': True},
+            # Without the UniqueValidators ModelSerializer would add
+            'email': {'validators': []},
+            'phone_number': {'validators': User._meta.get_field('phone_number').validators},
         }
     
     def validate(self, attrs):
@@ -47,43 +81,38 @@ class RegisterSerializer(serializers.ModelSerializer):
         return attrs
     
     def validate_email(self, value):
-        """Validate email uniqueness (case-insensitive)."""
-        if User.objects.filter(email__iexact=value).exists():
-            raise serializers.ValidationError(
-                "A user with this email already exists."
-            )
+        """Normalize email (uniqueness is enforced case-insensitively by the database)."""
         return value.lower()
     
-    def validate_phone_number(self, value):
-        """Validate phone number uniqueness if provided."""
-        if value and User.objects.filter(phone_number=value).exists():
-            raise serializers.ValidationError(
-                "A user with this phone number already exists."
-            )
-        return value
-    
     def create(self, validated_data):
         """
         Create user with hashed password and assign CUSTOMER role.
+        
+        Raises:
+            ValidationError: If the email or phone number is taken
         """
         # Remove password_confirm as it's not needed for user creation
         validated_data.pop('password_confirm')
         
-        # Create user with hashed password
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            phone_number=validated_data.get('phone_number'),
-        )
-        
         # Assign CUSTOMER role by default
-        customer_role, created = UserRole.objects.get_or_create(
-            name=UserRole.RoleChoices.CUSTOMER,
-            defaults={'description': 'Regular customer'}
-        )
-        user.roles.add(customer_role)
+        customer_role_id = ensure_role(UserRole.RoleChoices.CUSTOMER, 'Regular customer')
+        
+        try:
+            # Savepoint, so a duplicate leaves the request's transaction usable
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=validated_data['email'],
+                    password=validated_data['password'],
+                    first_name=validated_data['first_name'],
+                    last_name=validated_data['last_name'],
+                    phone_number=validated_data.get('phone_number') or None,
+                )
+                UserRoleMapping.objects.create(user=user, role_id=customer_role_id)
+        except IntegrityError as exc:
+            errors = unique_violation_errors(exc)
+            if errors is None:
+                raise
+            raise serializers.ValidationError(errors)
         
         return user
 
@@ -147,6 +176,46 @@ class TokenResponseSerializer(serializers.Serializer):
         return UserSerializer(obj.get('user')).data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that verifies and re-issues tokens through
+    CustomRefreshToken, so rotated tokens carry the signing key's `kid`.
+    
+    The user is loaded on every refresh: deleted or deactivated users get
+    401, and the new tokens carry the user's current active status, email
+    and roles (from the role cache), so changes take effect on the next
+    refresh.
+    """
+    token_class = CustomRefreshToken
+    
+    default_error_messages = {
+        'no_active_account': _('No active account found for the given token'),
+    }
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        refresh.set_user_claims(user)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            
+            data['refresh'] = str(refresh)
+        
+        return data
+
+
 def generate_tokens_for_user(user):
     """
     Helper function to generate JWT tokens for a user with roles.
@@ -0,0 +1,16 @@
+"""
+Token introspection serializers.
+"""
+from rest_framework import serializers
+
+
+class BatchIntrospectionSerializer(serializers.Serializer):
+    """Serializer for validating a batch of tokens in one request."""
+    MAX_TOKENS = 1000
+    
+    tokens = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=MAX_TOKENS,
+        help_text=f"Access or refresh tokens to introspect (max {MAX_TOKENS})"
+    )
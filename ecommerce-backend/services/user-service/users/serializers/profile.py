@@ -3,6 +3,7 @@ User profile-related serializers.
 Handles user profile display and updates.
 """
 from rest_framework import serializers
+from ..cache import get_user_roles
 from ..models import User
 
 
@@ -23,8 +24,8 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_active', 'is_verified', 'created_at', 'updated_at']
     
     def get_roles(self, obj):
-        """Get user roles as a list of role names."""
-        return [role.name for role in obj.roles.all()]
+        """Get user roles as a list of role names (from the role cache)."""
+        return get_user_roles(obj.id)
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,70 @@
+"""
+Signal handlers for the users app.
+
+Keep the role and profile caches (users/cache.py) in sync with role
+mappings and users, and the role registry (users/roles.py) with roles.
+Caches are invalidated right away and again once the transaction commits,
+so a request that read the old data mid-transaction cannot leave it cached.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import (
+    invalidate_user_profiles_on_commit as _invalidate_profiles,
+    invalidate_user_roles_on_commit as _invalidate_roles,
+)
+from .models import User, UserRole, UserRoleMapping
+from .roles import reset_role_registry
+from .serializers.profile import UserSerializer
+
+
+# Model fields shown in the cached profile
+_PROFILE_FIELDS = frozenset(UserSerializer.Meta.fields)
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def invalidate_roles_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Handle user.roles.add/remove/clear and role.users.add/remove/clear."""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        _invalidate_roles([instance.pk])
+    elif action == 'pre_clear':
+        # pk_set is not provided when clearing from the role side
+        _invalidate_roles(instance.users.values_list('pk', flat=True))
+    elif pk_set:
+        _invalidate_roles(pk_set)
+
+
+@receiver(post_save, sender=UserRoleMapping)
+@receiver(post_delete, sender=UserRoleMapping)
+def invalidate_roles_on_mapping_change(sender, instance, **kwargs):
+    """Handle mappings created, edited or deleted directly (e.g., in the admin)."""
+    _invalidate_roles([instance.user_id])
+
+
+@receiver(post_save, sender=UserRole)
+def invalidate_roles_on_role_change(sender, instance, created, **kwargs):
+    """A renamed role changes the cached role names of all its users."""
+    if not created:
+        _invalidate_roles(instance.users.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def reset_role_registry_on_role_change(sender, **kwargs):
+    """Keep the role registry (users/roles.py) in sync with the roles table."""
+    reset_role_registry()
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_on_user_save(sender, instance, update_fields, **kwargs):
+    """Saves of fields the profile does not show (e.g. last_login) keep it cached."""
+    if update_fields is None or not _PROFILE_FIELDS.isdisjoint(update_fields):
+        _invalidate_profiles([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_profile_on_user_delete(sender, instance, **kwargs):
+    _invalidate_profiles([instance.pk])
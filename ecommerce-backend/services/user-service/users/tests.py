@@ -1,3 +1,1884 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import JsonResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenBackendError, TokenError
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from shared.auth import (
+    MicroserviceJWTAuthentication,
+    AsyncMicroserviceJWTAuthentication,
+    IsAdminUser,
+    AsyncIsAdminUser,
+    HasAnyRole,
+    ROLE_BITS,
+    RevocationList,
+    VerifiedTokenCache,
+    compact_claims,
+    decode_many,
+    decode_roles,
+    encode_roles,
+    expand_claims,
+    get_token_cache,
+    get_user_from_token,
+    warm_up,
+)
+
+from .address_book import sync_address_book
+from .blacklist import (
+    BaseBlacklistBackend,
+    CacheBlacklistBackend,
+    DatabaseBlacklistBackend,
+    InMemoryBlacklistBackend,
+    get_blacklist_backend,
+)
+from .cache import get_user_roles, invalidate_user_profiles_on_commit
+from .checks import check_role_bits
+from .hashers import HashingPool, PasswordHashingUnavailable, get_hashing_pool
+from .keys import _split_pem_bundle, _thumbprint, get_token_backend
+from .management.commands import calibrate_argon2
+from .models import (
+    EmailOutbox,
+    EmailVerificationToken,
+    PasswordResetToken,
+    RevokedAccessToken,
+    User,
+    UserAddress,
+    UserRole,
+    UserRoleMapping,
+)
+from .partitions import cleanup_expired_tokens, create_partitions, drop_expired_partitions
+from .outbox import deliver_batch, enqueue_email
+from .roles import get_role_id, get_role_ids
+from .search import search_users
+from .serializers import RegisterSerializer
+from .transfer import UserImporter, read_csv
+from .tokens import CustomRefreshToken
+
+
+# ==============================================================================
+# SHARED AUTH UNDER WSGI AND ASGI
+# ==============================================================================
+
+class SyncAdminView(APIView):
+    """Sync DRF view, served by the WSGI handler."""
+
+    authentication_classes = [MicroserviceJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'user_id': str(request.user.id)})
+
+
+@transaction.non_atomic_requests
+async def async_admin_view(request):
+    """
+    Async view, served by the ASGI handler.
+
+    Awaits authentication and permission checks the way async view
+    frameworks do for coroutine methods. Async views cannot run inside
+    ATOMIC_REQUESTS transactions, hence non_atomic_requests.
+    """
+    try:
+        result = await AsyncMicroserviceJWTAuthentication().aauthenticate(request)
+        request.user = result[0] if result else AnonymousUser()
+        if not await AsyncIsAdminUser().ahas_permission(request, None):
+            return JsonResponse({'detail': 'Forbidden'}, status=401 if result is None else 403)
+    except APIException as e:
+        return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+    return JsonResponse({'user_id': str(request.user.id)})
+
+
+class SyncViewWithAsyncChecks(SyncAdminView):
+    """Sync DRF view given the async classes by mistake."""
+
+    authentication_classes = [AsyncMicroserviceJWTAuthentication]
+    permission_classes = [AsyncIsAdminUser]
+
+
+class MethodRolesView(APIView):
+    """View whose required roles depend on the request method."""
+
+    authentication_classes = [MicroserviceJWTAuthentication]
+    permission_classes = [HasAnyRole]
+
+    @property
+    def required_roles(self):
+        return ['ADMIN'] if self.request.method == 'POST' else ['ADMIN', 'CUSTOMER']
+
+    def get(self, request):
+        return Response({})
+
+    def post(self, request):
+        return Response({})
+
+
+urlpatterns = [
+    path('sync/', SyncAdminView.as_view()),
+    path('sync-async-checks/', SyncViewWithAsyncChecks.as_view()),
+    path('method-roles/', MethodRolesView.as_view()),
+    path('async/', async_admin_view),
+]
+
+
+class SharedAuthChecksMixin:
+    """Authentication and role checks run against both handlers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = UserRole.objects.create(name='ADMIN')
+        customer_role = UserRole.objects.create(name='CUSTOMER')
+
+        cls.admin = User.objects.create_user(email='admin@example.com', password='Passw0rd!234')
+        UserRoleMapping.objects.create(user=cls.admin, role=admin_role)
+
+        cls.customer = User.objects.create_user(email='customer@example.com', password='Passw0rd!234')
+        UserRoleMapping.objects.create(user=cls.customer, role=customer_role)
+
+    def get(self, token=None):
+        raise NotImplementedError
+
+    def test_admin_token_is_accepted(self):
+        response = self.get(str(CustomRefreshToken.for_user(self.admin).access_token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user_id'], str(self.admin.id))
+
+    def test_missing_token_is_rejected(self):
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_tampered_token_is_rejected(self):
+        token = str(CustomRefreshToken.for_user(self.admin).access_token)
+        self.assertEqual(self.get(token[:-2] + 'xx').status_code, 401)
+
+    def test_expired_token_is_rejected(self):
+        token = CustomRefreshToken.for_user(self.admin).access_token
+        token.set_exp(lifetime=-timedelta(minutes=1))
+        self.assertEqual(self.get(str(token)).status_code, 401)
+
+    def test_missing_role_is_forbidden(self):
+        response = self.get(str(CustomRefreshToken.for_user(self.customer).access_token))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(JWT_CLAIM_PROFILE='compact')
+    def test_compact_token_is_accepted(self):
+        response = self.get(str(CustomRefreshToken.for_user(self.admin).access_token))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class SharedAuthWSGITests(SharedAuthChecksMixin, TestCase):
+
+    def get(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.get('/sync/', headers=headers)
+
+    def test_required_roles_are_read_per_request(self):
+        headers = {'Authorization': f'Bearer {CustomRefreshToken.for_user(self.customer).access_token}'}
+        self.assertEqual(self.client.get('/method-roles/', headers=headers).status_code, 200)
+        # Roles allowed for GET are not reused for POST
+        self.assertEqual(self.client.post('/method-roles/', headers=headers).status_code, 403)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class SharedAuthASGITests(SharedAuthChecksMixin, TestCase):
+
+    def setUp(self):
+        warm_up()
+
+    def get(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return async_to_sync(self.async_client.get)('/async/', headers=headers)
+
+    def test_checks_are_coroutines(self):
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncMicroserviceJWTAuthentication.aauthenticate))
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncIsAdminUser.ahas_permission))
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncClassesOnSyncViewTests(SharedAuthChecksMixin, TestCase):
+    """The async classes must still deny access when a sync view uses them."""
+
+    def get(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.get('/sync-async-checks/', headers=headers)
+
+
+# ==============================================================================
+# VERIFIED TOKEN CACHE
+# ==============================================================================
+
+class VerifiedTokenCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='Passw0rd!234')
+
+    def token(self):
+        return str(CustomRefreshToken.for_user(self.user).access_token)
+
+    @override_settings(MICROSERVICE_AUTH={'TOKEN_CACHE_SIZE': 8})
+    def test_repeat_tokens_are_served_from_cache(self):
+        token = self.token()
+        self.assertEqual(get_user_from_token(token).id, str(self.user.id))
+        self.assertEqual(get_user_from_token(token).id, str(self.user.id))
+
+        stats = get_token_cache().stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (1, 1, 1))
+
+    @override_settings(MICROSERVICE_AUTH={'TOKEN_CACHE_SIZE': 8})
+    def test_cache_is_keyed_by_the_whole_token(self):
+        token = self.token()
+        get_user_from_token(token)
+
+        # Same header and payload, other signature: verified again and rejected
+        with self.assertRaises(InvalidToken):
+            get_user_from_token(token[:-2] + 'xx')
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_token_cache())
+
+    def test_expiry_and_eviction(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        now = time.time()
+        cache.set('a', {'exp': now + 60})
+        cache.set('b', {'exp': now + 60})
+        cache.get('a')
+        cache.set('c', {'exp': now + 60})
+
+        # 'b' was the least recently used entry
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+        cache.set('expired', {'exp': now - 1})
+        self.assertIsNone(cache.get('expired'))
+
+    def test_entries_are_copied(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        payload = {'user_id': '1', 'exp': time.time() + 60}
+        cache.set('a', payload)
+        payload['user_id'] = '2'
+        cache.get('a')['user_id'] = '3'
+
+        self.assertEqual(cache.get('a')['user_id'], '1')
+
+
+# ==============================================================================
+# JWT KEY SET
+# ==============================================================================
+
+def make_rsa_key_pair():
+    """Return a new (private PEM, public PEM) RSA key pair."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private, public
+
+
+def rs256_settings(private, public):
+    return {**settings.SIMPLE_JWT, 'ALGORITHM': 'RS256', 'SIGNING_KEY': private, 'VERIFYING_KEY': public}
+
+
+class KeySetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.old_private, cls.old_public = make_rsa_key_pair()
+        cls.new_private, cls.new_public = make_rsa_key_pair()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='Passw0rd!234')
+
+    def test_thumbprint(self):
+        # RFC 7638, section 3.1
+        jwk = {
+            'kty': 'RSA',
+            'e': 'AQAB',
+            'alg': 'RS256',
+            'kid': '2011-04-29',
+            'n': (
+                '0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECP'
+                'ebWKRXjBZCiFV4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2Q'
+                'vzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQF'
+                'h6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw'
+            ),
+        }
+        self.assertEqual(_thumbprint(jwk), 'NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs')
+
+    def test_jwks_view(self):
+        self.assertEqual(self.client.get('/api/auth/jwks/').json(), {'keys': []})
+
+        with self.settings(SIMPLE_JWT=rs256_settings(self.new_private, self.new_public),
+                           JWT_RETIRED_PUBLIC_KEYS=self.old_public):
+            keys = self.client.get('/api/auth/jwks/').json()['keys']
+
+        self.assertEqual(len(keys), 2)
+        self.assertEqual([key['alg'] for key in keys], ['RS256', 'RS256'])
+        self.assertEqual(keys[0]['kid'], _thumbprint(keys[0]))
+        self.assertNotEqual(keys[0]['kid'], keys[1]['kid'])
+        self.assertNotIn('d', keys[0])
+
+    def test_rotation(self):
+        with self.settings(SIMPLE_JWT=rs256_settings(self.old_private, self.old_public)):
+            old_token = str(CustomRefreshToken.for_user(self.user).access_token)
+
+        with self.settings(SIMPLE_JWT=rs256_settings(self.new_private, self.new_public),
+                           JWT_RETIRED_PUBLIC_KEYS=self.old_public):
+            new_token = str(CustomRefreshToken.for_user(self.user).access_token)
+            # Tokens signed with the retired key stay valid until they expire
+            self.assertEqual(get_token_backend().decode(old_token)['user_id'], str(self.user.id))
+            self.assertEqual(get_token_backend().decode(new_token)['user_id'], str(self.user.id))
+
+        # Once the old key is no longer published, its tokens are rejected
+        with self.settings(SIMPLE_JWT=rs256_settings(self.new_private, self.new_public)):
+            with self.assertRaises(TokenBackendError):
+                get_token_backend().decode(old_token)
+
+    def test_pem_bundle(self):
+        self.assertEqual(len(_split_pem_bundle(self.old_public + self.new_public)), 2)
+        self.assertEqual(_split_pem_bundle(''), [])
+
+        rsa_public = self.old_public.replace('PUBLIC KEY', 'RSA PUBLIC KEY')
+        with self.assertRaises(ImproperlyConfigured):
+            _split_pem_bundle(self.new_public + rsa_public)
+        with self.assertRaises(ImproperlyConfigured):
+            _split_pem_bundle(self.new_public + 'garbage')
+
+
+# ==============================================================================
+# ACCESS TOKEN REVOCATION
+# ==============================================================================
+
+class FeedRevocationList(RevocationList):
+    """RevocationList reading the feed through the test client."""
+
+    def __init__(self, client, **kwargs):
+        super().__init__('/api/auth/revocations/', **kwargs)
+        self.client = client
+
+    def _fetch(self):
+        params = {'since': self._since} if self._since is not None else {}
+        return self.client.get(self.url, params, HTTP_X_REVOCATION_TOKEN=self.token or '').json()
+
+
+@override_settings(REVOCATION_FEED_TOKEN='feed-secret')
+class AccessTokenRevocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.user, role=UserRole.objects.create(name='CUSTOMER'))
+        cls.admin = User.objects.create_user(email='admin@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+
+    def logout(self):
+        refresh = CustomRefreshToken.for_user(self.user)
+        access = refresh.access_token
+        response = self.client.post(
+            '/api/auth/logout/', {'refresh': str(refresh)},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+        self.assertEqual(response.status_code, 205)
+        return access
+
+    def test_logged_out_token_is_rejected(self):
+        access = self.logout()
+        response = self.client.get('/api/users/me/addresses/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_feed_is_not_public(self):
+        url = '/api/auth/revocations/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_X_REVOCATION_TOKEN='wrong').status_code, 401)
+        customer = CustomRefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {customer}').status_code, 403)
+
+        admin = CustomRefreshToken.for_user(self.admin).access_token
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {admin}').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_X_REVOCATION_TOKEN='feed-secret').status_code, 200)
+
+    @override_settings(REVOCATION_FEED_TOKEN='')
+    def test_feed_token_unset(self):
+        response = self.client.get('/api/auth/revocations/', HTTP_X_REVOCATION_TOKEN='')
+        self.assertEqual(response.status_code, 401)
+
+    def test_services_sync_revocations(self):
+        revocations = FeedRevocationList(self.client, token='feed-secret')
+        self.assertTrue(revocations.sync())
+        self.assertEqual(len(revocations), 0)
+
+        access = self.logout()
+        self.assertTrue(revocations.sync())
+        self.assertTrue(revocations.is_revoked(access['jti']))
+
+        # Only unexpired revocations are exported
+        RevokedAccessToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        fresh = FeedRevocationList(self.client, token='feed-secret')
+        self.assertTrue(fresh.sync())
+        self.assertEqual(len(fresh), 0)
+
+
+# ==============================================================================
+# BATCH INTROSPECTION
+# ==============================================================================
+
+class BatchIntrospectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.user, role=UserRole.objects.create(name='CUSTOMER'))
+        cls.admin = User.objects.create_user(email='admin@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+
+    def introspect(self, tokens, user=None):
+        access = CustomRefreshToken.for_user(user or self.admin).access_token
+        return self.client.post(
+            '/api/auth/introspect/batch/', {'tokens': tokens},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+
+    def test_admin_only(self):
+        token = str(CustomRefreshToken.for_user(self.user).access_token)
+        self.assertEqual(self.introspect([token], user=self.user).status_code, 403)
+        response = self.client.post('/api/auth/introspect/batch/', {'tokens': [token]}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_results_in_request_order(self):
+        refresh = CustomRefreshToken.for_user(self.user)
+        revoked = refresh.access_token
+        RevokedAccessToken.revoke(revoked)
+        blacklisted = CustomRefreshToken.for_user(self.user)
+        blacklisted.blacklist()
+        expired = CustomRefreshToken.for_user(self.user).access_token
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+
+        response = self.introspect([
+            str(CustomRefreshToken.for_user(self.user).access_token),
+            str(revoked),
+            str(refresh),
+            str(blacklisted),
+            str(expired),
+            'not-a-token',
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['active'] for result in results], [True, False, True, False, False, False])
+        self.assertEqual([result.get('revoked') for result in results], [False, True, False, True, None, None])
+        self.assertEqual(results[0]['token_type'], 'access')
+        self.assertEqual(results[0]['claims']['roles'], ['CUSTOMER'])
+        self.assertEqual(results[2]['token_type'], 'refresh')
+        self.assertIn('error', results[4])
+
+    @override_settings(JWT_CLAIM_PROFILE='compact')
+    def test_compact_claims_are_expanded(self):
+        token = str(CustomRefreshToken.for_user(self.user).access_token)
+        claims = self.introspect([token]).json()['results'][0]['claims']
+        self.assertEqual((claims['roles'], claims['is_active']), (['CUSTOMER'], True))
+        self.assertNotIn('rl', claims)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        def statements(count):
+            tokens = [str(CustomRefreshToken.for_user(self.user).access_token) for _ in range(count)]
+            tokens += [str(CustomRefreshToken.for_user(self.user)) for _ in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.introspect(tokens).status_code, 200)
+            return len(queries)
+
+        self.assertEqual(statements(1), statements(10))
+
+    def test_batch_size_limit(self):
+        self.assertEqual(self.introspect([]).status_code, 400)
+        self.assertEqual(self.introspect(['x'] * 1001).status_code, 400)
+
+
+# ==============================================================================
+# BATCH TOKEN DECODING
+# ==============================================================================
+
+class DecodeManyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password='Passw0rd!234')
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+        cls.customer = User.objects.create_user(email='customer@example.com', password='Passw0rd!234')
+
+    def tokens(self):
+        expired = CustomRefreshToken.for_user(self.customer).access_token
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        valid = str(CustomRefreshToken.for_user(self.admin).access_token)
+        return [valid, str(expired), valid[:-2] + 'xx', 'not-a-token', valid]
+
+    def assertResults(self, results):
+        users = [user.id if user else None for user, error in results]
+        self.assertEqual(users, [str(self.admin.id), None, None, None, str(self.admin.id)])
+        self.assertEqual(results[0][0].roles, {'ADMIN'})
+
+        errors = [error for user, error in results]
+        self.assertIsNone(errors[0])
+        self.assertEqual(errors[1].detail['detail'], 'Token has expired')
+        for error in errors[2:4]:
+            self.assertIsInstance(error, InvalidToken)
+
+    def test_results_in_token_order(self):
+        self.assertResults(decode_many(self.tokens()))
+
+    def test_workers(self):
+        self.assertResults(decode_many(self.tokens(), workers=3))
+        self.assertEqual(decode_many([], workers=3), [])
+
+    @override_settings(JWT_CLAIM_PROFILE='compact')
+    def test_compact_tokens(self):
+        self.assertResults(decode_many(self.tokens()))
+
+    def test_matches_get_user_from_token(self):
+        token = str(CustomRefreshToken.for_user(self.admin).access_token)
+        [(user, error)] = decode_many([token])
+        expected = get_user_from_token(token)
+        self.assertEqual(
+            (user.id, user.email, user.is_active, user.roles),
+            (expected.id, expected.email, expected.is_active, expected.roles),
+        )
+
+    @override_settings(REVOCATION_FEED_TOKEN='feed-secret')
+    def test_revoked_tokens_are_reported(self):
+        refresh = CustomRefreshToken.for_user(self.admin)
+        access = refresh.access_token
+        self.client.post(
+            '/api/auth/logout/', {'refresh': str(refresh)},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+        revocations = FeedRevocationList(self.client, token='feed-secret')
+        revocations.sync()
+
+        with mock.patch('shared.auth.authentication.get_revocation_list', return_value=revocations):
+            [(user, error)] = decode_many([str(access)])
+        self.assertIsNone(user)
+        self.assertIn('revoked', error.detail['detail'])
+
+
+# ==============================================================================
+# TOKEN TABLE MAINTENANCE
+# ==============================================================================
+
+class TokenTableMaintenanceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+        expired = timezone.now() - timedelta(hours=2)
+        for _ in range(5):
+            PasswordResetToken.objects.create(user=cls.user, expires_at=expired)
+            EmailVerificationToken.objects.create(user=cls.user, expires_at=expired)
+        for _ in range(2):
+            PasswordResetToken.objects.create(user=cls.user)
+            EmailVerificationToken.objects.create(user=cls.user)
+
+    def test_token_is_unique_per_expiry(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'password_reset_tokens')
+        unique = {tuple(c['columns']) for c in constraints.values() if c['unique'] and not c['primary_key']}
+        self.assertEqual(unique, {('token', 'expires_at')})
+
+        token = PasswordResetToken.objects.first()
+        PasswordResetToken.objects.create(user=self.user, token=token.token, expires_at=token.expires_at + timedelta(days=1))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PasswordResetToken.objects.create(user=self.user, token=token.token, expires_at=token.expires_at)
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(cleanup_expired_tokens(PasswordResetToken, batch_size=2), 5)
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(PasswordResetToken.objects.count(), 2)
+        self.assertFalse(PasswordResetToken.objects.filter(expires_at__lt=timezone.now()).exists())
+
+    def test_maintain_token_tables(self):
+        stdout = io.StringIO()
+        call_command('maintain_token_tables', '--batch-size', '2', stdout=stdout)
+        self.assertIn('password_reset_tokens: removed 5 expired token(s)', stdout.getvalue())
+        self.assertIn('email_verification_tokens: removed 5 expired token(s)', stdout.getvalue())
+        self.assertEqual((PasswordResetToken.objects.count(), EmailVerificationToken.objects.count()), (2, 2))
+
+        with self.assertRaises(CommandError):
+            call_command('maintain_token_tables', '--batch-size', '0')
+
+
+class PartitionSQLTests(TestCase):
+    """DDL sent to PostgreSQL, captured from a stand-in connection."""
+
+    def run_on_postgresql(self, function, *args, partitions=()):
+        postgresql = mock.MagicMock(vendor='postgresql', ops=connection.ops)
+        cursor = postgresql.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [(name,) for name in partitions]
+        cursor.fetchone.return_value = (0,)
+        with mock.patch('users.partitions.connections', {'default': postgresql}):
+            result = function('tokens', *args)
+        return result, [c.args[0] for c in cursor.execute.call_args_list[1:]]
+
+    def test_create_moves_rows_out_of_default_partition(self):
+        day = timezone.now().date()
+        created, statements = self.run_on_postgresql(create_partitions, 0, day)
+
+        name = f'tokens_p{day:%Y%m%d}'
+        lower = f"'{day.isoformat()} 00:00:00+00'"
+        upper = f"'{(day + timedelta(days=1)).isoformat()} 00:00:00+00'"
+        self.assertEqual(created, [name])
+        self.assertEqual(statements, [
+            f'CREATE TABLE "{name}" (LIKE "tokens" INCLUDING DEFAULTS)',
+            f'WITH moved AS (DELETE FROM "tokens_default" '
+            f'WHERE expires_at >= {lower} AND expires_at < {upper} RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            f'ALTER TABLE "tokens" ATTACH PARTITION "{name}" FOR VALUES FROM ({lower}) TO ({upper})',
+        ])
+
+    def test_drop_detaches_without_concurrently(self):
+        (dropped, _), statements = self.run_on_postgresql(
+            drop_expired_partitions, partitions=['tokens_p20240101', 'tokens_p29990101'],
+        )
+
+        self.assertEqual(dropped, ['tokens_p20240101'])
+        self.assertEqual(statements[1:], [
+            'ALTER TABLE "tokens" DETACH PARTITION "tokens_p20240101"',
+            'DROP TABLE "tokens_p20240101"',
+        ])
+
+
+# ==============================================================================
+# EMAIL OUTBOX
+# ==============================================================================
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend whose server rejects every message."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('mail server down')
+
+
+class EmailOutboxTests(TestCase):
+
+    def test_registration_queues_email_without_sending(self):
+        response = self.client.post('/api/auth/register/', {
+            'email': 'new@example.com',
+            'password': 'S3cure-Passw0rd!',
+            'password_confirm': 'S3cure-Passw0rd!',
+            'first_name': 'New',
+            'last_name': 'User',
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.to_email, 'new@example.com')
+        self.assertEqual(queued.status, EmailOutbox.Status.PENDING)
+
+    def test_batch_is_sent_and_marked(self):
+        for i in range(3):
+            enqueue_email(f'user{i}@example.com', 'Hello', 'Body', '<p>Body</p>')
+
+        self.assertEqual(deliver_batch(batch_size=2), (2, 0))
+        self.assertEqual(deliver_batch(batch_size=2), (1, 0))
+        self.assertEqual(deliver_batch(batch_size=2), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.Status.SENT).exists())
+
+    @override_settings(
+        EMAIL_BACKEND='users.tests.FailingEmailBackend',
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failures_are_retried_then_dead_lettered(self):
+        queued = enqueue_email('user@example.com', 'Hello', 'Body')
+
+        with self.assertLogs('users.outbox', 'WARNING'):
+            self.assertEqual(deliver_batch(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn('mail server down', queued.last_error)
+
+        # Not due again until the retry delay has passed
+        self.assertEqual(deliver_batch(), (0, 0))
+
+        EmailOutbox.objects.update(next_attempt_at=queued.created_at)
+        with self.assertLogs('users.outbox', 'ERROR'):
+            self.assertEqual(deliver_batch(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.Status.DEAD)
+
+
+# ==============================================================================
+# ADMIN USER SEARCH
+# ==============================================================================
+
+class UserSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        def create(email, first_name, last_name, phone_number=None):
+            return User.objects.create_user(
+                email=email, password='S3cure-Passw0rd!', first_name=first_name,
+                last_name=last_name, phone_number=phone_number,
+            )
+
+        cls.other = create('mary@example.com', 'Joanna', 'Smith')
+        cls.name_prefix = create('jdoe@example.com', 'Ann', 'Doe')
+        cls.email_prefix = create('ann.lee@example.com', 'Lee', 'Park')
+        cls.exact = create('ann@example.com', 'Zed', 'Ray')
+        cls.phone = create('raj@example.com', 'Raj', 'Kumar', '+919876543210')
+        cls.admin = create('admin@example.com', 'Admin', 'User')
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+
+    def test_matches_are_ranked(self):
+        results = search_users(User.objects.order_by('-created_at'), 'ANN')
+        self.assertEqual(
+            list(results),
+            [self.exact, self.email_prefix, self.name_prefix, self.other],
+        )
+
+    def test_phone_number_substring(self):
+        self.assertEqual(list(search_users(User.objects.all(), '98765')), [self.phone])
+
+    def test_admin_list_search(self):
+        access = str(CustomRefreshToken.for_user(self.admin).access_token)
+
+        response = self.client.get(
+            '/api/admin/users/', {'search': ' ann '},
+            HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual(response.json()['results'][0]['email'], 'ann@example.com')
+
+
+# ==============================================================================
+# QUERY BUDGETS
+# ==============================================================================
+
+class QueryBudgetTests(TestCase):
+    """
+    Each endpoint runs a fixed number of queries, whatever the page size.
+
+    Counts include the ATOMIC_REQUESTS savepoint and its release. Only
+    endpoints that read the caller's User row load it (see
+    users/authentication.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = UserRole.objects.create(name='CUSTOMER')
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password='S3cure-Passw0rd!',
+            first_name='Admin', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+
+        users = User.objects.bulk_create(
+            User(email=f'user{i}@example.com', password='!', first_name='User', last_name=str(i))
+            for i in range(30)
+        )
+        UserRoleMapping.objects.bulk_create(UserRoleMapping(user=user, role=customer) for user in users)
+        UserAddress.objects.bulk_create(
+            UserAddress(
+                user=user, address_type=address_type, full_name='User', phone_number='+919876543210',
+                address_line1='1 Main St', city='Pune', state='MH', postal_code='411001',
+            )
+            for user in users
+            for address_type in UserAddress.AddressType.values
+        )
+        cls.customer = users[0]
+
+    def auth(self, user):
+        access = str(CustomRefreshToken.for_user(user).access_token)
+        return {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+    def test_admin_user_list(self):
+        auth = self.auth(self.admin)
+        for page_size in (5, 30):
+            with self.subTest(page_size=page_size), self.assertNumQueries(6):
+                response = self.client.get('/api/admin/users/', {'page_size': page_size}, **auth)
+            self.assertEqual(len(response.json()['results']), page_size)
+        self.assertEqual(response.json()['results'][-1]['address_count'], 2)
+
+    def test_admin_user_detail(self):
+        url = f'/api/admin/users/{self.customer.id}/'
+        auth = self.auth(self.admin)
+        with self.assertNumQueries(5):
+            response = self.client.get(url, **auth)
+        self.assertEqual(response.json()['address_count'], 2)
+
+        with self.assertNumQueries(7):
+            response = self.client.patch(
+                url, {'first_name': 'Renamed'}, content_type='application/json', **auth
+            )
+        self.assertEqual(response.json()['first_name'], 'Renamed')
+        self.assertEqual(response.json()['roles'][0]['name'], 'CUSTOMER')
+        self.assertEqual(response.json()['address_count'], 2)
+
+    def test_profile(self):
+        # Issuing the token warms the role cache the profile reads
+        auth = self.auth(self.customer)
+        with self.assertNumQueries(4):
+            self.client.get('/api/users/me/', **auth)
+        # Then the profile cache: no query but the revocation check and the
+        # request's savepoint
+        with self.assertNumQueries(3):
+            self.client.get('/api/users/me/', **auth)
+
+    def test_address_list_and_detail(self):
+        address = self.customer.addresses.first()
+        auth = self.auth(self.customer)
+        # Including the ETag aggregate (see ConditionalRequestTests)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/users/me/addresses/', **auth)
+        self.assertEqual(len(response.json()['results']), 2)
+        with self.assertNumQueries(4):
+            self.client.get(f'/api/users/me/addresses/{address.id}/', **auth)
+
+
+# ==============================================================================
+# CLAIMS-FIRST AUTHENTICATION
+# ==============================================================================
+
+class ClaimsAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer_role = UserRole.objects.create(name='CUSTOMER')
+        cls.user = User.objects.create_user(
+            email='user@example.com', password='S3cure-Passw0rd!',
+            first_name='Plain', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.user, role=cls.customer_role)
+
+    def get(self, url, user=None, token=None):
+        token = token or CustomRefreshToken.for_user(user or self.user).access_token
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_admin_role_is_read_from_token(self):
+        self.assertEqual(self.get('/api/admin/users/').status_code, 403)
+
+        token = CustomRefreshToken.for_user(self.user).access_token
+        token['roles'] = ['ADMIN']
+        with self.assertNumQueries(6):
+            self.assertEqual(self.get('/api/admin/users/', token=token).status_code, 200)
+
+    def test_staff_without_admin_role(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.get('/api/admin/users/').status_code, 200)
+
+    def test_inactive_or_deleted_user_is_rejected(self):
+        token = CustomRefreshToken.for_user(self.user).access_token
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.get('/api/users/me/', token=token).status_code, 401)
+
+        token['is_active'] = False
+        self.assertEqual(self.get('/api/users/me/addresses/', token=token).status_code, 401)
+
+    def test_refresh_reloads_the_user(self):
+        admin = User.objects.create_user(email='admin@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=admin, role=UserRole.objects.create(name='ADMIN'))
+        refresh = str(CustomRefreshToken.for_user(admin))
+
+        def refresh_token():
+            return self.client.post('/api/auth/refresh/', {'refresh': refresh}, content_type='application/json')
+
+        User.objects.filter(pk=admin.pk).update(email='renamed@example.com')
+        response = refresh_token()
+        self.assertEqual(response.status_code, 200)
+        access = get_user_from_token(response.json()['access'])
+        self.assertEqual((access.email, access.is_active), ('renamed@example.com', True))
+        refresh = response.json()['refresh']
+
+        # A deactivated admin cannot get a new access token for admin endpoints
+        User.objects.filter(pk=admin.pk).update(is_active=False)
+        response = refresh_token()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'No active account found for the given token')
+
+        User.objects.filter(pk=admin.pk).delete()
+        self.assertEqual(refresh_token().status_code, 401)
+
+
+# ==============================================================================
+# COMPACT ROLE CLAIMS
+# ==============================================================================
+
+class RoleBitsTests(TestCase):
+
+    def test_roles_round_trip(self):
+        for roles in ([], ['CUSTOMER'], ['ADMIN', 'MANAGER'], list(ROLE_BITS)):
+            with self.subTest(roles=roles):
+                self.assertEqual(decode_roles(encode_roles(roles)), frozenset(roles))
+
+        claims = compact_claims('user@example.com', False, ['ADMIN'], include_email=True)
+        expanded = expand_claims({'user_id': 1, **claims})
+        self.assertEqual(expanded, {
+            'user_id': 1, 'email': 'user@example.com', 'is_active': False, 'roles': ['ADMIN'],
+        })
+
+    def test_unknown_role_is_left_out(self):
+        with self.assertLogs('shared.auth.claims', 'WARNING'):
+            mask = encode_roles(['CUSTOMER', 'AUDITOR'])
+        self.assertEqual(decode_roles(mask), {'CUSTOMER'})
+
+    @override_settings(JWT_CLAIM_PROFILE='compact')
+    def test_login_with_unknown_role(self):
+        user = User.objects.create_user(email='auditor@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=user, role=UserRole.objects.create(name='AUDITOR'))
+
+        with self.assertLogs('shared.auth.claims', 'WARNING'):
+            response = self.client.post('/api/auth/login/', {
+                'email': 'auditor@example.com', 'password': 'S3cure-Passw0rd!',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_every_role_has_a_bit(self):
+        self.assertEqual(check_role_bits(None), [])
+
+        with mock.patch.dict(ROLE_BITS):
+            del ROLE_BITS['MANAGER']
+            errors = check_role_bits(None)
+        self.assertEqual([error.id for error in errors], ['users.E001'])
+
+
+# ==============================================================================
+# ROLE CACHE
+# ==============================================================================
+
+class RoleCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer_role = UserRole.objects.create(name='CUSTOMER')
+        cls.manager_role = UserRole.objects.create(name='MANAGER')
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.user, role=cls.customer_role)
+        cls.admin = User.objects.create_user(email='admin@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roles_are_cached(self):
+        self.assertEqual(get_user_roles(self.user.id), ['CUSTOMER'])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_roles(self.user.id), ['CUSTOMER'])
+
+    def test_role_changes_invalidate(self):
+        get_user_roles(self.user.id)
+        self.user.roles.add(self.manager_role)
+        self.assertEqual(get_user_roles(self.user.id), ['CUSTOMER', 'MANAGER'])
+
+        UserRoleMapping.objects.filter(user=self.user, role=self.customer_role).get().delete()
+        self.assertEqual(get_user_roles(self.user.id), ['MANAGER'])
+
+        self.manager_role.name = 'SUPERVISOR'
+        self.manager_role.save()
+        self.assertEqual(get_user_roles(self.user.id), ['SUPERVISOR'])
+
+        self.manager_role.users.clear()
+        self.assertEqual(get_user_roles(self.user.id), [])
+
+    def test_role_views_invalidate(self):
+        refresh = CustomRefreshToken.for_user(self.user)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {CustomRefreshToken.for_user(self.admin).access_token}'}
+
+        response = self.client.post(
+            f'/api/admin/users/{self.user.id}/assign-role/', {'role_name': 'MANAGER'},
+            content_type='application/json', **headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_user_roles(self.user.id), ['CUSTOMER', 'MANAGER'])
+
+        # The next refresh carries the new role
+        response = self.client.post('/api/auth/refresh/', {'refresh': str(refresh)}, content_type='application/json')
+        self.assertEqual(get_user_from_token(response.json()['access']).roles, {'CUSTOMER', 'MANAGER'})
+
+        response = self.client.delete(
+            f'/api/admin/users/{self.user.id}/remove-role/', {'role_name': 'MANAGER'},
+            content_type='application/json', **headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_user_roles(self.user.id), ['CUSTOMER'])
+
+    def test_token_issuance_reads_cached_roles(self):
+        get_user_roles(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            refresh = CustomRefreshToken.for_user(self.user)
+            response = self.client.post('/api/auth/refresh/', {'refresh': str(refresh)}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q['sql'] for q in queries if 'user_role' in q['sql']])
+
+
+# ==============================================================================
+# REFRESH TOKEN BLACKLIST
+# ==============================================================================
+
+class RefreshBlacklistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': str(token)}, content_type='application/json')
+
+    def test_tokens_go_through_the_configured_backend(self):
+        with override_settings(REFRESH_BLACKLIST_BACKEND='users.blacklist.CacheBlacklistBackend'):
+            self.assertIsInstance(get_blacklist_backend(), CacheBlacklistBackend)
+            token = CustomRefreshToken.for_user(self.user)
+            token.blacklist()
+            with self.assertRaises(TokenError):
+                token.check_blacklist()
+        # Nothing was written to SimpleJWT's tables
+        self.assertFalse(OutstandingToken.objects.exists())
+
+        self.assertIsInstance(get_blacklist_backend(), DatabaseBlacklistBackend)
+        CustomRefreshToken.for_user(self.user).check_blacklist()
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+
+    def test_logged_out_token_cannot_refresh(self):
+        refresh = CustomRefreshToken.for_user(self.user)
+        self.client.post(
+            '/api/auth/logout/', {'refresh': str(refresh)}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}',
+        )
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_backends_must_implement_add_and_contains(self):
+        class PartialBackend(BaseBlacklistBackend):
+            def add(self, token):
+                pass
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+    def test_in_memory_entries_expire_with_their_tokens(self):
+        backend = InMemoryBlacklistBackend()
+        token = CustomRefreshToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=30))
+        backend.add(token)
+        self.assertTrue(backend.contains(token['jti']))
+
+        with mock.patch('users.blacklist.time.monotonic', return_value=time.monotonic() + InMemoryBlacklistBackend.PURGE_INTERVAL + 1):
+            self.assertFalse(backend.contains(token['jti']))
+            # The next insert after PURGE_INTERVAL drops expired entries
+            backend.add(CustomRefreshToken.for_user(self.user))
+        self.assertEqual(len(backend), 1)
+
+
+class BlacklistBackendChecksMixin:
+    """Token rotation and reuse checks, run against each backend."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': str(token)}, content_type='application/json')
+
+    def test_rotated_token_cannot_be_reused(self):
+        first = CustomRefreshToken.for_user(self.user)
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+        second = response.json()['refresh']
+        self.assertNotEqual(second, str(first))
+
+        self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(second).status_code, 200)
+
+    def test_contains_many(self):
+        tokens = [CustomRefreshToken.for_user(self.user) for _ in range(3)]
+        tokens[0].blacklist()
+        tokens[2].blacklist()
+
+        backend = get_blacklist_backend()
+        self.assertEqual(
+            backend.contains_many([token['jti'] for token in tokens]),
+            {tokens[0]['jti'], tokens[2]['jti']},
+        )
+
+
+@override_settings(REFRESH_BLACKLIST_BACKEND='users.blacklist.DatabaseBlacklistBackend')
+class DatabaseBlacklistBackendTests(BlacklistBackendChecksMixin, TestCase):
+    pass
+
+
+@override_settings(REFRESH_BLACKLIST_BACKEND='users.blacklist.CacheBlacklistBackend')
+class CacheBlacklistBackendTests(BlacklistBackendChecksMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(REFRESH_BLACKLIST_BACKEND='users.blacklist.InMemoryBlacklistBackend')
+class InMemoryBlacklistBackendTests(BlacklistBackendChecksMixin, TestCase):
+    pass
+
+
+# ==============================================================================
+# PROFILE CACHE
+# ==============================================================================
+
+class ProfileCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer_role = UserRole.objects.create(name='CUSTOMER')
+        cls.manager_role = UserRole.objects.create(name='MANAGER')
+        cls.user = User.objects.create_user(
+            email='user@example.com', password='S3cure-Passw0rd!',
+            first_name='Plain', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.user, role=cls.customer_role)
+
+    def setUp(self):
+        cache.clear()
+        self.token = CustomRefreshToken.for_user(self.user).access_token
+
+    def profile(self, token=None):
+        response = self.client.get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token or self.token}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_update_invalidates_profile(self):
+        self.profile()
+        response = self.client.patch(
+            '/api/users/me/', {'first_name': 'Renamed'},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile()['first_name'], 'Renamed')
+
+    def test_role_change_needs_fresh_claims(self):
+        self.profile()
+        self.user.roles.add(self.manager_role)
+
+        # The old token's roles no longer match: user and roles are read again
+        with self.assertNumQueries(5):
+            self.assertEqual(self.profile()['roles'], ['CUSTOMER', 'MANAGER'])
+
+        fresh = CustomRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(3):
+            self.assertEqual(self.profile(fresh)['roles'], ['CUSTOMER', 'MANAGER'])
+
+    def test_queryset_update_needs_explicit_invalidation(self):
+        self.profile()
+        # update() sends no post_save, so the cached profile is still served
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+        self.assertEqual(self.profile()['first_name'], 'Plain')
+
+        invalidate_user_profiles_on_commit([self.user.pk])
+        self.assertEqual(self.profile()['first_name'], 'Renamed')
+
+    def test_login_keeps_profile_cached(self):
+        self.profile()
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'user@example.com', 'password': 'S3cure-Passw0rd!'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(3):
+            self.profile()
+
+
+# ==============================================================================
+# CONDITIONAL REQUESTS
+# ==============================================================================
+
+class ConditionalRequestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', password='S3cure-Passw0rd!',
+            first_name='Plain', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.user, role=UserRole.objects.create(name='CUSTOMER'))
+        cls.shipping, cls.billing = (
+            UserAddress.objects.create(
+                user=cls.user, address_type=address_type, full_name='User', phone_number='+919876543210',
+                address_line1='1 Main St', city='Pune', state='MH', postal_code='411001',
+            )
+            for address_type in ('SHIPPING', 'BILLING')
+        )
+
+    def setUp(self):
+        access = str(CustomRefreshToken.for_user(self.user).access_token)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {access}'
+
+    def test_address_list(self):
+        url = '/api/users/me/addresses/'
+        etag = self.client.get(url)['ETag']
+
+        # Savepoint, revocation check, aggregate, release: the page is
+        # neither fetched nor serialized
+        with self.assertNumQueries(4):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.billing.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_address_detail(self):
+        url = f'/api/users/me/addresses/{self.shipping.id}/'
+        first = self.client.get(url)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch(url, {'city': 'Mumbai'}, content_type='application/json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['city'], 'Mumbai')
+
+    def test_profile(self):
+        etag = self.client.get('/api/users/me/')['ETag']
+        self.assertEqual(self.client.get('/api/users/me/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.roles.add(UserRole.objects.create(name='MANAGER'))
+        self.assertEqual(self.client.get('/api/users/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ==============================================================================
+# REGISTRATION
+# ==============================================================================
+
+class RegistrationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        UserRole.objects.create(name='CUSTOMER')
+        User.objects.create_user(
+            email='Taken@Example.com', password='S3cure-Passw0rd!',
+            first_name='Existing', last_name='User', phone_number='+919876543210',
+        )
+
+    def register(self, **fields):
+        data = {
+            'email': 'new@example.com',
+            'password': 'S3cure-Passw0rd!',
+            'password_confirm': 'S3cure-Passw0rd!',
+            'first_name': 'New',
+            'last_name': 'User',
+            **fields,
+        }
+        return self.client.post('/api/auth/register/', data, content_type='application/json')
+
+    def test_duplicate_email_in_any_case(self):
+        response = self.register(email='TAKEN@example.COM')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['A user with this email already exists.']})
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_duplicate_phone_number(self):
+        response = self.register(phone_number='+919876543210')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'phone_number': ['A user with this phone number already exists.']})
+
+    def test_create_statements(self):
+        serializer = RegisterSerializer(data={
+            'email': 'New@Example.com', 'password': 'S3cure-Passw0rd!', 'password_confirm': 'S3cure-Passw0rd!',
+            'first_name': 'New', 'last_name': 'User',
+        })
+        # Validation reads nothing
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid())
+        get_role_ids()
+        # Savepoint, user and role mapping inserts, release; the role id
+        # comes from the registry
+        with self.assertNumQueries(4):
+            user = serializer.save()
+        self.assertEqual(user.email, 'new@example.com')
+        self.assertEqual(list(user.roles.values_list('name', flat=True)), ['CUSTOMER'])
+
+
+# ==============================================================================
+# PASSWORD HASHING POOL
+# ==============================================================================
+
+class HashingPoolTests(TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def occupy(self, pool):
+        """Keep the pool's only thread busy until self.release is set."""
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            self.release.wait(5)
+
+        thread = threading.Thread(target=pool.run, args=(hold,))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.release.set)
+        started.wait(5)
+
+    def test_queue_timeout_is_enforced_while_waiting(self):
+        pool = HashingPool(size=1, queue_limit=1, queue_timeout=0.05)
+        self.addCleanup(pool.shutdown)
+        self.occupy(pool)
+
+        started_at = time.perf_counter()
+        with self.assertRaises(PasswordHashingUnavailable), self.assertLogs('users.hashers', 'WARNING') as logs:
+            pool.run(len, 'password')
+        # Rejected after queue_timeout, not once the busy thread frees up
+        self.assertLess(time.perf_counter() - started_at, 1)
+        self.assertIn('waited 0.05s', logs.output[0])
+
+        self.release.set()
+        self.assertEqual(pool.run(len, 'password'), 8)
+
+    def test_full_queue_is_rejected_at_once(self):
+        pool = HashingPool(size=1, queue_limit=0, queue_timeout=5)
+        self.addCleanup(pool.shutdown)
+        self.occupy(pool)
+
+        started_at = time.perf_counter()
+        with self.assertRaises(PasswordHashingUnavailable), self.assertLogs('users.hashers', 'WARNING') as logs:
+            pool.run(len, 'password')
+        self.assertLess(time.perf_counter() - started_at, 1)
+        self.assertIn('queue full', logs.output[0])
+
+    def test_stats(self):
+        pool = HashingPool(size=2, queue_limit=0, queue_timeout=1)
+        self.addCleanup(pool.shutdown)
+        for _ in range(3):
+            pool.run(time.sleep, 0.01)
+        self.occupy(pool)
+        self.occupy(pool)
+        with self.assertRaises(PasswordHashingUnavailable), self.assertLogs('users.hashers', 'WARNING'):
+            pool.run(len, 'password')
+
+        stats = pool.stats()
+        self.assertEqual(
+            (stats['pool_size'], stats['queue_limit'], stats['completed'], stats['rejected']),
+            (2, 0, 3, 1),
+        )
+        self.assertGreaterEqual(stats['hash_time_max_ms'], 10)
+        self.assertGreaterEqual(stats['hash_time_max_ms'], stats['hash_time_avg_ms'])
+        self.assertGreaterEqual(stats['queue_wait_max_ms'], stats['queue_wait_avg_ms'])
+
+    @override_settings(PASSWORD_HASH_POOL_SIZE=1, PASSWORD_HASH_QUEUE_LIMIT=0)
+    def test_login_is_rejected_with_retry_after(self):
+        User.objects.create_user(email='user@example.com', password='S3cure-Passw0rd!')
+        self.occupy(get_hashing_pool())
+
+        with self.assertLogs('users.hashers', 'WARNING'):
+            response = self.client.post('/api/auth/login/', {
+                'email': 'user@example.com', 'password': 'S3cure-Passw0rd!',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        self.release.set()
+        admin = User.objects.create_user(email='admin@example.com', password='S3cure-Passw0rd!')
+        UserRoleMapping.objects.create(user=admin, role=UserRole.objects.create(name='ADMIN'))
+        response = self.client.get(
+            '/api/admin/password-hashing/stats/',
+            HTTP_AUTHORIZATION=f'Bearer {CustomRefreshToken.for_user(admin).access_token}',
+        )
+        self.assertEqual(response.json()['rejected'], 1)
+
+
+# ==============================================================================
+# ARGON2 CALIBRATION
+# ==============================================================================
+
+def fake_measure(self, time_cost, memory_cost, parallelism, samples):
+    """Stand-in for Command.measure: 1 ms per MiB per pass."""
+    return time_cost * memory_cost / 1024
+
+
+@mock.patch.object(calibrate_argon2.Command, 'measure', fake_measure)
+class CalibrateArgon2Tests(TestCase):
+
+    def calibrate(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('calibrate_argon2', '--dry-run', *args, stdout=stdout, stderr=stderr)
+        output = stdout.getvalue()
+        return json.loads(output[output.index('{'):]), stderr.getvalue()
+
+    def assertNotBelowOwasp(self, params):
+        self.assertTrue(any(
+            params['memory_cost'] >= memory and params['time_cost'] >= time_cost
+            for memory, time_cost in calibrate_argon2.OWASP_MIN_COSTS
+        ), params)
+
+    def test_time_cost_fills_the_budget(self):
+        params, warnings = self.calibrate('--target-ms', '250', '--max-memory', '102400')
+        self.assertEqual((params['time_cost'], params['memory_cost'], params['measured_ms']), (2, 102400, 200))
+        self.assertEqual(warnings, '')
+
+    def test_memory_is_halved_to_fit(self):
+        params, warnings = self.calibrate('--target-ms', '60', '--max-memory', '102400')
+        self.assertEqual((params['time_cost'], params['memory_cost']), (1, 51200))
+        self.assertNotBelowOwasp(params)
+
+    def test_small_budget_is_clamped_to_owasp_minimum(self):
+        params, warnings = self.calibrate('--target-ms', '10', '--max-memory', '102400')
+        # 25 MiB needs two passes; 12.5 MiB is below the floor
+        self.assertEqual((params['time_cost'], params['memory_cost'], params['measured_ms']), (2, 25600, 50))
+        self.assertNotBelowOwasp(params)
+        self.assertIn("OWASP's minimum costs", warnings)
+
+    def test_max_memory_below_floor(self):
+        with self.assertRaises(CommandError):
+            self.calibrate('--max-memory', '8192')
+
+
+# ==============================================================================
+# ROLE REGISTRY
+# ==============================================================================
+
+class RoleRegistryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserRole.objects.create(name='CUSTOMER')
+
+    def test_lookups_are_cached(self):
+        get_role_ids()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role_id('CUSTOMER'), self.customer.id)
+
+    def test_role_changes_reset_registry(self):
+        get_role_ids()
+        seller = UserRole.objects.create(name='SELLER')
+        self.assertEqual(get_role_id('SELLER'), seller.id)
+
+        seller.delete()
+        self.assertIsNone(get_role_id('SELLER'))
+
+    @override_settings(ROLE_REGISTRY_TIMEOUT=3600)
+    def test_unknown_names_reload_at_most_once_per_interval(self):
+        get_role_ids()
+        # Reloads for unknown names are throttled, so repeated misses don't query
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_role_id('ADMIN'))
+            self.assertIsNone(get_role_id('ADMIN'))
+
+
+# ==============================================================================
+# ADDRESS BOOK
+# ==============================================================================
+
+class AddressBookTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            User.objects.create_user(
+                email=email, password='S3cure-Passw0rd!', first_name='Address', last_name='User',
+            )
+            for email in ('user@example.com', 'other@example.com')
+        )
+        cls.home = cls.address(cls.user, full_name='Home', is_default=True)
+        cls.office = cls.address(cls.user, full_name='Office')
+
+    @staticmethod
+    def address(user, **fields):
+        return UserAddress.objects.create(
+            user=user, address_type='SHIPPING', phone_number='+919876543210',
+            address_line1='1 Main St', city='Pune', state='MH', postal_code='411001',
+            **fields,
+        )
+
+    def setUp(self):
+        access = str(CustomRefreshToken.for_user(self.user).access_token)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {access}'
+
+    def defaults(self):
+        return list(self.user.addresses.filter(is_default=True).values_list('full_name', flat=True))
+
+    def sync(self, addresses, **fields):
+        data = {
+            'addresses': [
+                {
+                    'address_type': 'SHIPPING', 'phone_number': '+919876543210', 'address_line1': '1 Main St',
+                    'city': 'Pune', 'state': 'MH', 'postal_code': '411001', **address,
+                }
+                for address in addresses
+            ],
+            **fields,
+        }
+        return self.client.put('/api/users/me/addresses/sync/', data, content_type='application/json')
+
+    def test_one_default_per_type(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserAddress.objects.filter(pk=self.office.pk).update(is_default=True)
+
+        response = self.client.patch(f'/api/users/me/addresses/{self.office.id}/set-default/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.defaults(), ['Office'])
+
+        # A stale copy of the old default is saved after the clear is retried
+        self.home.city = 'Mumbai'
+        self.home.save()
+        self.assertEqual(self.defaults(), ['Home'])
+
+    def test_destroy_promotes_newest(self):
+        newest = self.address(self.user, full_name='Newest')
+
+        response = self.client.delete(f'/api/users/me/addresses/{self.home.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.defaults(), [newest.full_name])
+
+    def test_sync(self):
+        new_id = uuid.uuid4()
+        response = self.sync([
+            {'id': str(self.office.id), 'full_name': 'Office', 'city': 'Mumbai', 'is_default': True},
+            {'id': str(new_id), 'full_name': 'Cabin'},
+        ], replace=True)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['deleted']), (1, 1, 1))
+        self.assertEqual({address['id'] for address in body['addresses']}, {str(self.office.id), str(new_id)})
+        self.assertEqual(self.defaults(), ['Office'])
+        self.office.refresh_from_db()
+        self.assertEqual(self.office.city, 'Mumbai')
+
+    def test_sync_keeps_default_sent_without_flag(self):
+        response = self.sync([{'id': str(self.home.id), 'full_name': 'Home', 'city': 'Mumbai'}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.defaults(), ['Home'])
+
+    def test_sync_promotes_when_default_changes_type(self):
+        response = self.sync([{'id': str(self.home.id), 'full_name': 'Home', 'address_type': 'BILLING'}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.defaults(), ['Office'])
+
+    def test_sync_statements_do_not_grow(self):
+        def statements(count):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.sync([{'full_name': f'Address {i}'} for i in range(count)])
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(statements(1), statements(20))
+
+    def test_sync_rejects_other_users_address(self):
+        theirs = self.address(self.other, full_name='Theirs')
+
+        response = self.sync([{'id': str(theirs.id), 'full_name': 'Mine now'}])
+        self.assertEqual(response.status_code, 403)
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.full_name, 'Theirs')
+
+    def test_sync_rejects_id_taken_during_sync(self):
+        taken_id = uuid.uuid4()
+        bulk_create = UserAddress.objects.bulk_create
+
+        def insert_first(rows, **kwargs):
+            # Another user's address appears under the id before the upsert
+            self.address(self.other, id=taken_id, full_name='Theirs')
+            return bulk_create(rows, **kwargs)
+
+        with mock.patch.object(UserAddress.objects, 'bulk_create', insert_first):
+            with self.assertRaises(PermissionDenied), transaction.atomic():
+                sync_address_book(self.user.id, [{
+                    'id': taken_id, 'address_type': 'SHIPPING', 'full_name': 'Mine now',
+                    'phone_number': '+919876543210', 'address_line1': '1 Main St',
+                    'city': 'Pune', 'state': 'MH', 'postal_code': '411001',
+                }])
+        self.assertFalse(UserAddress.objects.filter(pk=taken_id).exists())
+
+    def test_sync_validation(self):
+        response = self.sync([{'full_name': 'A', 'is_default': True}, {'full_name': 'B', 'is_default': True}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('addresses', response.json())
+
+
+# ==============================================================================
+# CURSOR PAGINATION
+# ==============================================================================
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password='S3cure-Passw0rd!',
+            first_name='Admin', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+        User.objects.bulk_create(
+            User(email=f'user{i}@example.com', password='!', first_name='User', last_name=str(i))
+            for i in range(24)
+        )
+        # Ties on created_at are broken by id
+        User.objects.filter(last_name__in=['3', '4', '5', '6', '7']).update(
+            created_at=User.objects.get(last_name='3').created_at
+        )
+        cls.expected = [
+            str(pk) for pk in User.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+
+    def setUp(self):
+        access = str(CustomRefreshToken.for_user(self.admin).access_token)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+    def get_page(self, url, **params):
+        response = self.client.get(url, params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_walks_forward_and_back(self):
+        page = self.get_page('/api/admin/users/', pagination='cursor', page_size=7)
+        self.assertIsNone(page['previous'])
+        self.assertIsNone(page['count'])
+
+        pages = [page]
+        while page['next']:
+            page = self.get_page(page['next'])
+            pages.append(page)
+        self.assertEqual([user['id'] for page in pages for user in page['results']], self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [7, 7, 7, 4])
+
+        back = [page]
+        while page['previous']:
+            page = self.get_page(page['previous'])
+            back.append(page)
+        self.assertEqual(
+            [[user['id'] for user in page['results']] for page in back],
+            [[user['id'] for user in page['results']] for page in reversed(pages)],
+        )
+
+    def test_page_queries_do_not_grow_with_depth(self):
+        second = self.get_page(self.get_page('/api/admin/users/', pagination='cursor', page_size=7)['next'])
+        # No COUNT(*): one query fewer than a numbered page
+        with self.assertNumQueries(5):
+            third = self.get_page(second['next'])
+        self.assertEqual(len(third['results']), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            '/api/admin/users/', {'pagination': 'cursor', 'cursor': 'bm90LWpzb24'}, **self.auth
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_values_of_wrong_type(self):
+        created_at = timezone.now().isoformat()
+        for values in (
+            [created_at, 'not-a-uuid'],
+            ['yesterday', str(uuid.uuid4())],
+            [created_at, None],
+            [[created_at], {'id': 1}],
+        ):
+            with self.subTest(values=values):
+                cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': False}).encode()).decode()
+                response = self.client.get(
+                    '/api/admin/users/', {'pagination': 'cursor', 'cursor': cursor}, **self.auth
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+# ==============================================================================
+# BULK EXPORT AND IMPORT
+# ==============================================================================
+
+class UserTransferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserRole.objects.create(name='CUSTOMER')
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password='S3cure-Passw0rd!',
+            first_name='Admin', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+        users = User.objects.bulk_create(
+            User(email=f'user{i}@example.com', password='!', first_name='User', last_name=str(i))
+            for i in range(12)
+        )
+        UserRoleMapping.objects.bulk_create(UserRoleMapping(user=user, role=cls.customer) for user in users)
+        UserAddress.objects.create(
+            user=users[0], address_type='SHIPPING', full_name='User', phone_number='+919876543210',
+            address_line1='1 Main St', city='Pune', state='MH', postal_code='411001',
+        )
+
+    def export(self, **params):
+        access = str(CustomRefreshToken.for_user(self.admin).access_token)
+        response = self.client.get('/api/admin/users/export/', params, HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(USER_EXPORT_CHUNK_SIZE=5)
+    def test_ndjson_export(self):
+        rows = [json.loads(line) for line in self.export(output='ndjson').splitlines()]
+
+        self.assertEqual(len(rows), 13)
+        user0 = next(row for row in rows if row['email'] == 'user0@example.com')
+        self.assertEqual(user0['roles'], ['CUSTOMER'])
+        self.assertEqual(user0['address_count'], 1)
+
+    def test_csv_export_applies_list_filters(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(role='ADMIN'))))
+
+        self.assertEqual([row['email'] for row in rows], ['admin@example.com'])
+        self.assertEqual(rows[0]['roles'], 'ADMIN')
+
+    def test_csv_round_trip(self):
+        exported = self.export(search='user1')
+        User.objects.filter(email__startswith='user1').delete()
+
+        results = list(UserImporter(chunk_size=2, workers=2).run(read_csv(io.StringIO(exported))))
+
+        self.assertEqual(sum(result.created for result in results), 3)
+        self.assertFalse(any(result.errors for result in results))
+        imported = User.objects.get(email='user10@example.com')
+        self.assertEqual(list(imported.roles.values_list('name', flat=True)), ['CUSTOMER'])
+        self.assertFalse(imported.has_usable_password())
+
+    def test_import_rejects_invalid_and_duplicate_records(self):
+        records = [
+            ({'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User', 'password': 'S3cure-Passw0rd!'}, None),
+            ({'email': 'user0@example.com', 'first_name': 'Dup', 'last_name': 'User'}, None),
+            ({'email': 'new@example.com', 'first_name': 'Dup', 'last_name': 'In file'}, None),
+            ({'email': 'bad', 'first_name': 'Bad', 'last_name': 'User'}, None),
+            (None, 'Invalid JSON'),
+        ]
+
+        [result] = UserImporter().run(records)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _, _ in result.errors], [2, 3, 4, 5])
+        self.assertTrue(User.objects.get(email='new@example.com').check_password('S3cure-Passw0rd!'))
+
+
+# ==============================================================================
+# BULK ADMIN ACTIONS
+# ==============================================================================
+
+class BulkUserActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = UserRole.objects.create(name='CUSTOMER')
+        cls.manager = UserRole.objects.create(name='MANAGER')
+        cls.admin = User.objects.create_user(
+            email='admin@example.com', password='S3cure-Passw0rd!',
+            first_name='Admin', last_name='User',
+        )
+        UserRoleMapping.objects.create(user=cls.admin, role=UserRole.objects.create(name='ADMIN'))
+        cls.users = User.objects.bulk_create(
+            User(email=f'user{i}@example.com', password='!', first_name='User', last_name=str(i))
+            for i in range(6)
+        )
+        UserRoleMapping.objects.bulk_create(UserRoleMapping(user=user, role=cls.customer) for user in cls.users)
+
+    def setUp(self):
+        access = str(CustomRefreshToken.for_user(self.admin).access_token)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {access}'
+
+    def bulk(self, payload):
+        return self.client.post('/api/admin/users/bulk/', payload, content_type='application/json')
+
+    def statuses(self, response):
+        return {row['user_id']: row['status'] for row in response.json()['results']}
+
+    def test_add_role_by_ids(self):
+        UserRoleMapping.objects.create(user=self.users[0], role=self.manager)
+        missing = '00000000-0000-0000-0000-000000000000'
+        ids = [str(user.id) for user in self.users[:3]] + [missing]
+
+        response = self.bulk({'action': 'add_role', 'role_name': 'MANAGER', 'user_ids': ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'], {'unchanged': 1, 'updated': 2, 'not_found': 1})
+        self.assertEqual(self.statuses(response)[missing], 'not_found')
+        self.assertEqual(UserRoleMapping.objects.filter(role=self.manager).count(), 3)
+
+    def test_remove_role_keeps_last_role(self):
+        UserRoleMapping.objects.create(user=self.users[0], role=self.manager)
+
+        response = self.bulk({'action': 'remove_role', 'role_name': 'CUSTOMER', 'filter': {'role': 'CUSTOMER'}})
+
+        statuses = self.statuses(response)
+        self.assertEqual(statuses[str(self.users[0].id)], 'updated')
+        self.assertEqual(response.json()['summary'], {'updated': 1, 'skipped': 5})
+        self.assertEqual(list(self.users[0].roles.values_list('name', flat=True)), ['MANAGER'])
+        self.assertEqual(UserRoleMapping.objects.filter(role=self.customer).count(), 5)
+
+    def test_remove_role_drops_cached_roles(self):
+        user = self.users[0]
+        UserRoleMapping.objects.create(user=user, role=self.manager)
+        self.assertEqual(get_user_roles(user.id), ['CUSTOMER', 'MANAGER'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.bulk({'action': 'remove_role', 'role_name': 'MANAGER', 'user_ids': [str(user.id)]})
+
+        self.assertEqual(response.json()['summary'], {'updated': 1})
+        self.assertEqual(get_user_roles(user.id), ['CUSTOMER'])
+
+    def test_deactivate_by_filter_skips_self(self):
+        User.objects.filter(pk=self.users[0].pk).update(is_active=False)
+
+        response = self.bulk({'action': 'deactivate', 'filter': {'search': 'example.com'}})
+
+        statuses = self.statuses(response)
+        self.assertEqual(statuses[str(self.admin.id)], 'skipped')
+        self.assertEqual(statuses[str(self.users[0].id)], 'unchanged')
+        self.assertEqual(response.json()['summary']['updated'], 5)
+        self.assertEqual(list(User.objects.filter(is_active=True)), [self.admin])
+
+    def test_rejects_ambiguous_targets(self):
+        self.assertEqual(self.bulk({'action': 'activate'}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'activate', 'filter': {}}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'add_role', 'user_ids': [str(self.users[0].id)]}).status_code, 400)
+
+    def test_queries_do_not_grow_with_users(self):
+        def queries(users, action):
+            payload = {'action': action, 'role_name': 'MANAGER', 'user_ids': [str(user.id) for user in users]}
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.bulk(payload).status_code, 200)
+            return len(context)
+
+        for action in ('add_role', 'remove_role', 'deactivate'):
+            self.assertEqual(queries(self.users[:1], action), queries(self.users[1:], action))
@@ -4,7 +4,26 @@ Custom JWT token classes with role information.
 These custom token classes add user roles to the JWT token payload
 for cross-service authentication.
 """
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, BlacklistMixin, RefreshToken
+
+from shared.auth.claims import EMAIL_CLAIM, IS_ACTIVE_CLAIM, ROLES_CLAIM, compact_claims
+
+from .blacklist import get_blacklist_backend
+from .cache import get_user_roles
+from .keys import get_token_backend
+
+
+class CustomAccessToken(AccessToken):
+    """
+    Access token signed and verified through the key-id aware backend.
+    """
+    
+    def get_token_backend(self):
+        return get_token_backend()
 
 
 class CustomRefreshToken(RefreshToken):
@@ -13,7 +32,23 @@ class CustomRefreshToken(RefreshToken):
     
     This allows other microservices to validate user permissions
     without querying the User Service database.
+    
+    Blacklisting goes through the configured blacklist backend
+    (see users/blacklist.py) instead of SimpleJWT's tables directly.
     """
+    access_token_class = CustomAccessToken
+    
+    def get_token_backend(self):
+        return get_token_backend()
+    
+    def check_blacklist(self):
+        """Raise TokenError if this token has been blacklisted."""
+        if get_blacklist_backend().contains(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+    
+    def blacklist(self):
+        """Blacklist this token until it expires."""
+        get_blacklist_backend().add(self)
     
     @classmethod
     def for_user(cls, user):
@@ -25,19 +60,50 @@ class CustomRefreshToken(RefreshToken):
         - email: User's email
         - is_active: User's active status
         - roles: List of role names ['ADMIN', 'CUSTOMER', etc.]
+        
+        With JWT_CLAIM_PROFILE = 'compact', roles are sent as a bitmask
+        under short claim names instead (see shared/auth/claims.py).
         """
-        token = super().for_user(user)
+        # Skip BlacklistMixin.for_user, which always writes an OutstandingToken
+        token = super(BlacklistMixin, cls).for_user(user)
+        get_blacklist_backend().record_outstanding(token, user)
         
         # Add custom claims
         token['user_id'] = str(user.id)
-        token['email'] = user.email
-        token['is_active'] = user.is_active
-        
-        # Add roles as a list of role names
-        roles = list(user.roles.values_list('name', flat=True))
-        token['roles'] = roles
+        token.set_user_claims(user)
         
         return token
+    
+    def set_user_claims(self, user):
+        """
+        Set the email, active status and role claims from `user`.
+        
+        Also called on refresh, so role changes and deactivation reach new
+        access tokens without a new login. Roles come from the role cache,
+        so this usually needs no query.
+        """
+        # Drop either profile's claims, in case JWT_CLAIM_PROFILE changed
+        for name in ('email', 'is_active', 'roles', EMAIL_CLAIM, IS_ACTIVE_CLAIM, ROLES_CLAIM):
+            self.payload.pop(name, None)
+        
+        roles = get_user_roles(user.id)
+        
+        if settings.JWT_CLAIM_PROFILE == 'compact':
+            claims = compact_claims(
+                user.email,
+                user.is_active,
+                roles,
+                include_email=settings.JWT_COMPACT_INCLUDE_EMAIL,
+            )
+            for name, value in claims.items():
+                self[name] = value
+            return
+        
+        self['email'] = user.email
+        self['is_active'] = user.is_active
+        
+        # Add roles as a list of role names
+        self['roles'] = roles
 
 
 def generate_tokens_with_roles(user):
@@ -0,0 +1,276 @@
+"""
+Bulk user export and import.
+
+Export streams users as CSV or NDJSON. Rows are read with
+`iterator(chunk_size=...)`, which uses a server-side cursor on PostgreSQL,
+and roles are prefetched per chunk. Memory stays flat however many users
+are exported.
+
+Import reads records in chunks. Each chunk is validated, its emails and
+phone numbers are checked against the database with one query each, its
+passwords are hashed on a thread pool, and its users and role mappings are
+written with two `bulk_create` calls in one transaction.
+"""
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from .hashers import make_password_unpooled
+from .models import User, UserRoleMapping
+from .roles import get_role_ids
+from .serializers import UserImportSerializer
+
+
+# ==============================================================================
+# EXPORT
+# ==============================================================================
+
+EXPORT_FIELDS = [
+    'id', 'email', 'first_name', 'last_name', 'phone_number', 'is_active',
+    'is_verified', 'is_staff', 'roles', 'address_count', 'created_at', 'last_login',
+]
+
+# Rows joined into each chunk written to the response
+_LINES_PER_WRITE = 500
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Yield a dict per user of `queryset`, which must come from
+    `admin_user_queryset()` (roles prefetched, address count annotated).
+    """
+    chunk_size = chunk_size or settings.USER_EXPORT_CHUNK_SIZE
+    for user in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': str(user.id),
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'phone_number': user.phone_number,
+            'is_active': user.is_active,
+            'is_verified': user.is_verified,
+            'is_staff': user.is_staff,
+            'roles': sorted(role.name for role in user.roles.all()),
+            'address_count': user.address_count,
+            'created_at': user.created_at,
+            'last_login': user.last_login,
+        }
+
+
+def _batched(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= _LINES_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Render export rows as CSV text chunks. Roles are joined with ';'."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            row['roles'] = ';'.join(row['roles'])
+            for name in ('created_at', 'last_login'):
+                row[name] = row[name].isoformat() if row[name] else ''
+            yield writer.writerow([row[name] for name in EXPORT_FIELDS])
+
+    return _batched(lines())
+
+
+def stream_ndjson(rows):
+    """Render export rows as newline-delimited JSON text chunks."""
+    return _batched(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+
+
+# ==============================================================================
+# IMPORT
+# ==============================================================================
+
+def read_csv(file):
+    """
+    Yield (record, error) per row of a CSV file in the export format.
+    Roles are ';'-separated; empty cells are treated as missing.
+    """
+    for record in csv.DictReader(file):
+        record = {key: value for key, value in record.items() if key and value != ''}
+        if 'roles' in record:
+            record['roles'] = [role for role in record['roles'].split(';') if role]
+        yield record, None
+
+
+def read_ndjson(file):
+    """Yield (record, error) per non-blank line of an NDJSON file."""
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield None, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(record, dict):
+            yield None, 'Expected a JSON object.'
+            continue
+        yield record, None
+
+
+@dataclass
+class ImportChunkResult:
+    """Outcome of importing one chunk of records."""
+
+    created: int = 0
+    # (record number, email or None, errors)
+    errors: list = field(default_factory=list)
+
+
+class UserImporter:
+    """
+    Imports users in chunks.
+
+    Args:
+        chunk_size: Records validated and written per transaction
+        workers: Threads hashing plain-text passwords
+    """
+
+    def __init__(self, chunk_size=None, workers=None):
+        self.chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+        self.workers = workers or settings.USER_IMPORT_HASH_WORKERS
+        self.role_ids = get_role_ids()
+        self.validator = UserImportSerializer()
+
+    def run(self, records):
+        """
+        Import (record, read error) pairs, e.g. from `read_csv()`.
+
+        Yields:
+            ImportChunkResult per chunk
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            chunk = []
+            for number, (record, error) in enumerate(records, start=1):
+                chunk.append((number, record, error))
+                if len(chunk) >= self.chunk_size:
+                    yield self.import_chunk(chunk, executor)
+                    chunk = []
+            if chunk:
+                yield self.import_chunk(chunk, executor)
+
+    def _validate(self, chunk, result):
+        """Return [(number, validated data)] for the valid records."""
+        valid = []
+        for number, record, error in chunk:
+            if error:
+                result.errors.append((number, None, {'record': [error]}))
+                continue
+            try:
+                data = self.validator.run_validation(record)
+            except serializers.ValidationError as exc:
+                result.errors.append((number, record.get('email'), exc.detail))
+                continue
+
+            data['email'] = User.objects.normalize_email(data['email'])
+            data['phone_number'] = data.get('phone_number') or None
+            missing = [role for role in data['roles'] if role not in self.role_ids]
+            if missing:
+                result.errors.append((number, data['email'], {'roles': [f"Role '{missing[0]}' does not exist."]}))
+                continue
+            valid.append((number, data))
+        return valid
+
+    def _drop_duplicates(self, valid, result):
+        """
+        Drop records whose email (in any case) or phone number is taken, in
+        the chunk or the database.
+        """
+        emails = {data['email'].lower() for _, data in valid}
+        phones = {data['phone_number'] for _, data in valid if data['phone_number']}
+        # Filtering on LOWER(email) uses the case-insensitive unique index
+        taken_emails = set(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails)
+            .values_list('email_lower', flat=True)
+        )
+        taken_phones = set(User.objects.filter(phone_number__in=phones).values_list('phone_number', flat=True))
+
+        unique = []
+        for number, data in valid:
+            if data['email'].lower() in taken_emails:
+                result.errors.append((number, data['email'], {'email': ['A user with this email already exists.']}))
+                continue
+            if data['phone_number'] and data['phone_number'] in taken_phones:
+                result.errors.append((number, data['email'], {'phone_number': ['A user with this phone number already exists.']}))
+                continue
+            taken_emails.add(data['email'].lower())
+            if data['phone_number']:
+                taken_phones.add(data['phone_number'])
+            unique.append((number, data))
+        return unique
+
+    def _hash(self, data):
+        if data.get('password_hash'):
+            return data['password_hash']
+        if data.get('password'):
+            return make_password_unpooled(data['password'])
+        return make_password(None)
+
+    def import_chunk(self, chunk, executor):
+        """Validate and write one chunk of (number, record, read error)."""
+        result = ImportChunkResult()
+        valid = self._drop_duplicates(self._validate(chunk, result), result)
+        result.errors.sort(key=lambda error: error[0])
+        if not valid:
+            return result
+
+        passwords = executor.map(self._hash, [data for _, data in valid])
+        users = [
+            User(
+                email=data['email'],
+                password=password,
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                phone_number=data['phone_number'],
+                is_active=data['is_active'],
+                is_verified=data['is_verified'],
+            )
+            for (_, data), password in zip(valid, passwords)
+        ]
+        mappings = [
+            UserRoleMapping(user=user, role_id=self.role_ids[role])
+            for user, (_, data) in zip(users, valid)
+            for role in set(data['roles'])
+        ]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                UserRoleMapping.objects.bulk_create(mappings)
+        except IntegrityError as exc:
+            # A concurrent write took an email or phone number; the chunk is
+            # rolled back and can be retried
+            for number, data in valid:
+                result.errors.append((number, data['email'], {'record': [f'Chunk rolled back: {exc}']}))
+            return result
+
+        result.created = len(users)
+        return result
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView,
     LoginView,
     LogoutView,
+    CustomTokenRefreshView,
+    JWKSView,
+    RevocationListView,
     CurrentUserView,
     UserAddressViewSet,
     PasswordResetRequestView,
@@ -13,11 +15,15 @@ from .views import (
     VerifyEmailView,
     ResendVerificationEmailView,
     AdminUserListView,
+    AdminUserExportView,
     AdminUserDetailView,
     AssignRoleView,
     RemoveRoleView,
     ActivateUserView,
     DeactivateUserView,
+    BulkUserActionView,
+    PasswordHashingStatsView,
+    BatchIntrospectionView,
 )
 
 app_name = 'users'
@@ -31,7 +37,10 @@ urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
-    path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/jwks/', JWKSView.as_view(), name='jwks'),
+    path('auth/revocations/', RevocationListView.as_view(), name='revocations'),
+    path('auth/introspect/batch/', BatchIntrospectionView.as_view(), name='introspect_batch'),
     
     # Email verification endpoints
     path('auth/verify-email/', VerifyEmailView.as_view(), name='verify_email'),
@@ -47,11 +56,14 @@ urlpatterns = [
     
     # Admin user management endpoints
     path('admin/users/', AdminUserListView.as_view(), name='admin_user_list'),
+    path('admin/users/export/', AdminUserExportView.as_view(), name='admin_user_export'),
+    path('admin/users/bulk/', BulkUserActionView.as_view(), name='admin_user_bulk'),
     path('admin/users/<uuid:user_id>/', AdminUserDetailView.as_view(), name='admin_user_detail'),
     path('admin/users/<uuid:user_id>/assign-role/', AssignRoleView.as_view(), name='assign_role'),
     path('admin/users/<uuid:user_id>/remove-role/', RemoveRoleView.as_view(), name='remove_role'),
     path('admin/users/<uuid:user_id>/activate/', ActivateUserView.as_view(), name='activate_user'),
     path('admin/users/<uuid:user_id>/deactivate/', DeactivateUserView.as_view(), name='deactivate_user'),
+    path('admin/password-hashing/stats/', PasswordHashingStatsView.as_view(), name='password_hashing_stats'),
     
     # Address endpoints (via router)
     path('', include(router.urls)),
@@ -1,15 +1,19 @@
 """
 Utility functions for the users app.
+
+Emails are queued in the outbox (see users/outbox.py) and sent by the
+`send_outbox_emails` worker, not during the request.
 """
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from .outbox import enqueue_email
+
 
 def send_password_reset_email(user_email, reset_token, user_name=None):
     """
-    Send password reset email to user.
+    Queue a password reset email for the user.
     
     Args:
         user_email (str): User's email address
@@ -43,24 +47,17 @@ def send_password_reset_email(user_email, reset_token, user_name=None):
     
     plain_message = strip_tags(html_message)
     
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending password reset email: {e}")
-        return False
+    enqueue_email(
+        to_email=user_email,
+        subject=subject,
+        body=plain_message,
+        html_body=html_message,
+    )
 
 
 def send_email_verification_email(user_email, verification_token, user_name=None):
     """
-    Send email verification link to user.
+    Queue an email verification link for the user.
     
     Args:
         user_email (str): User's email address
@@ -90,24 +87,17 @@ def send_email_verification_email(user_email, verification_token, user_name=None
     
     plain_message = strip_tags(html_message)
     
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending verification email: {e}")
-        return False
+    enqueue_email(
+        to_email=user_email,
+        subject=subject,
+        body=plain_message,
+        html_body=html_message,
+    )
 
 
 def send_password_changed_notification(user_email, user_name=None):
     """
-    Send notification email when password is successfully changed.
+    Queue a notification email when the password is successfully changed.
     
     Args:
         user_email (str): User's email address
@@ -134,16 +124,9 @@ def send_password_changed_notification(user_email, user_name=None):
     
     plain_message = strip_tags(html_message)
     
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending password changed notification: {e}")
-        return False
+    enqueue_email(
+        to_email=user_email,
+        subject=subject,
+        body=plain_message,
+        html_body=html_message,
+    )
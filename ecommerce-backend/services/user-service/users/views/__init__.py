@@ -6,6 +6,9 @@ from .auth import (
     RegisterView,
     LoginView,
     LogoutView,
+    CustomTokenRefreshView,
+    JWKSView,
+    RevocationListView,
 )
 from .profile import (
     CurrentUserView,
@@ -24,19 +27,28 @@ from .verification import (
 )
 from .admin import (
     AdminUserListView,
+    AdminUserExportView,
     AdminUserDetailView,
     AssignRoleView,
     RemoveRoleView,
     ActivateUserView,
     DeactivateUserView,
+    BulkUserActionView,
+    PasswordHashingStatsView,
     IsAdminUser,
 )
+from .introspection import (
+    BatchIntrospectionView,
+)
 
 __all__ = [
     # Authentication
     'RegisterView',
     'LoginView',
     'LogoutView',
+    'CustomTokenRefreshView',
+    'JWKSView',
+    'RevocationListView',
     
     # Profile
     'CurrentUserView',
@@ -55,10 +67,16 @@ __all__ = [
     
     # Admin Management
     'AdminUserListView',
+    'AdminUserExportView',
     'AdminUserDetailView',
     'AssignRoleView',
     'RemoveRoleView',
     'ActivateUserView',
     'DeactivateUserView',
+    'BulkUserActionView',
+    'PasswordHashingStatsView',
     'IsAdminUser',
+    
+    # Token Introspection
+    'BatchIntrospectionView',
 ]
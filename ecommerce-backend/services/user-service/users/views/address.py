@@ -7,8 +7,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
+from shared.views import ConditionalGetMixin
+
+from ..address_book import promote_default, sync_address_book
 from ..models import UserAddress
-from ..serializers import UserAddressSerializer, UserAddressCreateSerializer
+from ..serializers import UserAddressSerializer, UserAddressCreateSerializer, UserAddressSyncSerializer
 
 
 class IsOwner(permissions.BasePermission):
@@ -16,10 +19,10 @@ class IsOwner(permissions.BasePermission):
     Custom permission to only allow owners to access their addresses.
     """
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.id
 
 
-class UserAddressViewSet(viewsets.ModelViewSet):
+class UserAddressViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing user addresses.
     
@@ -31,12 +34,16 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     - partial_update: PATCH /api/users/me/addresses/{id}/
     - destroy: DELETE /api/users/me/addresses/{id}/
     - set_default: PATCH /api/users/me/addresses/{id}/set-default/
+    - sync: PUT /api/users/me/addresses/sync/
+    
+    list and retrieve answer If-None-Match/If-Modified-Since with 304
+    (see shared/views/conditional.py).
     """
     permission_classes = [permissions.IsAuthenticated, IsOwner]
     
     def get_queryset(self):
         """Return addresses for the authenticated user only."""
-        return UserAddress.objects.filter(user=self.request.user)
+        return UserAddress.objects.filter(user_id=self.request.user.id)
     
     def get_serializer_class(self):
         """Use different serializers for read and write operations."""
@@ -45,9 +52,9 @@ class UserAddressViewSet(viewsets.ModelViewSet):
         return UserAddressSerializer
     
     @extend_schema(
-        responses={200: UserAddressSerializer(many=True)},
+        responses={200: UserAddressSerializer(many=True), 304: OpenApiResponse(description="Not Modified")},
         tags=['User Addresses'],
-        description="Get all addresses for the authenticated user."
+        description="Get all addresses for the authenticated user. Send the ETag back in If-None-Match to get 304 when nothing changed."
     )
     def list(self, request, *args, **kwargs):
         """List all addresses for the current user."""
@@ -76,9 +83,9 @@ class UserAddressViewSet(viewsets.ModelViewSet):
         )
     
     @extend_schema(
-        responses={200: UserAddressSerializer},
+        responses={200: UserAddressSerializer, 304: OpenApiResponse(description="Not Modified")},
         tags=['User Addresses'],
-        description="Get details of a specific address."
+        description="Get details of a specific address. Supports If-None-Match and If-Modified-Since."
     )
     def retrieve(self, request, *args, **kwargs):
         """Retrieve a specific address."""
@@ -115,25 +122,13 @@ class UserAddressViewSet(viewsets.ModelViewSet):
         If the deleted address was default, automatically set another address 
         of the same type as default.
         """
-        address = self.get_object()
-        was_default = address.is_default
-        address_type = address.address_type
-        
-        # Delete the address
-        response = super().destroy(request, *args, **kwargs)
-        
-        # If deleted address was default, set another one as default
-        if was_default:
-            next_address = UserAddress.objects.filter(
-                user=request.user,
-                address_type=address_type
-            ).first()
-            
-            if next_address:
-                next_address.is_default = True
-                next_address.save()
-        
-        return response
+        return super().destroy(request, *args, **kwargs)
+    
+    def perform_destroy(self, instance):
+        """Delete the address, then promote a new default with one UPDATE."""
+        instance.delete()
+        if instance.is_default:
+            promote_default(instance.user_id, instance.address_type)
     
     @extend_schema(
         request=None,
@@ -154,7 +149,40 @@ class UserAddressViewSet(viewsets.ModelViewSet):
         
         # Set as default (model's save method handles unsetting others)
         address.is_default = True
-        address.save()
+        address.save(update_fields=['is_default', 'updated_at'])
         
         serializer = UserAddressSerializer(address)
         return Response(serializer.data)
+    
+    @extend_schema(
+        request=UserAddressSyncSerializer,
+        responses={
+            200: OpenApiResponse(description="Address book synced; returns the counts and the full address book"),
+            400: OpenApiResponse(description="Bad Request - Validation errors"),
+            403: OpenApiResponse(description="An id belongs to another user's address")
+        },
+        tags=['User Addresses'],
+        description=(
+            "Create or update many addresses at once, e.g. to sync offline edits. "
+            "Addresses with a known id are updated, the others are created; ids may be "
+            "assigned by the client. With replace=true, addresses missing from the list "
+            "are deleted."
+        )
+    )
+    @action(detail=False, methods=['put'], url_path='sync')
+    def sync(self, request):
+        """
+        Sync the address book in one transaction.
+        Takes the same number of queries for any number of addresses.
+        """
+        serializer = UserAddressSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        counts = sync_address_book(
+            request.user.id,
+            serializer.validated_data['addresses'],
+            replace=serializer.validated_data['replace'],
+        )
+        
+        addresses = UserAddressSerializer(self.get_queryset(), many=True)
+        return Response({**counts, 'addresses': addresses.data}, status=status.HTTP_200_OK)
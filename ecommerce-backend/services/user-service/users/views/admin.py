@@ -2,41 +2,133 @@
 Admin management views.
 Handles user management, role assignment, and user status updates.
 """
-from rest_framework import status, permissions, generics
+from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.utils import timezone
 
-from ..models import User, UserRole
+from shared.auth import IsAdminUser as SharedIsAdminUser, has_any_role
+
+from ..bulk import NOT_FOUND, UPDATED, apply_bulk_action
+from ..hashers import get_hashing_pool
+from ..models import User, UserAddress
+from ..pagination import ApproximateCountPaginator, KeysetPagination
+from ..roles import get_role_id
+from ..search import search_users
+from ..transfer import export_rows, stream_csv, stream_ndjson
 from ..serializers import (
     AdminUserListSerializer,
     AdminUserDetailSerializer,
     RoleAssignmentSerializer,
     UserStatusSerializer,
+    BulkUserActionSerializer,
     AdminCreateUserSerializer,
 )
 
 
-class IsAdminUser(permissions.BasePermission):
+class IsAdminUser(SharedIsAdminUser):
     """
     Custom permission to only allow admin users.
+    
+    The ADMIN role is read from the token's claims (see
+    users/authentication.py), so admins are authorized without a query.
+    Other users are let in if they are staff, which loads their User row.
     """
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        # Check if user has ADMIN role
-        return request.user.roles.filter(name='ADMIN').exists() or request.user.is_staff
+        # Check if the token carries the ADMIN role
+        claims = getattr(request.user, 'claims', None)
+        if claims is not None:
+            if has_any_role(claims, self.allowed_roles):
+                return True
+        elif request.user.roles.filter(name__in=self.allowed_roles).exists():
+            # Authenticated some other way (e.g. force_authenticate)
+            return True
+        
+        return request.user.is_staff
+
+
+def admin_user_queryset():
+    """
+    Users with everything the admin serializers render: roles prefetched and
+    the address count annotated as a correlated subquery (a JOIN with GROUP
+    BY would also group the filters and search ranking).
+    """
+    address_count = (
+        UserAddress.objects.filter(user=OuterRef('pk'))
+        .order_by()
+        .values('user')
+        .annotate(count=Count('*'))
+        .values('count')
+    )
+    return User.objects.prefetch_related('roles').annotate(
+        address_count=Coalesce(Subquery(address_count), 0, output_field=IntegerField())
+    )
+
+
+def filter_admin_users(queryset, params):
+    """
+    Apply the admin user list filters in `params` (query parameters):
+    is_active, is_verified, role and search.
+    """
+    # Filter by active status
+    is_active = params.get('is_active')
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active.lower() == 'true')
+    
+    # Filter by verified status
+    is_verified = params.get('is_verified')
+    if is_verified is not None:
+        queryset = queryset.filter(is_verified=is_verified.lower() == 'true')
+    
+    # Filter by role
+    # (by id, which filters the mapping table without joining roles)
+    role = params.get('role')
+    if role:
+        role_id = get_role_id(role)
+        queryset = queryset.filter(roles=role_id) if role_id else queryset.none()
+    
+    # Search by email, name, or phone, best matches first
+    search = params.get('search', '').strip()
+    if search:
+        queryset = search_users(queryset, search)
+    
+    return queryset
 
 
 class AdminUserPagination(PageNumberPagination):
-    """Pagination for admin user list."""
+    """
+    Pagination for admin user list.
+    Page numbers by default; `?pagination=cursor` switches to keyset
+    pagination, which stays fast on deep pages and skips the COUNT(*).
+    """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    django_paginator_class = ApproximateCountPaginator
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get('pagination') == 'cursor':
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
 
 
 class AdminUserListView(generics.ListCreateAPIView):
@@ -50,34 +142,8 @@ class AdminUserListView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Get all users with optional filtering."""
-        queryset = User.objects.all().prefetch_related('roles').order_by('-created_at')
-        
-        # Filter by active status
-        is_active = self.request.query_params.get('is_active')
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
-        
-        # Filter by verified status
-        is_verified = self.request.query_params.get('is_verified')
-        if is_verified is not None:
-            queryset = queryset.filter(is_verified=is_verified.lower() == 'true')
-        
-        # Filter by role
-        role = self.request.query_params.get('role')
-        if role:
-            queryset = queryset.filter(roles__name=role)
-        
-        # Search by email, name, or phone
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                models.Q(email__icontains=search) |
-                models.Q(first_name__icontains=search) |
-                models.Q(last_name__icontains=search) |
-                models.Q(phone_number__icontains=search)
-            )
-        
-        return queryset
+        queryset = admin_user_queryset().order_by('-created_at')
+        return filter_admin_users(queryset, self.request.query_params)
     
     def get_serializer_class(self):
         """Use different serializers for list and create."""
@@ -90,7 +156,9 @@ class AdminUserListView(generics.ListCreateAPIView):
             OpenApiParameter(name='is_active', type=bool, description='Filter by active status'),
             OpenApiParameter(name='is_verified', type=bool, description='Filter by verified status'),
             OpenApiParameter(name='role', type=str, description='Filter by role name'),
-            OpenApiParameter(name='search', type=str, description='Search by email, name, or phone'),
+            OpenApiParameter(name='search', type=str, description='Search by email, name, or phone (best matches first)'),
+            OpenApiParameter(name='pagination', type=str, enum=['cursor'], description='Use cursor (keyset) pagination: follow the next/previous links; count is approximate or null'),
+            OpenApiParameter(name='cursor', type=str, description='Cursor from a next/previous link (with pagination=cursor)'),
         ],
         responses={200: AdminUserListSerializer(many=True)},
         tags=['Admin'],
@@ -114,6 +182,51 @@ class AdminUserListView(generics.ListCreateAPIView):
         return super().create(request, *args, **kwargs)
 
 
+class AdminUserExportView(APIView):
+    """
+    Stream all users matching the list filters as CSV or NDJSON (admin only).
+    GET /api/admin/users/export/?output=csv
+    """
+    permission_classes = [IsAdminUser]
+    
+    # `format` is taken by DRF's format suffix override
+    OUTPUTS = {
+        'csv': (stream_csv, 'text/csv'),
+        'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    }
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', type=str, enum=['csv', 'ndjson'], description='File format (default csv)'),
+            OpenApiParameter(name='is_active', type=bool, description='Filter by active status'),
+            OpenApiParameter(name='is_verified', type=bool, description='Filter by verified status'),
+            OpenApiParameter(name='role', type=str, description='Filter by role name'),
+            OpenApiParameter(name='search', type=str, description='Search by email, name, or phone'),
+        ],
+        responses={200: OpenApiResponse(description="CSV or NDJSON file, one user per row")},
+        tags=['Admin'],
+        description="Export users with roles and address counts as a streamed CSV or NDJSON file. Admin only."
+    )
+    def get(self, request):
+        """Export users."""
+        output = request.query_params.get('output', 'csv')
+        if output not in self.OUTPUTS:
+            return Response(
+                {'error': f"Unsupported output '{output}'. Use one of: {', '.join(self.OUTPUTS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        render, content_type = self.OUTPUTS[output]
+        
+        queryset = filter_admin_users(
+            admin_user_queryset().order_by('created_at', 'id'),
+            request.query_params
+        )
+        response = StreamingHttpResponse(render(export_rows(queryset)), content_type=content_type)
+        filename = f'users-{timezone.now():%Y%m%d-%H%M%S}.{output}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class AdminUserDetailView(APIView):
     """
     Get, update, or delete specific user (admin only).
@@ -128,7 +241,7 @@ class AdminUserDetailView(APIView):
     )
     def get(self, request, user_id):
         """Get user details."""
-        user = get_object_or_404(User.objects.prefetch_related('roles'), id=user_id)
+        user = get_object_or_404(admin_user_queryset(), id=user_id)
         serializer = AdminUserDetailSerializer(user)
         return Response(serializer.data)
     
@@ -144,7 +257,10 @@ class AdminUserDetailView(APIView):
         serializer = AdminUserDetailSerializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(serializer.data)
+        
+        # Re-read with roles and address count instead of a query per field
+        user = admin_user_queryset().get(id=user.id)
+        return Response(AdminUserDetailSerializer(user).data)
     
     @extend_schema(
         responses={204: OpenApiResponse(description="User deleted successfully")},
@@ -189,16 +305,16 @@ class AssignRoleView(APIView):
         serializer.is_valid(raise_exception=True)
         
         role_name = serializer.validated_data['role_name']
-        role = UserRole.objects.get(name=role_name)
+        role_id = get_role_id(role_name)
         
         # Check if user already has this role
-        if user.roles.filter(id=role.id).exists():
+        if user.roles.filter(id=role_id).exists():
             return Response(
                 {'message': f'User already has {role_name} role.'},
                 status=status.HTTP_200_OK
             )
         
-        user.roles.add(role)
+        user.roles.add(role_id)
         
         return Response({
             'message': f'{role_name} role assigned to {user.email} successfully.',
@@ -222,17 +338,20 @@ class RemoveRoleView(APIView):
         tags=['Admin'],
         description="Remove a role from a user. Admin only."
     )
+    @transaction.atomic
     def delete(self, request, user_id):
         """Remove role from user."""
-        user = get_object_or_404(User, id=user_id)
+        # Locked, so a concurrent removal of another role (here or in a bulk
+        # action) cannot also pass the last-role check below
+        user = get_object_or_404(User.objects.select_for_update(), id=user_id)
         serializer = RoleAssignmentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         role_name = serializer.validated_data['role_name']
-        role = UserRole.objects.get(name=role_name)
+        role_id = get_role_id(role_name)
         
         # Check if user has this role
-        if not user.roles.filter(id=role.id).exists():
+        if not user.roles.filter(id=role_id).exists():
             return Response(
                 {'message': f'User does not have {role_name} role.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -245,7 +364,7 @@ class RemoveRoleView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        user.roles.remove(role)
+        user.roles.remove(role_id)
         
         return Response({
             'message': f'{role_name} role removed from {user.email} successfully.',
@@ -318,3 +437,80 @@ class DeactivateUserView(APIView):
         return Response({
             'message': f'User {user.email} has been deactivated successfully.'
         }, status=status.HTTP_200_OK)
+
+
+class BulkUserActionView(APIView):
+    """
+    Apply a role or activation change to many users (admin only).
+    POST /api/admin/users/bulk/
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        request=BulkUserActionSerializer,
+        responses={
+            200: OpenApiResponse(description="Per-user results and a summary by status"),
+            400: OpenApiResponse(description="Bad Request")
+        },
+        tags=['Admin'],
+        description=(
+            "Add or remove a role, activate or deactivate users selected by id "
+            "(up to 10000) or by the user list filters. Users that would lose "
+            "their last role, or the requesting admin when deactivating, are "
+            "skipped. Admin only."
+        )
+    )
+    def post(self, request):
+        """Apply bulk action."""
+        serializer = BulkUserActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        if 'user_ids' in data:
+            user_ids = list(dict.fromkeys(data['user_ids']))
+            users = User.objects.filter(pk__in=user_ids)
+        else:
+            # filter_admin_users expects query parameter strings
+            params = {
+                name: str(value).lower() if isinstance(value, bool) else value
+                for name, value in data['filter'].items()
+            }
+            users = filter_admin_users(User.objects.all(), params)
+            user_ids = None
+        
+        results = apply_bulk_action(data['action'], users, request.user, role_name=data.get('role_name'))
+        if user_ids is None:
+            user_ids = list(results)
+        
+        rows = []
+        summary = {}
+        for user_id in user_ids:
+            result_status, detail = results.get(user_id, (NOT_FOUND, 'User not found.'))
+            summary[result_status] = summary.get(result_status, 0) + 1
+            rows.append({'user_id': user_id, 'status': result_status, 'detail': detail})
+        
+        return Response({
+            'message': f"{data['action']} applied to {summary.get(UPDATED, 0)} of {len(rows)} users.",
+            'summary': summary,
+            'results': rows
+        }, status=status.HTTP_200_OK)
+
+
+class PasswordHashingStatsView(APIView):
+    """
+    Password hashing pool metrics for this worker process.
+    GET /api/admin/password-hashing/stats/
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        responses={200: OpenApiResponse(description="Queue wait and hash time metrics")},
+        tags=['Admin'],
+        description="Password hashing pool metrics (queue wait, hash time, rejections) for the worker process serving the request. Admin only."
+    )
+    def get(self, request):
+        """Get hashing pool metrics."""
+        pool = get_hashing_pool()
+        if pool is None:
+            return Response({'message': 'Password hashing pool is disabled.'}, status=status.HTTP_200_OK)
+        return Response(pool.stats(), status=status.HTTP_200_OK)
@@ -5,18 +5,25 @@ Handles user registration, login, logout, and token refresh.
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework_simplejwt.views import TokenRefreshView
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
 
 from ..serializers import (
     RegisterSerializer,
     LoginSerializer,
     TokenResponseSerializer,
+    CustomTokenRefreshSerializer,
     generate_tokens_for_user,
 )
-from ..models import EmailVerificationToken
+from ..models import EmailVerificationToken, RevokedAccessToken
+from ..keys import get_public_jwks
+from ..tokens import CustomRefreshToken
 from ..utils import send_email_verification_email
+from .admin import IsAdminUser
 
 
 class RegisterView(APIView):
@@ -123,6 +130,7 @@ class LogoutView(APIView):
     
     POST /api/auth/logout
     - Blacklist the refresh token to prevent reuse
+    - Revoke the current access token across all services
     """
     permission_classes = [permissions.IsAuthenticated]
     
@@ -141,7 +149,7 @@ class LogoutView(APIView):
             400: OpenApiResponse(description="Bad Request - Invalid token")
         },
         tags=['Authentication'],
-        description="Logout by blacklisting the refresh token."
+        description="Logout by blacklisting the refresh token and revoking the current access token."
     )
     def post(self, request):
         """Logout user by blacklisting refresh token."""
@@ -153,9 +161,13 @@ class LogoutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            token = RefreshToken(refresh_token)
+            token = CustomRefreshToken(refresh_token)
             token.blacklist()
             
+            # Revoke the access token used for this request
+            if request.auth is not None:
+                RevokedAccessToken.revoke(request.auth)
+            
             return Response(
                 {"message": "Logout successful."},
                 status=status.HTTP_205_RESET_CONTENT
@@ -165,3 +177,100 @@ class LogoutView(APIView):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    """
+    API endpoint for refreshing JWT tokens.
+    
+    POST /api/auth/refresh
+    - Returns a new access token (and rotated refresh token)
+    """
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class JWKSView(APIView):
+    """
+    API endpoint publishing the public JWT verification keys.
+    
+    GET /api/auth/jwks
+    - Returns the key set (JWKS) used by other services to verify tokens
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        responses={200: OpenApiResponse(description="JSON Web Key Set")},
+        tags=['Authentication'],
+        description="Public keys for verifying access tokens, identified by `kid`. Empty when tokens are signed with a shared secret."
+    )
+    def get(self, request):
+        """Return the public key set."""
+        return Response(get_public_jwks(), status=status.HTTP_200_OK)
+
+
+class CanReadRevocations(IsAdminUser):
+    """
+    Allow services presenting REVOCATION_FEED_TOKEN in the
+    X-Revocation-Token header, and admins.
+    """
+    def has_permission(self, request, view):
+        expected = settings.REVOCATION_FEED_TOKEN
+        presented = request.headers.get('X-Revocation-Token', '')
+        if expected and presented and secrets.compare_digest(presented, expected):
+            return True
+        return super().has_permission(request, view)
+
+
+class RevocationListView(APIView):
+    """
+    API endpoint exporting revoked access tokens.
+    
+    GET /api/auth/revocations?since=<timestamp>
+    - Returns revoked, not yet expired access token IDs
+    - Pass the returned `server_time` as `since` to fetch only new revocations
+    - Services authenticate with the shared REVOCATION_FEED_TOKEN; the list
+      of who logged out when is not public
+    """
+    permission_classes = [CanReadRevocations]
+    
+    # Rows revoked shortly before `since` are re-sent in case their
+    # transaction committed after the previous export was read
+    OVERLAP = timedelta(seconds=30)
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='since', type=float, description='Unix timestamp returned as server_time by the previous call'),
+        ],
+        responses={
+            200: OpenApiResponse(description="Revoked token IDs with their expiry"),
+            403: OpenApiResponse(description="Forbidden - Missing or wrong X-Revocation-Token")
+        },
+        tags=['Authentication'],
+        description="Incremental export of revoked access tokens, used by other services to reject them locally. Requires the shared X-Revocation-Token header, or an admin."
+    )
+    def get(self, request):
+        """Return revocations since the given timestamp."""
+        now = timezone.now()
+        queryset = RevokedAccessToken.objects.filter(expires_at__gt=now)
+        
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since_time = datetime.fromtimestamp(float(since), tz=dt_timezone.utc)
+            except (ValueError, OverflowError):
+                return Response(
+                    {'error': 'since must be a Unix timestamp.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(revoked_at__gte=since_time - self.OVERLAP)
+        
+        revoked = [
+            {'jti': jti, 'exp': int(expires_at.timestamp())}
+            for jti, expires_at in queryset.order_by().values_list('jti', 'expires_at')
+        ]
+        
+        return Response({
+            'revoked': revoked,
+            'server_time': now.timestamp(),
+        }, status=status.HTTP_200_OK)
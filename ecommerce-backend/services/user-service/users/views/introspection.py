@@ -0,0 +1,104 @@
+"""
+Token introspection views.
+Validates batches of tokens for the gateway and batch workers.
+"""
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+
+from shared.auth.claims import expand_claims
+
+from ..blacklist import get_blacklist_backend
+from ..keys import get_token_backend
+from ..models import RevokedAccessToken
+from ..serializers import BatchIntrospectionSerializer
+from .admin import IsAdminUser
+
+
+def introspect_tokens(tokens):
+    """
+    Validate tokens and look up their revocation status.
+    
+    Signatures and expiry are checked per token with the same backend that
+    issues them. Revocation state is then loaded with one query per token
+    type: revoked access tokens from RevokedAccessToken, blacklisted
+    refresh tokens from the refresh token blacklist backend.
+    
+    Args:
+        tokens: List of raw token strings
+        
+    Returns:
+        List of result dicts, in the same order as the tokens. Claims
+        always use full names, whichever claim profile the token uses.
+    """
+    backend = get_token_backend()
+    type_claim = api_settings.TOKEN_TYPE_CLAIM
+    jti_claim = api_settings.JTI_CLAIM
+    
+    results = []
+    jtis_by_type = {'access': set(), 'refresh': set()}
+    
+    for token in tokens:
+        try:
+            claims = backend.decode(token)
+        except TokenBackendError as e:
+            results.append({'active': False, 'error': str(e)})
+            continue
+        
+        token_type = claims.get(type_claim)
+        if token_type not in jtis_by_type or jti_claim not in claims:
+            results.append({'active': False, 'error': 'Token has wrong type'})
+            continue
+        
+        jtis_by_type[token_type].add(claims[jti_claim])
+        results.append({'active': True, 'token_type': token_type, 'claims': expand_claims(claims)})
+    
+    revoked = set()
+    if jtis_by_type['access']:
+        revoked.update(
+            RevokedAccessToken.objects.filter(
+                jti__in=jtis_by_type['access']
+            ).values_list('jti', flat=True)
+        )
+    if jtis_by_type['refresh']:
+        revoked.update(get_blacklist_backend().contains_many(jtis_by_type['refresh']))
+    
+    for result in results:
+        if 'claims' in result:
+            is_revoked = result['claims'][jti_claim] in revoked
+            result['revoked'] = is_revoked
+            result['active'] = not is_revoked
+    
+    return results
+
+
+class BatchIntrospectionView(APIView):
+    """
+    Introspect a batch of tokens.
+    POST /api/auth/introspect/batch/
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        request=BatchIntrospectionSerializer,
+        responses={
+            200: OpenApiResponse(description="Per-token validity, claims and revocation status"),
+            400: OpenApiResponse(description="Bad Request - Validation errors")
+        },
+        tags=['Authentication'],
+        description="Validate up to 1000 access or refresh tokens in one call. Results are returned in request order. Admin only."
+    )
+    def post(self, request):
+        """Introspect tokens."""
+        serializer = BatchIntrospectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = introspect_tokens(serializer.validated_data['tokens'])
+        
+        return Response({
+            'count': len(results),
+            'results': results
+        }, status=status.HTTP_200_OK)
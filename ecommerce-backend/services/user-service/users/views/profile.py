@@ -2,11 +2,17 @@
 User profile views.
 Handles current user profile display and updates.
 """
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+
+from shared.views import conditional_response, make_etag, set_validators
 
+from ..cache import cache_profile, get_cached_profile
 from ..serializers import UserSerializer, UserUpdateSerializer
 
 
@@ -21,14 +27,30 @@ class CurrentUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     @extend_schema(
-        responses={200: UserSerializer},
+        responses={200: UserSerializer, 304: OpenApiResponse(description="Not Modified")},
         tags=['User Profile'],
-        description="Get the authenticated user's profile information."
+        description="Get the authenticated user's profile information. Send the ETag back in If-None-Match to get 304 when nothing changed."
     )
     def get(self, request):
         """Get current user profile."""
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        # Served from the profile cache without loading the user while it
+        # shows the roles in the token (see users/cache.py)
+        data = None
+        claims = getattr(request.user, 'claims', None)
+        if claims is not None:
+            data = get_cached_profile(request.user.id, claims.roles)
+        
+        if data is None:
+            data = UserSerializer(request.user).data
+            cache_profile(request.user.id, data)
+        
+        # The payload shows roles, which do not change updated_at, so the
+        # ETag is derived from the payload itself
+        etag = make_etag(request, json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder))
+        not_modified = conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(data), etag)
     
     @extend_schema(
         request=UserUpdateSerializer,
@@ -15,13 +15,41 @@ Usage in any service:
 
 from .authentication import (
     MicroserviceJWTAuthentication,
+    AsyncMicroserviceJWTAuthentication,
+    MicroserviceUser,
     has_role,
     has_any_role,
     has_all_roles,
     get_user_from_token,
+    decode_many,
+    warm_up,
+)
+
+from .cache import (
+    VerifiedTokenCache,
+    get_token_cache,
+)
+
+from .claims import (
+    ROLE_BITS,
+    encode_roles,
+    decode_roles,
+    compact_claims,
+    expand_claims,
+)
+
+from .keys import (
+    KeySet,
+    get_key_set,
+)
+
+from .revocation import (
+    RevocationList,
+    get_revocation_list,
 )
 
 from .permissions import (
+    RolePermission,
     IsAdminUser,
     IsAdminOrReadOnly,
     IsManagerOrAdmin,
@@ -30,17 +58,50 @@ from .permissions import (
     IsSupportOrAdmin,
     HasAnyRole,
     ReadOnlyOrAuthenticated,
+    AsyncPermissionMixin,
+    AsyncIsAdminUser,
+    AsyncIsAdminOrReadOnly,
+    AsyncIsManagerOrAdmin,
+    AsyncIsOwnerOrAdmin,
+    AsyncIsAuthenticatedCustomer,
+    AsyncIsSupportOrAdmin,
+    AsyncHasAnyRole,
+    AsyncReadOnlyOrAuthenticated,
 )
 
 __all__ = [
     # Authentication
     'MicroserviceJWTAuthentication',
+    'AsyncMicroserviceJWTAuthentication',
+    'MicroserviceUser',
     'has_role',
     'has_any_role',
     'has_all_roles',
     'get_user_from_token',
+    'decode_many',
+    'warm_up',
+    
+    # Token cache
+    'VerifiedTokenCache',
+    'get_token_cache',
+    
+    # Claims
+    'ROLE_BITS',
+    'encode_roles',
+    'decode_roles',
+    'compact_claims',
+    'expand_claims',
+    
+    # Key set
+    'KeySet',
+    'get_key_set',
+    
+    # Revocation
+    'RevocationList',
+    'get_revocation_list',
     
     # Permissions
+    'RolePermission',
     'IsAdminUser',
     'IsAdminOrReadOnly',
     'IsManagerOrAdmin',
@@ -49,4 +110,15 @@ __all__ = [
     'IsSupportOrAdmin',
     'HasAnyRole',
     'ReadOnlyOrAuthenticated',
+    
+    # Async permissions
+    'AsyncPermissionMixin',
+    'AsyncIsAdminUser',
+    'AsyncIsAdminOrReadOnly',
+    'AsyncIsManagerOrAdmin',
+    'AsyncIsOwnerOrAdmin',
+    'AsyncIsAuthenticatedCustomer',
+    'AsyncIsSupportOrAdmin',
+    'AsyncHasAnyRole',
+    'AsyncReadOnlyOrAuthenticated',
 ]
@@ -8,8 +8,126 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
 import jwt
 
+from .cache import get_token_cache
+from .claims import EMAIL_CLAIM, IS_ACTIVE_CLAIM, ROLES_CLAIM, decode_roles
+from .keys import get_key_set
+from .revocation import get_revocation_list
+
+
+_NO_ROLES = frozenset()
+
+
+class MicroserviceUser:
+    """
+    Lightweight user built from a validated JWT payload.
+    
+    A single slotted class is shared by every request instead of building
+    a new class per token. Roles are held as a frozenset so role checks are
+    set lookups rather than list scans.
+    """
+    
+    __slots__ = ('id', 'email', 'is_active', 'roles')
+    
+    is_authenticated = True
+    is_anonymous = False
+    
+    def __init__(self, id, email='', is_active=True, roles=()):
+        self.id = id
+        self.email = email
+        self.is_active = is_active
+        self.roles = frozenset(roles)
+    
+    @classmethod
+    def from_payload(cls, payload):
+        """
+        Build a user from a validated token payload.
+        
+        Handles both the full and the compact claim profile (see claims.py).
+        
+        Args:
+            payload: The validated JWT token payload
+            
+        Returns:
+            MicroserviceUser with id, email, is_active, and roles
+        """
+        if ROLES_CLAIM in payload:
+            return cls(
+                id=payload.get('user_id'),
+                email=payload.get(EMAIL_CLAIM, ''),
+                is_active=payload.get(IS_ACTIVE_CLAIM, True),
+                roles=decode_roles(payload[ROLES_CLAIM]),
+            )
+        return cls(
+            id=payload.get('user_id'),
+            email=payload.get('email', ''),
+            is_active=payload.get('is_active', True),
+            roles=payload.get('roles') or _NO_ROLES,
+        )
+    
+    @property
+    def pk(self):
+        """Alias for id, used by DRF throttling and logging."""
+        return self.id
+    
+    def __repr__(self):
+        return f"<MicroserviceUser {self.id} roles={sorted(self.roles)}>"
+
+
+def _resolve_verifying_key(raw_token, blocking=True):
+    """
+    Return the (key, algorithm) pair used to verify a token.
+    
+    With a key set configured (JWKS_FILE or JWKS_URL), the key is picked by
+    the token's `kid` header. Otherwise the shared SIMPLE_JWT signing key is used.
+    
+    With `blocking=False` an unknown `kid` never reloads the key set inline
+    (see KeySet.get_key).
+    
+    Raises:
+        jwt.InvalidTokenError: If the token's `kid` is not in the key set
+    """
+    key_set = get_key_set()
+    if key_set is None:
+        return settings.SIMPLE_JWT['SIGNING_KEY'], settings.SIMPLE_JWT['ALGORITHM']
+    
+    kid = jwt.get_unverified_header(raw_token).get('kid')
+    jwk = key_set.get_key(kid, blocking=blocking)
+    if jwk is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key '{kid}'")
+    return jwk.key, jwk.algorithm_name
+
+
+def _decode_token(raw_token, blocking=True):
+    """
+    Verify a raw JWT and return its payload.
+    
+    Payloads of tokens that were already verified are served from the
+    verified token cache when it is enabled (see MICROSERVICE_AUTH).
+    Cached or not, the token is checked against the revocation list.
+    
+    Raises:
+        jwt.InvalidTokenError: If token is invalid, expired, or revoked
+    """
+    cache = get_token_cache()
+    payload = cache.get(raw_token) if cache is not None else None
+    
+    if payload is None:
+        key, algorithm = _resolve_verifying_key(raw_token, blocking)
+        payload = jwt.decode(raw_token, key, algorithms=[algorithm])
+        if cache is not None:
+            cache.set(raw_token, payload)
+    
+    revocations = get_revocation_list()
+    if revocations is not None and revocations.is_revoked(payload.get('jti')):
+        raise jwt.InvalidTokenError('Token has been revoked')
+    return payload
+
 
 class MicroserviceJWTAuthentication(JWTAuthentication):
     """
@@ -19,9 +137,13 @@ class MicroserviceJWTAuthentication(JWTAuthentication):
     user information including roles from the token payload.
     """
     
+    # Whether key lookups may block on I/O (see AsyncMicroserviceJWTAuthentication)
+    blocking = True
+    
     def get_validated_token(self, raw_token):
         """
-        Validates the JWT token using the shared secret key.
+        Validates the JWT token using the shared secret key, or the
+        User Service's public key set when one is configured.
         
         Args:
             raw_token: The raw JWT token string
@@ -33,13 +155,8 @@ class MicroserviceJWTAuthentication(JWTAuthentication):
             InvalidToken: If token is invalid or expired
         """
         try:
-            # Validate token using shared JWT secret
-            payload = jwt.decode(
-                raw_token,
-                settings.SIMPLE_JWT['SIGNING_KEY'],
-                algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
-            )
-            return payload
+            # Verified against the key set: the shared secret or the JWKS keys
+            return _decode_token(raw_token, self.blocking)
         except jwt.ExpiredSignatureError:
             raise InvalidToken('Token has expired')
         except jwt.InvalidTokenError as e:
@@ -63,21 +180,98 @@ class MicroserviceJWTAuthentication(JWTAuthentication):
             if not user_id:
                 raise AuthenticationFailed('Token contained no recognizable user identification')
             
-            # Create a simple user object from token data
-            user = type('User', (), {
-                'id': user_id,
-                'email': validated_token.get('email', ''),
-                'is_authenticated': True,
-                'is_active': validated_token.get('is_active', True),
-                'roles': validated_token.get('roles', []),  # List of role names
-            })()
-            
-            return user
+            return MicroserviceUser.from_payload(validated_token)
             
         except KeyError:
             raise AuthenticationFailed('Token contained incomplete user data')
 
 
+_warmed_up = False
+
+
+def warm_up():
+    """
+    Load the key set and start the revocation list sync.
+    
+    Both are otherwise loaded on the first request, which reads a file or
+    calls the User Service. Call this from AppConfig.ready() or an ASGI
+    startup hook to keep that I/O off the request path.
+    """
+    global _warmed_up
+    get_key_set()
+    get_revocation_list()
+    _warmed_up = True
+
+
+@receiver(setting_changed)
+def _reset_warm_up(setting, **kwargs):
+    """Reload on next use when auth settings change (e.g., override_settings in tests)."""
+    global _warmed_up
+    if setting == 'MICROSERVICE_AUTH':
+        _warmed_up = False
+
+
+class AsyncMicroserviceJWTAuthentication(MicroserviceJWTAuthentication):
+    """
+    MicroserviceJWTAuthentication for async views under an ASGI server.
+    
+    `aauthenticate` is the coroutine version of `authenticate`, for async
+    code to await instead of running it in a thread with sync_to_async.
+    `authenticate` stays a plain method, so the class also works (and fails
+    closed) on sync views, which never await it.
+    
+    Validation is CPU-only: the signature check, cache, key set and
+    revocation list are all in memory. The one-time loading of the key set
+    and revocation list is the only I/O, and runs in a thread once per
+    process unless warm_up() was called at startup. Unknown signing keys
+    reload the key set in the background rather than inline.
+    
+    Usage:
+        from adrf.views import APIView
+        
+        class OrderView(APIView):
+            authentication_classes = [AsyncMicroserviceJWTAuthentication]
+            permission_classes = [AsyncIsAuthenticatedCustomer]
+            
+            async def get(self, request):
+                ...
+    """
+    
+    blocking = False
+    
+    async def aauthenticate(self, request):
+        """
+        Authenticate the request from its Authorization header.
+        
+        Returns:
+            (MicroserviceUser, validated payload) tuple, or None if the
+            request carries no token
+        """
+        if not _warmed_up:
+            await sync_to_async(warm_up)()
+        
+        header = self.get_header(request)
+        if header is None:
+            return None
+        
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
+
+
+def _get_roles(user):
+    """Return the user's roles as a frozenset (empty if the user has none)."""
+    roles = getattr(user, 'roles', None)
+    if roles is None:
+        return _NO_ROLES
+    if isinstance(roles, frozenset):
+        return roles
+    return frozenset(roles)
+
+
 def has_role(user, role_name):
     """
     Check if user has a specific role.
@@ -89,9 +283,7 @@ def has_role(user, role_name):
     Returns:
         Boolean indicating if user has the role
     """
-    if not hasattr(user, 'roles'):
-        return False
-    return role_name in user.roles
+    return role_name in _get_roles(user)
 
 
 def has_any_role(user, role_names):
@@ -105,9 +297,7 @@ def has_any_role(user, role_names):
     Returns:
         Boolean indicating if user has any of the roles
     """
-    if not hasattr(user, 'roles'):
-        return False
-    return any(role in user.roles for role in role_names)
+    return not _get_roles(user).isdisjoint(role_names)
 
 
 def has_all_roles(user, role_names):
@@ -121,16 +311,15 @@ def has_all_roles(user, role_names):
     Returns:
         Boolean indicating if user has all the roles
     """
-    if not hasattr(user, 'roles'):
-        return False
-    return all(role in user.roles for role in role_names)
+    return _get_roles(user).issuperset(role_names)
 
 
 def get_user_from_token(token):
     """
     Extract user information directly from a JWT token string.
     
-    Useful for background tasks or when you have a raw token.
+    Useful for background tasks or when you have a raw token. For many
+    tokens at once, use decode_many.
     
     Args:
         token: JWT token string
@@ -142,21 +331,95 @@ def get_user_from_token(token):
         InvalidToken: If token is invalid
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SIMPLE_JWT['SIGNING_KEY'],
-            algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
-        )
-        
-        user = type('User', (), {
-            'id': payload.get('user_id'),
-            'email': payload.get('email', ''),
-            'is_authenticated': True,
-            'is_active': payload.get('is_active', True),
-            'roles': payload.get('roles', []),
-        })()
-        
-        return user
+        payload = _decode_token(token)
+        return MicroserviceUser.from_payload(payload)
         
     except jwt.InvalidTokenError as e:
         raise InvalidToken(f'Invalid token: {str(e)}')
+
+
+def _make_batch_decoder():
+    """
+    Return a function that verifies raw tokens into payloads.
+    
+    Settings, the token cache, the revocation list and the static key are
+    looked up once when the decoder is built; keys from the key set are
+    resolved once per `kid`.
+    """
+    cache = get_token_cache()
+    revocations = get_revocation_list()
+    key_set = get_key_set()
+    static_key = (settings.SIMPLE_JWT['SIGNING_KEY'], settings.SIMPLE_JWT['ALGORITHM'])
+    keys_by_kid = {}
+    
+    def resolve(raw_token):
+        if key_set is None:
+            return static_key
+        kid = jwt.get_unverified_header(raw_token).get('kid')
+        resolved = keys_by_kid.get(kid)
+        if resolved is None:
+            jwk = key_set.get_key(kid)
+            if jwk is None:
+                raise jwt.InvalidTokenError(f"Unknown signing key '{kid}'")
+            resolved = keys_by_kid[kid] = (jwk.key, jwk.algorithm_name)
+        return resolved
+    
+    def decode(raw_token):
+        payload = cache.get(raw_token) if cache is not None else None
+        if payload is None:
+            key, algorithm = resolve(raw_token)
+            payload = jwt.decode(raw_token, key, algorithms=[algorithm])
+            if cache is not None:
+                cache.set(raw_token, payload)
+        if revocations is not None and revocations.is_revoked(payload.get('jti')):
+            raise jwt.InvalidTokenError('Token has been revoked')
+        return payload
+    
+    return decode
+
+
+def decode_many(tokens, workers=None):
+    """
+    Extract user information from many JWT token strings.
+    
+    Batch version of get_user_from_token for background consumers and
+    event replays. Keys and settings are resolved once for the whole batch,
+    and an invalid token is reported in its result instead of raising.
+    
+    Args:
+        tokens: Sequence of JWT token strings
+        workers: Number of threads to verify tokens on. None verifies them
+            on the calling thread, which is fastest for HMAC tokens;
+            asymmetric signature checks release the GIL and benefit from
+            a few workers on large batches.
+            
+    Returns:
+        List of (user, error) pairs in the same order as the tokens: a
+        MicroserviceUser and None, or None and the InvalidToken error
+    """
+    decode = _make_batch_decoder()
+    
+    def decode_slice(raw_tokens):
+        results = []
+        for raw_token in raw_tokens:
+            try:
+                payload = decode(raw_token)
+            except jwt.ExpiredSignatureError:
+                results.append((None, InvalidToken('Token has expired')))
+                continue
+            except jwt.InvalidTokenError as e:
+                results.append((None, InvalidToken(f'Invalid token: {str(e)}')))
+                continue
+            results.append((MicroserviceUser.from_payload(payload), None))
+        return results
+    
+    tokens = list(tokens)
+    if not workers or workers < 2 or len(tokens) < 2:
+        return decode_slice(tokens)
+    
+    # One contiguous slice per worker, so large batches don't create a
+    # future per token
+    size = -(-len(tokens) // workers)
+    slices = [tokens[i:i + size] for i in range(0, len(tokens), size)]
+    with ThreadPoolExecutor(max_workers=len(slices)) as executor:
+        return [result for chunk in executor.map(decode_slice, slices) for result in chunk]
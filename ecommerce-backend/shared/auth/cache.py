@@ -0,0 +1,147 @@
+"""
+Verified Token Cache for Microservices.
+
+Access tokens are reused for their whole lifetime, so downstream services
+keep the payloads they have already verified and skip the signature check
+and claim parsing on repeat requests.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .conf import auth_setting
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads.
+
+    Entries are keyed by a SHA-256 digest of the raw token, so the tokens
+    themselves are never kept in memory. An entry is dropped when it is the
+    least recently used one and the cache is full, or once the token's `exp`
+    claim has passed.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(raw_token):
+        """Hash the raw token (str or bytes) into a cache key."""
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).digest()
+
+    def get(self, raw_token):
+        """
+        Return a copy of the cached payload for a token.
+
+        Args:
+            raw_token: The raw JWT token string or bytes
+
+        Returns:
+            Payload dict, or None if the token is not cached or has expired
+        """
+        key = self._key(raw_token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        # Callers get their own copy so they cannot alter the cached payload
+        return dict(payload)
+
+    def set(self, raw_token, payload):
+        """
+        Store a verified payload, evicting the least recently used entries.
+
+        Args:
+            raw_token: The raw JWT token string or bytes
+            payload: The verified token payload
+        """
+        exp = payload.get('exp')
+        expires_at = exp if isinstance(exp, (int, float)) else None
+        key = self._key(raw_token)
+
+        with self._lock:
+            self._entries[key] = (dict(payload), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict with 'size', 'maxsize', 'hits' and 'misses' keys
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """
+    Return the process-wide verified token cache.
+
+    The cache is created on first use with MICROSERVICE_AUTH['TOKEN_CACHE_SIZE']
+    entries.
+
+    Returns:
+        VerifiedTokenCache instance, or None if the cache is disabled
+    """
+    global _token_cache
+
+    if _token_cache is None:
+        maxsize = auth_setting('TOKEN_CACHE_SIZE')
+        if not maxsize:
+            return None
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = VerifiedTokenCache(maxsize)
+
+    return _token_cache
+
+
+@receiver(setting_changed)
+def _reset_token_cache(setting, **kwargs):
+    """Drop the cache when auth settings change (e.g., override_settings in tests)."""
+    global _token_cache
+    if setting in ('MICROSERVICE_AUTH', 'SIMPLE_JWT'):
+        _token_cache = None
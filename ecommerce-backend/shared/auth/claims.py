@@ -0,0 +1,118 @@
+"""
+Compact Token Claims.
+
+Access tokens travel in the Authorization header of every inter-service
+call. The compact claim profile keeps them small: roles become an integer
+bitmask, claim names are shortened, and email is left out unless the
+User Service is configured to include it.
+
+    Full profile:    {"email": "a@b.com", "is_active": true, "roles": ["ADMIN", "CUSTOMER"]}
+    Compact profile: {"rl": 3}
+
+Both profiles are decoded transparently by MicroserviceJWTAuthentication.
+"""
+import logging
+from functools import lru_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Bit assigned to each role any service checks (SUPPORT is used by
+# IsSupportOrAdmin). Existing bits must never change, since tokens already
+# issued carry them; new roles get the next free bit. The User Service
+# refuses to start if one of its roles has no bit (users/checks.py).
+ROLE_BITS = {
+    'CUSTOMER': 1 << 0,
+    'ADMIN': 1 << 1,
+    'MANAGER': 1 << 2,
+    'SUPPORT': 1 << 3,
+}
+
+# Compact claim names
+ROLES_CLAIM = 'rl'
+EMAIL_CLAIM = 'em'
+IS_ACTIVE_CLAIM = 'act'
+
+
+def encode_roles(role_names):
+    """
+    Encode role names as a bitmask.
+
+    Roles without a bit in ROLE_BITS are left out and logged: the token then
+    grants less, never more, and issuing it does not fail.
+
+    Args:
+        role_names: Iterable of role names (e.g., ['ADMIN', 'CUSTOMER'])
+
+    Returns:
+        Integer bitmask
+    """
+    mask = 0
+    for name in role_names:
+        bit = ROLE_BITS.get(name)
+        if bit is None:
+            logger.warning("Role '%s' has no bit assigned in ROLE_BITS; left out of the token", name)
+            continue
+        mask |= bit
+    return mask
+
+
+@lru_cache(maxsize=None)
+def decode_roles(mask):
+    """
+    Decode a roles bitmask into a frozenset of role names.
+
+    Results are cached per mask, so each distinct role combination is only
+    decoded once per process.
+    """
+    return frozenset(name for name, bit in ROLE_BITS.items() if mask & bit)
+
+
+def compact_claims(email, is_active, role_names, include_email=False):
+    """
+    Build the compact claims for a user.
+
+    `is_active` is only included when False, since tokens are normally
+    issued to active users.
+
+    Returns:
+        dict of compact claims to add to the token payload
+    """
+    claims = {ROLES_CLAIM: encode_roles(role_names)}
+    if include_email:
+        claims[EMAIL_CLAIM] = email
+    if not is_active:
+        claims[IS_ACTIVE_CLAIM] = False
+    return claims
+
+
+def is_compact(payload):
+    """Check if a token payload uses the compact claim profile."""
+    return ROLES_CLAIM in payload
+
+
+def get_roles(payload):
+    """Return the token's roles as a frozenset, for either claim profile."""
+    if ROLES_CLAIM in payload:
+        return decode_roles(payload[ROLES_CLAIM])
+    return frozenset(payload.get('roles') or ())
+
+
+def expand_claims(payload):
+    """
+    Return a copy of the payload using full claim names.
+
+    Useful for code that reads `email`, `is_active` or `roles` directly,
+    e.g. when returning claims to clients.
+    """
+    if not is_compact(payload):
+        return dict(payload)
+
+    expanded = {
+        key: value for key, value in payload.items()
+        if key not in (ROLES_CLAIM, EMAIL_CLAIM, IS_ACTIVE_CLAIM)
+    }
+    expanded['email'] = payload.get(EMAIL_CLAIM, '')
+    expanded['is_active'] = payload.get(IS_ACTIVE_CLAIM, True)
+    expanded['roles'] = sorted(decode_roles(payload[ROLES_CLAIM]))
+    return expanded
@@ -0,0 +1,54 @@
+"""
+Settings for the Shared Authentication Package.
+
+Options are read from the MICROSERVICE_AUTH dict in the service's settings.py,
+falling back to the defaults below. JWT keys and algorithms still come from
+SIMPLE_JWT so they stay in sync with the User Service.
+
+Example:
+    MICROSERVICE_AUTH = {
+        'TOKEN_CACHE_SIZE': 4096,
+    }
+"""
+from django.conf import settings
+
+
+DEFAULTS = {
+    # Max number of verified token payloads kept in memory (0 disables the cache)
+    'TOKEN_CACHE_SIZE': 0,
+    
+    # Public key set for asymmetric tokens: a local JWKS file or the User
+    # Service endpoint (e.g. http://user-service:8000/api/auth/jwks/).
+    # When neither is set, tokens are verified with SIMPLE_JWT['SIGNING_KEY'].
+    'JWKS_FILE': None,
+    'JWKS_URL': None,
+    
+    # Seconds before the key set is reloaded in the background
+    'JWKS_REFRESH_INTERVAL': 300,
+    
+    # User Service endpoint exporting revoked access tokens
+    # (e.g. http://user-service:8000/api/auth/revocations/). None disables
+    # revocation checks.
+    'REVOCATION_URL': None,
+    
+    # Shared secret sent in the X-Revocation-Token header to read the export
+    # (the User Service's REVOCATION_FEED_TOKEN)
+    'REVOCATION_TOKEN': None,
+    
+    # Seconds between revocation list syncs
+    'REVOCATION_REFRESH_INTERVAL': 30,
+}
+
+
+def auth_setting(name):
+    """
+    Return a shared auth setting from MICROSERVICE_AUTH or its default.
+
+    Args:
+        name: Setting name (e.g., 'TOKEN_CACHE_SIZE')
+
+    Returns:
+        The configured value, or the default if not configured
+    """
+    overrides = getattr(settings, 'MICROSERVICE_AUTH', None) or {}
+    return overrides.get(name, DEFAULTS[name])
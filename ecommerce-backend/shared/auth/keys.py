@@ -0,0 +1,175 @@
+"""
+Public Key Set for Offline Token Verification.
+
+When the User Service signs tokens with an asymmetric algorithm (e.g. RS256),
+it publishes its public keys as a JWKS document. Services load that document
+from a local file or the User Service endpoint, keep the parsed keys by `kid`,
+and reload them in the background so key rotation needs no restart.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+import jwt
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .conf import auth_setting
+
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between reloads forced by an unknown `kid`
+MIN_FORCED_RELOAD_INTERVAL = 30
+
+
+class KeySet:
+    """
+    JWKS loaded from a file path or URL, with parsed keys cached by `kid`.
+
+    Keys are parsed once per load, so verification never parses key material.
+    When the key set is older than `refresh_interval`, a background thread
+    reloads it while requests keep using the current keys. A token with an
+    unknown `kid` (e.g. right after a rotation) triggers an immediate reload,
+    rate limited to one every MIN_FORCED_RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self, source, refresh_interval=300, timeout=5):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._loaded_at = 0
+        self._forced_at = 0
+        self._file_mtime = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.reload()
+
+    @property
+    def is_url(self):
+        return self.source.startswith(('http://', 'https://'))
+
+    def _read(self):
+        """Read the raw JWKS document from the file or URL."""
+        if self.is_url:
+            with urllib.request.urlopen(self.source, timeout=self.timeout) as response:
+                return json.load(response)
+        with open(self.source) as f:
+            return json.load(f)
+
+    def reload(self):
+        """
+        Load the key set and replace the cached keys.
+
+        Keys that fail to parse are skipped. If the source cannot be read,
+        the previous keys are kept.
+        """
+        try:
+            if not self.is_url:
+                mtime = os.stat(self.source).st_mtime
+                if mtime == self._file_mtime and self._keys:
+                    self._loaded_at = time.monotonic()
+                    return
+            document = self._read()
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load JWT key set from %s: %s", self.source, e)
+            self._loaded_at = time.monotonic()
+            return
+
+        keys = {}
+        for jwk in document.get('keys', []):
+            try:
+                parsed = jwt.PyJWK.from_dict(jwk)
+            except jwt.PyJWKError as e:
+                logger.warning("Skipping JWT key %s: %s", jwk.get('kid'), e)
+                continue
+            if parsed.key_id:
+                keys[parsed.key_id] = parsed
+
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+            if not self.is_url:
+                self._file_mtime = mtime
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        finally:
+            self._refreshing = False
+
+    def _start_background_reload(self):
+        if not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def get_key(self, kid, blocking=True):
+        """
+        Return the parsed key for a `kid`.
+
+        Args:
+            kid: Key id from the token header
+            blocking: Whether an unknown kid may reload the key set inline.
+                Async callers pass False: the reload then runs on a
+                background thread and this call never waits on I/O.
+
+        Returns:
+            jwt.PyJWK instance, or None if the kid is unknown
+        """
+        now = time.monotonic()
+
+        if now - self._loaded_at > self.refresh_interval:
+            self._start_background_reload()
+
+        key = self._keys.get(kid)
+        if key is None and now - self._forced_at > MIN_FORCED_RELOAD_INTERVAL:
+            self._forced_at = now
+            if not blocking:
+                self._start_background_reload()
+                return None
+            self.reload()
+            key = self._keys.get(kid)
+        return key
+
+    def kids(self):
+        """Return the key ids currently loaded."""
+        return list(self._keys)
+
+
+_key_set = None
+_key_set_lock = threading.Lock()
+
+
+def get_key_set():
+    """
+    Return the process-wide key set.
+
+    The key set is loaded on first use from MICROSERVICE_AUTH['JWKS_FILE']
+    or MICROSERVICE_AUTH['JWKS_URL'].
+
+    Returns:
+        KeySet instance, or None if no key set is configured (HMAC tokens)
+    """
+    global _key_set
+
+    if _key_set is None:
+        source = auth_setting('JWKS_FILE') or auth_setting('JWKS_URL')
+        if not source:
+            return None
+        with _key_set_lock:
+            if _key_set is None:
+                _key_set = KeySet(source, auth_setting('JWKS_REFRESH_INTERVAL'))
+
+    return _key_set
+
+
+@receiver(setting_changed)
+def _reset_key_set(setting, **kwargs):
+    """Drop the key set when auth settings change (e.g., override_settings in tests)."""
+    global _key_set
+    if setting == 'MICROSERVICE_AUTH':
+        _key_set = None
@@ -7,23 +7,45 @@ from rest_framework.permissions import BasePermission, SAFE_METHODS
 from .authentication import has_role, has_any_role
 
 
-class IsAdminUser(BasePermission):
+class RolePermission(BasePermission):
     """
-    Permission class to allow only users with ADMIN role.
+    Base permission class that allows users with any of a fixed set of roles.
+    
+    Subclasses list their roles in `allowed_roles`. The roles are compiled
+    into a frozenset once, when the subclass is defined, so each request
+    only does a set intersection check.
     
     Usage:
-        class ProductViewSet(viewsets.ModelViewSet):
-            permission_classes = [IsAdminUser]
+        class IsWarehouseStaff(RolePermission):
+            allowed_roles = {'ADMIN', 'WAREHOUSE'}
     """
     
+    allowed_roles = frozenset()
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.allowed_roles = frozenset(cls.allowed_roles)
+    
     def has_permission(self, request, view):
-        """Check if user is authenticated and has ADMIN role."""
+        """Check if user is authenticated and has any of the allowed roles."""
         if not request.user or not request.user.is_authenticated:
             return False
-        return has_role(request.user, 'ADMIN')
+        return has_any_role(request.user, self.allowed_roles)
 
 
-class IsAdminOrReadOnly(BasePermission):
+class IsAdminUser(RolePermission):
+    """
+    Permission class to allow only users with ADMIN role.
+    
+    Usage:
+        class ProductViewSet(viewsets.ModelViewSet):
+            permission_classes = [IsAdminUser]
+    """
+    
+    allowed_roles = {'ADMIN'}
+
+
+class IsAdminOrReadOnly(RolePermission):
     """
     Permission class to allow ADMIN full access, others read-only.
     
@@ -34,18 +56,17 @@ class IsAdminOrReadOnly(BasePermission):
             permission_classes = [IsAdminOrReadOnly]
     """
     
+    allowed_roles = {'ADMIN'}
+    
     def has_permission(self, request, view):
         """Allow GET/HEAD/OPTIONS for anyone, POST/PUT/PATCH/DELETE for admins only."""
         if request.method in SAFE_METHODS:
             return True
         
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        return has_role(request.user, 'ADMIN')
+        return super().has_permission(request, view)
 
 
-class IsManagerOrAdmin(BasePermission):
+class IsManagerOrAdmin(RolePermission):
     """
     Permission class to allow MANAGER or ADMIN roles.
     
@@ -54,11 +75,7 @@ class IsManagerOrAdmin(BasePermission):
             permission_classes = [IsManagerOrAdmin]
     """
     
-    def has_permission(self, request, view):
-        """Check if user has MANAGER or ADMIN role."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        return has_any_role(request.user, ['ADMIN', 'MANAGER'])
+    allowed_roles = {'ADMIN', 'MANAGER'}
 
 
 class IsOwnerOrAdmin(BasePermission):
@@ -92,7 +109,7 @@ class IsOwnerOrAdmin(BasePermission):
         return False
 
 
-class IsAuthenticatedCustomer(BasePermission):
+class IsAuthenticatedCustomer(RolePermission):
     """
     Permission class to allow authenticated users with CUSTOMER role.
     
@@ -101,14 +118,10 @@ class IsAuthenticatedCustomer(BasePermission):
             permission_classes = [IsAuthenticatedCustomer]
     """
     
-    def has_permission(self, request, view):
-        """Check if user is authenticated and has CUSTOMER role."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        return has_role(request.user, 'CUSTOMER')
+    allowed_roles = {'CUSTOMER'}
 
 
-class IsSupportOrAdmin(BasePermission):
+class IsSupportOrAdmin(RolePermission):
     """
     Permission class to allow SUPPORT or ADMIN roles.
     
@@ -119,11 +132,7 @@ class IsSupportOrAdmin(BasePermission):
             permission_classes = [IsSupportOrAdmin]
     """
     
-    def has_permission(self, request, view):
-        """Check if user has SUPPORT or ADMIN role."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        return has_any_role(request.user, ['ADMIN', 'SUPPORT'])
+    allowed_roles = {'ADMIN', 'SUPPORT'}
 
 
 class HasAnyRole(BasePermission):
@@ -134,15 +143,23 @@ class HasAnyRole(BasePermission):
         class MyView(APIView):
             permission_classes = [HasAnyRole]
             required_roles = ['ADMIN', 'MANAGER', 'SUPPORT']
+    
+    `required_roles` is read from the view on every request, so it may be
+    a property or be set per request (e.g. in `initial()`).
     """
     
+    @staticmethod
+    def get_required_roles(view):
+        """Return the roles the view requires for the current request."""
+        return getattr(view, 'required_roles', None) or ()
+    
     def has_permission(self, request, view):
         """Check if user has any of the required roles."""
         if not request.user or not request.user.is_authenticated:
             return False
         
         # Get required roles from view
-        required_roles = getattr(view, 'required_roles', [])
+        required_roles = self.get_required_roles(view)
         if not required_roles:
             return True
         
@@ -164,3 +181,64 @@ class ReadOnlyOrAuthenticated(BasePermission):
             return True
         
         return request.user and request.user.is_authenticated
+
+
+# ==============================================================================
+# ASYNC PERMISSIONS
+# ==============================================================================
+
+class AsyncPermissionMixin:
+    """
+    Add coroutine versions of a permission class's checks for async views.
+    
+    `has_permission` and `has_object_permission` stay plain methods, so a
+    sync view (which never awaits them) still gets a real answer instead of
+    an always-truthy coroutine. Async code awaits `ahas_permission` and
+    `ahas_object_permission`; the role checks above only read the token's
+    roles, so they run inline without a thread.
+    
+    Usage:
+        class AsyncIsWarehouseStaff(AsyncPermissionMixin, IsWarehouseStaff):
+            pass
+        
+        if not await AsyncIsWarehouseStaff().ahas_permission(request, view):
+            ...
+    """
+    
+    async def ahas_permission(self, request, view):
+        return self.has_permission(request, view)
+    
+    async def ahas_object_permission(self, request, view, obj):
+        return self.has_object_permission(request, view, obj)
+
+
+class AsyncIsAdminUser(AsyncPermissionMixin, IsAdminUser):
+    """Async version of IsAdminUser."""
+
+
+class AsyncIsAdminOrReadOnly(AsyncPermissionMixin, IsAdminOrReadOnly):
+    """Async version of IsAdminOrReadOnly."""
+
+
+class AsyncIsManagerOrAdmin(AsyncPermissionMixin, IsManagerOrAdmin):
+    """Async version of IsManagerOrAdmin."""
+
+
+class AsyncIsOwnerOrAdmin(AsyncPermissionMixin, IsOwnerOrAdmin):
+    """Async version of IsOwnerOrAdmin."""
+
+
+class AsyncIsAuthenticatedCustomer(AsyncPermissionMixin, IsAuthenticatedCustomer):
+    """Async version of IsAuthenticatedCustomer."""
+
+
+class AsyncIsSupportOrAdmin(AsyncPermissionMixin, IsSupportOrAdmin):
+    """Async version of IsSupportOrAdmin."""
+
+
+class AsyncHasAnyRole(AsyncPermissionMixin, HasAnyRole):
+    """Async version of HasAnyRole."""
+
+
+class AsyncReadOnlyOrAuthenticated(AsyncPermissionMixin, ReadOnlyOrAuthenticated):
+    """Async version of ReadOnlyOrAuthenticated."""
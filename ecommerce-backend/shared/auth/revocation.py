@@ -0,0 +1,148 @@
+"""
+Access Token Revocation List for Microservices.
+
+Logging out revokes the access token in the User Service. Each service keeps
+an in-memory copy of the revoked token IDs (`jti`), synced incrementally from
+the User Service by a background thread, so revocations are enforced without
+a network call per request.
+"""
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .conf import auth_setting
+
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Set of revoked access token IDs with their expiry.
+
+    Only tokens that have not expired yet are kept, so the list stays as
+    small as the number of logouts within one access token lifetime.
+    Lookups are a single dict membership check. Syncs build a new dict and
+    swap it in, so readers never see a partially updated list.
+    """
+
+    def __init__(self, url, refresh_interval=30, timeout=5, token=None):
+        self.url = url
+        self.token = token
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.last_synced = None
+        self._revoked = {}
+        self._since = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def is_revoked(self, jti):
+        """Check if a token ID has been revoked."""
+        return jti in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def _fetch(self):
+        """Fetch revocations since the last sync from the User Service."""
+        url = self.url
+        if self._since is not None:
+            separator = '&' if '?' in url else '?'
+            url = f"{url}{separator}{urllib.parse.urlencode({'since': self._since})}"
+        headers = {'X-Revocation-Token': self.token} if self.token else {}
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def sync(self):
+        """
+        Merge new revocations and drop entries whose tokens have expired.
+
+        Returns:
+            True if the sync succeeded, False if the User Service was unreachable
+        """
+        try:
+            data = self._fetch()
+        except (OSError, ValueError) as e:
+            logger.warning("Could not sync token revocations from %s: %s", self.url, e)
+            return False
+
+        now = time.time()
+        revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        for entry in data.get('revoked', []):
+            if entry['exp'] > now:
+                revoked[entry['jti']] = entry['exp']
+
+        self._revoked = revoked
+        self._since = data.get('server_time', self._since)
+        self.last_synced = now
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            self.sync()
+
+    def start(self):
+        """Load the list once and keep it in sync from a daemon thread."""
+        if self._thread is not None:
+            return
+        self.sync()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='token-revocation-sync',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sync thread."""
+        self._stopped.set()
+
+
+_revocation_list = None
+_revocation_list_lock = threading.Lock()
+
+
+def get_revocation_list():
+    """
+    Return the process-wide revocation list.
+
+    The list is loaded and its sync thread started on first use (after the
+    worker process has forked) from MICROSERVICE_AUTH['REVOCATION_URL'].
+
+    Returns:
+        RevocationList instance, or None if revocation checks are disabled
+    """
+    global _revocation_list
+
+    if _revocation_list is None:
+        url = auth_setting('REVOCATION_URL')
+        if not url:
+            return None
+        with _revocation_list_lock:
+            if _revocation_list is None:
+                revocation_list = RevocationList(
+                    url,
+                    auth_setting('REVOCATION_REFRESH_INTERVAL'),
+                    token=auth_setting('REVOCATION_TOKEN'),
+                )
+                revocation_list.start()
+                _revocation_list = revocation_list
+
+    return _revocation_list
+
+
+@receiver(setting_changed)
+def _reset_revocation_list(setting, **kwargs):
+    """Drop the list when auth settings change (e.g., override_settings in tests)."""
+    global _revocation_list
+    if setting == 'MICROSERVICE_AUTH' and _revocation_list is not None:
+        _revocation_list.stop()
+        _revocation_list = None
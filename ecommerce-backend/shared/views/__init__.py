@@ -0,0 +1,29 @@
+"""
+Shared View Utilities Package.
+
+Reusable view mixins and helpers for all microservices in the e-commerce
+platform.
+
+Usage in any service:
+    from shared.views import ConditionalGetMixin
+    
+    class CategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+        queryset = Category.objects.all()
+"""
+
+from .conditional import (
+    ConditionalGetMixin,
+    conditional_response,
+    list_etag,
+    make_etag,
+    set_validators,
+)
+
+__all__ = [
+    # Conditional requests
+    'ConditionalGetMixin',
+    'conditional_response',
+    'list_etag',
+    'make_etag',
+    'set_validators',
+]
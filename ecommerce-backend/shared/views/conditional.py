@@ -0,0 +1,130 @@
+"""
+Conditional GET Responses.
+
+Answers `If-None-Match` and `If-Modified-Since` with 304 Not Modified
+before a response is serialized. Validators are computed from the models'
+`updated_at` column:
+
+    List:   ETag from the row count and the latest updated_at (one aggregate query)
+    Detail: ETag and Last-Modified from the row's updated_at
+
+Lists send no Last-Modified: deleting a row leaves the latest updated_at
+unchanged, so only the count in the ETag catches it. Validators also cover
+the request's path, query string and user, so pages, filters and users
+never share an ETag.
+
+Writes that bypass save() (e.g. QuerySet.update()) must set updated_at
+themselves, or clients keep their cached copy.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(request, *parts):
+    """
+    Build a strong ETag from validator parts.
+
+    The request's full path, accepted format and user are always included.
+
+    Returns:
+        Quoted ETag string
+    """
+    user = getattr(request, 'user', None)
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = '|'.join(
+        str(part) for part in (
+            request.get_full_path(),
+            getattr(renderer, 'format', ''),
+            getattr(user, 'pk', ''),
+            *parts,
+        )
+    )
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+def list_etag(request, queryset, field='updated_at'):
+    """
+    ETag for a list of `queryset`'s rows: its count and latest `field`.
+
+    Runs one aggregate query.
+    """
+    validators = queryset.order_by().aggregate(count=Count('pk'), last=Max(field))
+    last = validators['last']
+    return make_etag(request, validators['count'], last.isoformat() if last else '')
+
+
+def conditional_response(request, etag=None, last_modified=None):
+    """
+    Evaluate the request's conditional headers against the validators.
+
+    Args:
+        request: The request
+        etag: Quoted ETag of the current representation
+        last_modified: datetime of the last change, or None
+
+    Returns:
+        A 304 (or 412 for failed If-Match) response to return instead of
+        rendering, or None to render the response normally
+    """
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if isinstance(response, HttpResponseNotModified):
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Set ETag and Last-Modified on a successful response."""
+    if response.status_code in (200, 304):
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional list and retrieve for DRF generic views and viewsets.
+
+    Clients that send back the ETag (or Last-Modified, for details) of
+    their cached copy get a 304 without the queryset being fetched or
+    serialized. Lists cost one aggregate query, details the object lookup
+    they need anyway.
+
+    Usage:
+        class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+            queryset = Product.objects.all()
+
+    Set `conditional_field` if the model's change timestamp is not
+    `updated_at`.
+    """
+
+    conditional_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = list_etag(request, queryset, self.conditional_field)
+        not_modified = conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.conditional_field)
+        etag = make_etag(request, last_modified.isoformat())
+        not_modified = conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # Serialize the object already fetched instead of calling
+        # super().retrieve(), which would look it up again
+        response = Response(self.get_serializer(instance).data)
+        return set_validators(response, etag, last_modified)